@@ -0,0 +1,65 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import threading
+import time
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _children(pid):
+    path = '/proc/%d/task/%d/children' % (pid, pid)
+    try:
+        with open(path) as fin:
+            return [int(child) for child in fin.read().split()]
+    except OSError:
+        return []
+
+
+def _rss(pid):
+    try:
+        with open('/proc/%d/statm' % pid) as fin:
+            return int(fin.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def tree_rss(pid):
+    """Resident memory in bytes of a process and all its descendants."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _rss(current)
+        pending.extend(_children(current))
+    return total
+
+
+class PeakMemory(object):
+    """Sample the RSS of a process tree in the background.
+
+    Linux only, as it reads ``/proc`` directly.
+    """
+    def __init__(self, pid, interval=0.005):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.daemon = True
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss(self.pid))
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def format_bytes(count):
+    return '%.1f MiB' % (count / (1024.0 * 1024.0))
@@ -0,0 +1,79 @@
+"""Compare per category reports against filtering once per category.
+
+Builds a synthetic event and times gun time percentiles, means and
+histograms for every category, first by scanning the whole event for
+each category and then with :func:`sport_systems.analytics.summarise`.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_analytics --runners 100000 --cats 40
+"""
+import argparse
+import random
+import time
+
+from sport_systems import analytics, csv_handler, stats
+
+
+def _rows(runners, cats, seed=0):
+    rng = random.Random(seed)
+    for pos in range(1, runners + 1):
+        seconds = 3600 + pos // 4
+        yield csv_handler.Row(
+            pos, seconds, 'Runner %d' % pos, 'Team %d' % rng.randrange(200),
+            'Cat %d' % rng.randrange(cats), str(pos),
+            seconds - rng.randrange(120), '', 'finished',
+        )
+
+
+def naive(rows, cats):
+    """A full scan of the rows for every category."""
+    summary = {}
+    for cat in cats:
+        results = stats.Results()
+        for row in rows:
+            if row.cat == cat:
+                results.append(row.time, row.name)
+        results.sort()
+        summary[cat] = (
+            len(results), sum(results.times) / len(results),
+            stats.generate_percentiles(results), stats.histogram(results),
+        )
+    return summary
+
+
+def _best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--runners', type=int, default=100000)
+    arg_parser.add_argument('--cats', type=int, default=40)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    options = arg_parser.parse_args()
+
+    rows = list(_rows(options.runners, options.cats))
+    table = analytics.ResultTable.from_rows(rows)
+    cats = table.labels['cat']
+
+    timings = [
+        ('per category scans', lambda: naive(rows, cats)),
+        ('summarise', lambda: analytics.summarise(table, by='cat')),
+        ('summarise chip deltas',
+         lambda: analytics.summarise(table, by='cat', value='delta')),
+    ]
+    print('%d runners, %d categories' % (len(table), len(cats)))
+    for label, func in timings:
+        print('%-24s %8.1f ms' % (
+            label, _best_of(func, options.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
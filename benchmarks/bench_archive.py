@@ -0,0 +1,85 @@
+"""Time queries against a large results archive.
+
+Bulk loads synthetic events into a fresh archive, then times a runner
+lookup across every event, a team lookup and percentiles for a single
+event, against reading the same event back from its CSV.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_archive --events 2000 --runners 500
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from sport_systems import archive, csv_handler, stats
+
+
+def _rows(event_id, runners):
+    for pos in range(1, runners + 1):
+        seconds = 3600 + pos * 5 + event_id % 60
+        yield (
+            str(pos), '%d:%02d:%02d' % (
+                seconds // 3600, seconds // 60 % 60, seconds % 60
+            ),
+            'Runner %d' % ((pos * 7919 + event_id) % (runners * 20)),
+            'Team %d' % (pos % 50), 'Senior', str(pos), '', '',
+        )
+
+
+def _best_of(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--events', type=int, default=2000)
+    arg_parser.add_argument('--runners', type=int, default=500)
+    options = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = archive.Archive(os.path.join(directory, 'results.sqlite'))
+
+        start = time.perf_counter()
+        for event_id in range(options.events):
+            store.begin(event_id)
+            store.add(event_id, _rows(event_id, options.runners))
+            store.commit()
+        elapsed = time.perf_counter() - start
+        total = options.events * options.runners
+        print('Ingested %d rows in %.2fs (%.0f rows/s)' % (
+            total, elapsed, total / elapsed))
+
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out)
+        writer.writerow(csv_handler.FIELDNAMES)
+        writer.write(list(_rows(1, options.runners)))
+        writer.close()
+        data = out.getvalue()
+
+        timings = [
+            ('runner across all events',
+             lambda: store.search(name='Runner 1234')),
+            ('team in one event',
+             lambda: store.search(team='Team 7', event_ids=[1])),
+            ('event percentiles (archive)',
+             lambda: stats.generate_percentiles(store.results(1))),
+            ('event percentiles (CSV)',
+             lambda: stats.generate_percentiles(
+                 csv_handler.build_results(io.StringIO(data)))),
+        ]
+        for label, func in timings:
+            print('%-30s %8.2f ms' % (label, _best_of(func) * 1000))
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
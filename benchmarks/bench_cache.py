@@ -0,0 +1,80 @@
+"""Compare loading cached events from CSV and the binary format.
+
+Writes a synthetic archive of events in both formats to a temporary
+directory, then times loading a single event and scanning the lot.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_cache --runners 4000 --events 200
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from sport_systems import binary, csv_handler
+
+
+def write_event(directory, event_id, runners):
+    random.seed(event_id)
+    csv_path = os.path.join(directory, 'race-%d.csv' % event_id)
+    with open(csv_path, 'w', newline='') as out:
+        writer = csv.writer(out, delimiter='\t')
+        writer.writerow(csv_handler.FIELDNAMES)
+        for pos in range(1, runners + 1):
+            seconds = random.randint(3600, 6 * 3600)
+            finish = '%d:%02d:%02d' % (
+                seconds // 3600, seconds // 60 % 60, seconds % 60)
+            writer.writerow([pos, finish, 'Runner %d' % pos, 'Team', 'Cat',
+                             pos, finish, '50.0'])
+
+    with open(csv_path, 'r') as fin:
+        results = csv_handler.build_results(fin)
+    with open(binary.path_for(event_id, directory), 'wb') as out:
+        binary.dump(results, out)
+    return csv_path
+
+
+def load_csv(paths):
+    for path in paths:
+        with open(path, 'r') as fin:
+            csv_handler.build_results(fin)
+
+
+def load_binary(event_id, directory):
+    with open(binary.path_for(event_id, directory), 'rb') as fin:
+        binary.load(fin)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--runners', type=int, default=4000)
+    arg_parser.add_argument('--events', type=int, default=200)
+    options = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [write_event(directory, event_id, options.runners)
+                 for event_id in range(1, options.events + 1)]
+
+        print('Single %d runner event: csv %.4fs, binary %.6fs' % (
+            options.runners,
+            timed(load_csv, paths[:1]),
+            timed(load_binary, 1, directory),
+        ))
+        print('Archive of %d events:   csv %.3fs, binary %.4fs' % (
+            options.events,
+            timed(load_csv, paths),
+            timed(lambda: list(binary.scan(directory))),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""End to end crawl benchmarks across engines and configurations.
+
+Each configuration crawls a synthetic event from the local stub server
+through :func:`sport_systems.csv_handler.build`, writing a real CSV, in
+a fresh child process. It records pages/sec, the CPU time of the whole
+process tree and its peak memory. Results can be saved as JSON and
+compared against a saved baseline to catch regressions.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_crawl --total 4000 --latency 0.02 \\
+        --page-sizes 20 200 --error-rates 0 0.05 --output crawl.json
+
+    python -m benchmarks.bench_crawl --baseline crawl.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from sport_systems import csv_handler
+from sport_systems.spider import SportSystemResultsMixin
+from tests.stub_server import StubServer
+
+from ._utils import PeakMemory, format_bytes
+
+
+def _crawl(config, options, path, conn):
+    kwargs = {'page_size': config['page_size'], 'retry_backoff': 0.05}
+    if config['engine'] == 'process':
+        if options.workers:
+            kwargs['N'] = options.workers
+        kwargs['parse_workers'] = options.parse_workers
+        kwargs['queue_size'] = options.queue_size
+        kwargs['max_memory'] = options.max_memory
+    elif config['engine'] == 'async':
+        kwargs['concurrency'] = options.concurrency
+
+    start = time.perf_counter()
+    with open(path, 'w', newline='') as out:
+        spider = csv_handler.build(
+            1, out, engine=config['engine'], max_retry=5, **kwargs
+        )
+    conn.send((time.perf_counter() - start, len(spider.dead_letters)))
+
+
+def _cpu_time(usage):
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(config, options, server):
+    """Crawl once with the given configuration, returning its stats."""
+    server.error_rate = config['error_rate']
+    requests_before = server.request_count
+    parent_conn, child_conn = multiprocessing.Pipe()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'race-1.csv')
+        cpu_before = _cpu_time(resource.getrusage(resource.RUSAGE_CHILDREN))
+        proc = multiprocessing.Process(
+            target=_crawl, args=(config, options, path, child_conn)
+        )
+        proc.start()
+        with PeakMemory(proc.pid) as memory:
+            elapsed, dead_letters = parent_conn.recv()
+            proc.join()
+        cpu = _cpu_time(resource.getrusage(resource.RUSAGE_CHILDREN))
+
+        with open(path) as fin:
+            rows = sum(1 for _ in fin) - 1
+
+    requests = server.request_count - requests_before
+    pages = -(-options.total // config['page_size'])
+    return dict(
+        config,
+        requests=requests,
+        rows=rows,
+        dead_letters=dead_letters,
+        elapsed=elapsed,
+        pages_per_sec=pages / elapsed,
+        cpu_time=cpu - cpu_before,
+        peak_rss=memory.peak,
+    )
+
+
+def _key(result):
+    return '%s/page_size=%d/error_rate=%g' % (
+        result['engine'], result['page_size'], result['error_rate']
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Configurations that got slower, or hungrier, than the baseline.
+
+    :returns: A list of ``(key, metric, baseline, now)`` tuples.
+    """
+    previous = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        if result['pages_per_sec'] < before['pages_per_sec'] * (1 - tolerance):
+            regressions.append((_key(result), 'pages_per_sec',
+                                before['pages_per_sec'],
+                                result['pages_per_sec']))
+        for metric in ('cpu_time', 'peak_rss'):
+            if result[metric] > before[metric] * (1 + tolerance):
+                regressions.append((_key(result), metric, before[metric],
+                                    result[metric]))
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--total', type=int, default=4000)
+    arg_parser.add_argument('--latency', type=float, default=0.02)
+    arg_parser.add_argument('--max-count', type=int, default=None,
+                            help='The largest page the stub will serve')
+    arg_parser.add_argument('--engines', nargs='+',
+                            default=['process', 'async'])
+    arg_parser.add_argument('--page-sizes', nargs='+', type=int,
+                            default=[20, 200])
+    arg_parser.add_argument('--error-rates', nargs='+', type=float,
+                            default=[0.0])
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help='Download processes for the process engine')
+    arg_parser.add_argument('--parse-workers', type=int, default=0,
+                            help='Parse processes for the process engine')
+    arg_parser.add_argument('--queue-size', type=int, default=None,
+                            help='URL and results queue bound for the '
+                                 'process engine')
+    arg_parser.add_argument('--max-memory', type=int, default=None,
+                            help='Bytes of pages the process engine may '
+                                 'hold between fetch and write')
+    arg_parser.add_argument('--concurrency', type=int, default=20,
+                            help='In flight requests for the async engine')
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--output', help='Save the results as JSON')
+    arg_parser.add_argument('--baseline',
+                            help='Compare against results saved earlier')
+    arg_parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='The fractional change that counts as a '
+                                 'regression')
+    options = arg_parser.parse_args()
+
+    configs = [
+        {'engine': engine, 'page_size': page_size, 'error_rate': error_rate}
+        for engine, page_size, error_rate in itertools.product(
+            options.engines, options.page_sizes, options.error_rates
+        )
+    ]
+
+    results = []
+    with StubServer(total=options.total, latency=options.latency,
+                    max_count=options.max_count, seed=options.seed) as server:
+        SportSystemResultsMixin.BASE_URL = server.base_url
+        print('%-8s %6s %6s %8s %9s %10s %9s %11s %6s' % (
+            'engine', 'page', 'errors', 'requests', 'elapsed', 'pages/sec',
+            'CPU', 'peak RSS', 'dead'))
+        for config in configs:
+            result = run(config, options, server)
+            results.append(result)
+            print('%-8s %6d %6g %8d %8.2fs %10.1f %8.2fs %11s %6d' % (
+                result['engine'], result['page_size'], result['error_rate'],
+                result['requests'], result['elapsed'],
+                result['pages_per_sec'], result['cpu_time'],
+                format_bytes(result['peak_rss']), result['dead_letters']))
+
+    if options.output:
+        with open(options.output, 'w') as out:
+            json.dump(results, out, indent=1)
+
+    if options.baseline:
+        with open(options.baseline) as fin:
+            baseline = json.load(fin)
+        regressions = compare(results, baseline, options.tolerance)
+        for key, metric, before, now in regressions:
+            print('REGRESSION %s %s: %.3f -> %.3f' % (
+                key, metric, before, now))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
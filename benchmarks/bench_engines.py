@@ -0,0 +1,93 @@
+"""Compare the multiprocessing and asyncio crawl engines.
+
+Runs each engine against a local stub server in a fresh child process
+and reports pages/sec, peak memory of the whole process tree and the
+time until the first page reached the callback.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_engines --total 4000 --latency 0.05
+"""
+import argparse
+import multiprocessing
+import time
+
+from sport_systems.spider import SportSystemResultsMixin, get_results_spider
+from tests.stub_server import StubServer
+
+from ._utils import PeakMemory, format_bytes
+
+
+def _crawl(engine, options, first_result, conn):
+    spider_class = get_results_spider(engine)
+    kwargs = {}
+    if engine == 'process' and options.workers:
+        kwargs['N'] = options.workers
+    elif engine == 'async':
+        kwargs['concurrency'] = options.concurrency
+
+    def callback(result):
+        if not first_result.value:
+            first_result.value = time.time()
+
+    spider = spider_class(
+        event_id=1, callback=callback, page_size=options.page_size, **kwargs
+    )
+    start = time.time()
+    spider.go()
+    conn.send((start, time.time()))
+
+
+def run(engine, options, server):
+    first_result = multiprocessing.Value('d', 0.0)
+    parent_conn, child_conn = multiprocessing.Pipe()
+    requests_before = server.request_count
+
+    proc = multiprocessing.Process(
+        target=_crawl, args=(engine, options, first_result, child_conn)
+    )
+    proc.start()
+    with PeakMemory(proc.pid) as memory:
+        start, end = parent_conn.recv()
+        proc.join()
+
+    pages = server.request_count - requests_before
+    elapsed = end - start
+    return {
+        'engine': engine,
+        'pages': pages,
+        'elapsed': elapsed,
+        'pages_per_sec': pages / elapsed,
+        'first_result': first_result.value - start,
+        'peak_rss': memory.peak,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--total', type=int, default=4000)
+    arg_parser.add_argument('--page-size', type=int, default=20)
+    arg_parser.add_argument('--latency', type=float, default=0.02)
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help='Download processes for the process engine')
+    arg_parser.add_argument('--concurrency', type=int, default=20,
+                            help='In flight requests for the async engine')
+    arg_parser.add_argument('--engines', nargs='+',
+                            default=['process', 'async'])
+    options = arg_parser.parse_args()
+
+    with StubServer(total=options.total, latency=options.latency) as server:
+        SportSystemResultsMixin.BASE_URL = server.base_url
+        print('%-8s %7s %9s %10s %12s %11s' % (
+            'engine', 'pages', 'elapsed', 'pages/sec', 'first page',
+            'peak RSS'))
+        for engine in options.engines:
+            stats = run(engine, options, server)
+            print('%-8s %7d %8.2fs %10.1f %11.3fs %11s' % (
+                stats['engine'], stats['pages'], stats['elapsed'],
+                stats['pages_per_sec'], stats['first_result'],
+                format_bytes(stats['peak_rss'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Cold start latency of the command line's ``stats`` path.
+
+Times fresh interpreters running ``sport-systems stats`` against a
+synthetic event, against the interpreter alone and one that imports the
+crawl modules the old ``go.py`` always loaded. Then lists the slowest
+imports of the stats path from ``python -X importtime``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_import --repeat 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from sport_systems import csv_handler
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_event(directory, runners, event_id=1):
+    path = os.path.join(directory, 'race-%d.csv' % event_id)
+    with open(path, 'w', newline='') as out:
+        writer = csv_handler.OrderedWriter(out)
+        writer.writerow(csv_handler.FIELDNAMES)
+        writer.write([
+            (str(pos), '%d:%02d:%02d' % (
+                seconds // 3600, seconds // 60 % 60, seconds % 60
+            ), 'Runner %d' % pos, '', 'Senior', str(pos), '', '')
+            for pos, seconds in (
+                (pos, 3600 + pos * 3) for pos in range(1, runners + 1)
+            )
+        ])
+        writer.close()
+    return event_id
+
+
+def _run(args, cwd, repeat):
+    """The best and median wall clock time of running ``args``."""
+    env = dict(os.environ, PYTHONPATH=HERE)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def _slowest_imports(module, count):
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        cwd=HERE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True,
+    ).stderr
+    imports = []
+    for line in output.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        imports.append((int(cumulative), name.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--runners', type=int, default=5000)
+    options = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        event_id = _write_event(directory, options.runners)
+        cases = [
+            ('interpreter', [sys.executable, '-c', 'pass']),
+            ('import crawl modules', [
+                sys.executable, '-c',
+                'import sport_systems.checkpoint, sport_systems.incremental',
+            ]),
+            ('stats (first run, CSV)', None),
+            ('stats (binary cache)', [
+                sys.executable, '-m', 'sport_systems.cli', 'stats',
+                str(event_id),
+            ]),
+        ]
+        print('%-26s %10s %10s' % ('', 'best ms', 'median ms'))
+        for label, args in cases:
+            if args is None:
+                # Only the first run reads the CSV, time it on its own
+                args = [sys.executable, '-m', 'sport_systems.cli', 'stats',
+                        str(event_id)]
+                best = median = _run(args, directory, 1)[0]
+            else:
+                best, median = _run(args, directory, options.repeat)
+            print('%-26s %10.1f %10.1f' % (label, best * 1000, median * 1000))
+
+    print('\nSlowest imports of sport_systems.cli (cumulative us)')
+    for cumulative, name in _slowest_imports('sport_systems.cli', 8):
+        print('%10d %s' % (cumulative, name))
+
+
+if __name__ == '__main__':
+    main()
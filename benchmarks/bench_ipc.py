@@ -0,0 +1,80 @@
+"""Measure what crosses the process boundary for each crawled page.
+
+Compares shipping whole ``requests.Response`` objects to the callback
+process (parsing there) against parsing in the download workers and
+shipping row tuples, reporting pickled bytes per page and end to end
+crawl time for a 4,000 runner event served by the local stub.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_ipc --total 4000
+"""
+import argparse
+import io
+import pickle
+import time
+
+import requests
+
+from sport_systems import csv_handler, parser
+from sport_systems.spider import (
+    SportSystemResultsMixin, SportSystemResultsSpider,
+)
+from tests.stub_server import StubServer
+
+
+def bytes_per_page(server, page_size):
+    spider = SportSystemResultsSpider(event_id=1740, callback=None)
+    url = spider.build_url(page_num=1, count=page_size)
+    response = requests.get(url)
+
+    whole = len(pickle.dumps(response, pickle.HIGHEST_PROTOCOL))
+    rows = csv_handler.extract_rows(response.content)
+    compact = len(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL))
+    return whole, compact
+
+
+def crawl_parsing_in_callback(options):
+    """How the crawl behaved before rows were parsed in the workers."""
+    out = io.StringIO()
+
+    def callback(result):
+        for cell in parser.parse(result.content):
+            out.write('\t'.join(cell.values()))
+
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=callback, N=options.workers,
+        page_size=options.page_size,
+    )
+    spider.go()
+
+
+def crawl_parsing_in_workers(options):
+    csv_handler.build(
+        1740, io.StringIO(), N=options.workers, page_size=options.page_size
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--total', type=int, default=4000)
+    arg_parser.add_argument('--page-size', type=int, default=20)
+    arg_parser.add_argument('--latency', type=float, default=0.0)
+    arg_parser.add_argument('--workers', type=int, default=None)
+    options = arg_parser.parse_args()
+
+    with StubServer(total=options.total, latency=options.latency) as server:
+        SportSystemResultsMixin.BASE_URL = server.base_url
+
+        whole, compact = bytes_per_page(server, options.page_size)
+        print('Pickled bytes per page: response %d, rows %d (%.1fx less)' % (
+            whole, compact, whole / compact))
+
+        for crawl in (crawl_parsing_in_callback, crawl_parsing_in_workers):
+            start = time.time()
+            crawl(options)
+            print('%-28s %.2fs' % (crawl.__name__, time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compare the streaming lxml parser against the BeautifulSoup one.
+
+Each parser runs in its own child process over a synthetic page built
+from ``tests/response-1.xml``, reporting rows/sec and the peak RSS of
+that process.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_parser --rows 10000
+"""
+import argparse
+import multiprocessing
+import time
+
+from sport_systems import parser
+from tests.stub_server import render_page
+
+from ._utils import PeakMemory, format_bytes
+
+PARSERS = {
+    'lxml': parser.parse,
+    'soup': parser.parse_soup,
+}
+
+
+def _parse(name, content, repeat, conn):
+    parse = PARSERS[name]
+    start = time.perf_counter()
+    rows = 0
+    for _ in range(repeat):
+        rows += sum(1 for _ in parse(content))
+    conn.send((rows, time.perf_counter() - start))
+
+
+def run(name, content, repeat):
+    parent_conn, child_conn = multiprocessing.Pipe()
+    proc = multiprocessing.Process(
+        target=_parse, args=(name, content, repeat, child_conn)
+    )
+    proc.start()
+    with PeakMemory(proc.pid) as memory:
+        rows, elapsed = parent_conn.recv()
+        proc.join()
+    return rows / elapsed, memory.peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    options = arg_parser.parse_args()
+
+    content = render_page(options.rows, 0, options.rows)
+    print('%d rows, %s of XML' % (options.rows, format_bytes(len(content))))
+    print('%-6s %12s %11s' % ('parser', 'rows/sec', 'peak RSS'))
+    for name in PARSERS:
+        rate, peak = run(name, content, options.repeat)
+        print('%-6s %12.0f %11s' % (name, rate, format_bytes(peak)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare the stats engine against the original per-runner loops.
+
+Builds sorted result sets of 1k, 100k and 1M runners and times
+percentiles and minute buckets with the original implementations
+(reproduced here) and the current ``sport_systems.stats``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_stats
+"""
+import argparse
+from collections import defaultdict
+import random
+import time
+
+from sport_systems import stats
+
+
+def legacy_create_buckets(results):
+    buckets = defaultdict(lambda: [])
+    for result in results:
+        key = result.time.strftime('%H-%M')
+        buckets[key].append(result)
+    return buckets
+
+
+def legacy_generate_percentiles(results,
+                                percentiles=stats.DEFAULT_PERCENTILES):
+    data = []
+    total = len(results)
+    cur_index = 0
+    for percentile in percentiles:
+        for index, result in enumerate(results[cur_index:], start=cur_index):
+            if (index / total) * 100 > percentile:
+                data.append((percentile, result.time))
+                cur_index = index
+                break
+    if percentiles[-1] == 100:
+        data.append((100, results[-1].time))
+    return data
+
+
+def build(size):
+    random.seed(size)
+    results = stats.Results()
+    for index in range(size):
+        results.append(random.randint(3600, 6 * 3600), 'Runner %d' % index)
+    results.sort()
+    return results
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', nargs='+', type=int,
+                            default=[1000, 100000, 1000000])
+    options = arg_parser.parse_args()
+
+    print('numpy: %s' % ('yes' if stats._numpy() is not None else 'no'))
+    print('%9s %16s %16s %16s %16s' % (
+        'results', 'legacy pct', 'percentiles', 'legacy buckets',
+        'histogram'))
+    for size in options.sizes:
+        results = build(size)
+        as_list = list(results)
+        print('%9d %15.4fs %15.6fs %15.4fs %15.6fs' % (
+            size,
+            timed(legacy_generate_percentiles, as_list),
+            timed(stats.percentile_seconds, results),
+            timed(legacy_create_buckets, as_list),
+            timed(stats.histogram, results),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,14 @@ setup(
     include_package_data=True,
     author='Ben Emery',
     install_requires=install_requires,
+    extras_require={
+        'async': ['aiohttp'],
+    },
+    entry_points={
+        'console_scripts': [
+            'sport-systems = sport_systems.cli:main',
+        ],
+    },
     dependency_links=dependency_links,
     author_email='willcodefortea@gmail.com'
 )
@@ -0,0 +1,329 @@
+"""An asyncio crawl engine.
+
+Fetching result pages is almost entirely waiting on the network, so
+rather than spawning a process per concurrent request this engine runs
+every download as a coroutine on a single event loop. Requires
+``aiohttp`` (``pip install sport_systems[async]``).
+"""
+import asyncio
+import time
+
+import aiohttp
+
+from .metrics import CrawlMetrics, QueueSampler, StageTimings
+from .ratelimit import RateLimiter, retry_after
+from .retry import DeadLetter, UnprocessablePage, backoff_delay
+from .session import DEFAULT_TIMEOUT, Fetcher, FetchStats, Response
+from .spider import SportSystemResultsMixin
+
+
+class AsyncSpider(object):
+    """A spider that fetches URLs concurrently on an asyncio event loop.
+
+    Shares the ``populate_urls`` / ``callback`` contract of
+    :class:`sport_systems.spider.Spider`, callbacks are run on the event
+    loop as each page completes.
+
+    :arg callable callback: A method that accepts a single argument
+        (the response object) to be called whenever a request is
+        completed.
+    :arg int concurrency: The maximum number of requests in flight.
+    :arg int max_retry: The number of times to retry a URL if an error
+        response is returned or the request raises.
+    :arg float retry_backoff: The base, in seconds, of the exponential
+        backoff between retries.
+    :arg callable processor: An optional method run on each successful
+        response's content, its return value is passed to ``callback``
+        instead of the response.
+    :arg callable on_finish: An optional method run once the last result
+        has been handled.
+    :arg timeout: Request timeout in seconds, or a ``(connect, read)``
+        tuple.
+    :arg bool gzip: Whether to ask the server for compressed responses.
+    :arg float rate_limit: The most requests per second to make, ``None``
+        for no limit.
+    :arg int max_in_flight: The most requests to have in flight, below
+        ``concurrency``, ``None`` for no limit.
+    :arg float sample_interval: Seconds between samples of the queue
+        depth, see :attr:`metrics`.
+    :arg cache: An optional :class:`~sport_systems.cache.ResponseCache`.
+    """
+    def __init__(self, callback, concurrency=20, max_retry=3,
+                 processor=None, timeout=DEFAULT_TIMEOUT, gzip=True,
+                 rate_limit=None, max_in_flight=None, retry_backoff=0.5,
+                 sample_interval=0.5, on_finish=None, cache=None):
+        self.callback = callback
+        self.cache = cache
+        self.on_finish = on_finish
+        self.processor = processor
+        self.concurrency = concurrency
+        self.max_retry = max_retry
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.gzip = gzip
+        self.sample_interval = sample_interval
+
+        #: The :class:`~sport_systems.ratelimit.RateLimiter`, if the
+        #: crawl is limited.
+        self.rate_limiter = None
+        if rate_limit or max_in_flight:
+            self.rate_limiter = RateLimiter(
+                rate=rate_limit, max_in_flight=max_in_flight
+            )
+
+        #: A :class:`~sport_systems.session.FetchStats` of the requests
+        #: made by the crawl's ``aiohttp`` session.
+        self.session_stats = FetchStats()
+
+        self.url_queue = None
+        #: A :class:`~sport_systems.retry.DeadLetter` for each page that
+        #: still failed after ``max_retry`` retries.
+        self.dead_letters = []
+        #: The :class:`~sport_systems.metrics.StageTimings` of the crawl.
+        self.timings = StageTimings()
+        self.queue_samples = []
+        self.elapsed = None
+
+    @property
+    def fetch_stats(self):
+        """The combined :class:`~sport_systems.session.FetchStats`.
+
+        Includes the requests made before the crawl, such as page size
+        probes and the first page.
+        """
+        stats = FetchStats().merge(self.session_stats)
+        if hasattr(self, '_fetcher'):
+            stats.merge(self._fetcher.stats)
+        return stats
+
+    @property
+    def metrics(self):
+        """A :class:`~sport_systems.metrics.CrawlMetrics` for the crawl.
+
+        Only complete once :meth:`go` has returned.
+        """
+        return CrawlMetrics(
+            self.fetch_stats, self.timings, self.queue_samples,
+            self.elapsed, len(self.dead_letters),
+        )
+
+    async def download(self, session):
+        """Fetch URLs from the queue until cancelled."""
+        while True:
+            url, try_count = await self.url_queue.get()
+
+            done, give_up, status, error = False, False, None, None
+            try:
+                with self.timings.time('fetch'):
+                    response = await self._get(session, url)
+                status = response.status_code
+                if status < 400:
+                    self._handle(response)
+                    done = True
+            except UnprocessablePage as exc:
+                give_up, error = True, exc.error
+            except Exception as exc:
+                error = repr(exc)
+
+            if done:
+                self.url_queue.task_done()
+            elif give_up or try_count >= self.max_retry:
+                self.dead_letters.append(
+                    DeadLetter(url, try_count + 1, status, error)
+                )
+                self.url_queue.task_done()
+            else:
+                retries = [
+                    (retry_url, try_count + 1)
+                    for retry_url in self.split_url(url)
+                ]
+                delay = backoff_delay(try_count, self.retry_backoff)
+                task = asyncio.ensure_future(self._retry_later(delay, retries))
+                self._retries.add(task)
+                task.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, delay, retries):
+        """Re-queue failed URLs after a backoff.
+
+        The original task is only marked done once they're back on the
+        queue, so the crawl doesn't finish while they wait.
+        """
+        await asyncio.sleep(delay)
+        for item in retries:
+            self.url_queue.put_nowait(item)
+        self.url_queue.task_done()
+
+    def _handle(self, response):
+        """Process a successful response and run the callback on it.
+
+        :raises UnprocessablePage: If ``process_response`` fails, which
+            retrying the download wouldn't help.
+        """
+        try:
+            with self.timings.time('parse'):
+                result = self.process_response(response)
+        except Exception as exc:
+            raise UnprocessablePage(
+                response.status_code, repr(exc)
+            ) from exc
+        with self.timings.time('write'):
+            self.callback(result)
+
+    async def _sample_queues(self, sampler):
+        """Sample the URL queue's depth until cancelled."""
+        while True:
+            sampler.sample()
+            await asyncio.sleep(self.sample_interval)
+
+    async def _get(self, session, url):
+        """Fetch a URL, recording its latency and size.
+
+        Pages served from the cache skip the limiter.
+        """
+        headers = self.request_headers(url)
+        if self.cache is not None and not headers:
+            cached = self.cache.get(url)
+            if cached is not None:
+                self.session_stats.cache_hits += 1
+                return Response(
+                    url, cached.status_code, cached.content, cached.headers
+                )
+
+        limiter = self.rate_limiter
+        if limiter is not None:
+            await limiter.acquire_async()
+
+        trace = {'new_connections': 0}
+        start = time.perf_counter()
+
+        try:
+            async with session.get(url, headers=headers,
+                                   trace_request_ctx=trace) as response:
+                content = await response.read()
+        except Exception:
+            if limiter is not None:
+                limiter.release(None, time.perf_counter() - start)
+            raise
+
+        if limiter is not None:
+            limiter.release(
+                response.status, time.perf_counter() - start,
+                retry_after(response.headers),
+            )
+
+        self.session_stats.record(
+            latency=time.perf_counter() - start,
+            # aiohttp only hands back the decoded body, the advertised
+            # length is what came over the wire
+            size=response.content_length or len(content),
+            new_connections=trace['new_connections'],
+        )
+        if self.cache is not None and response.status < 400 and not headers:
+            self.cache.put(url, response.status, content, response.headers)
+        return Response(url, response.status, content, response.headers)
+
+    def _client_session(self):
+        """A pooled ``aiohttp`` session configured for this spider."""
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            timeout = aiohttp.ClientTimeout(connect=connect, sock_read=read)
+        else:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async def on_connection_create_end(session, context, params):
+            context.trace_request_ctx['new_connections'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+
+        headers = {} if self.gzip else {'Accept-Encoding': 'identity'}
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=timeout,
+            headers=headers,
+            trace_configs=[trace_config],
+        )
+
+    @property
+    def fetcher(self):
+        """The blocking session used for requests made before the crawl."""
+        if not hasattr(self, '_fetcher'):
+            self._fetcher = Fetcher(
+                timeout=self.timeout, gzip=self.gzip, cache=self.cache
+            )
+        return self._fetcher
+
+    def process_response(self, response):
+        """What to hand the callback for a successful response."""
+        if self.processor is None:
+            return response
+        return self.processor(response.content)
+
+    async def crawl(self):
+        """Populate the queue and run the workers until it drains."""
+        start = time.monotonic()
+        self.url_queue = asyncio.Queue()
+        self._retries = set()
+        self.dead_letters = []
+        self.timings = StageTimings()
+        sampler = QueueSampler({'urls': self.url_queue})
+        self.populate_urls()
+
+        async with self._client_session() as session:
+            workers = [
+                asyncio.ensure_future(self.download(session))
+                for _ in range(self.concurrency)
+            ]
+            workers.append(asyncio.ensure_future(self._sample_queues(sampler)))
+            try:
+                await self.url_queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        if self.on_finish is not None:
+            with self.timings.time('write'):
+                self.on_finish()
+
+        sampler.sample()
+        self.queue_samples = sampler.samples
+        self.elapsed = time.monotonic() - start
+        self.dead_letters.sort()
+
+    def go(self):
+        """Start all the things."""
+        asyncio.run(self.crawl())
+
+    def populate_urls(self):
+        """Create URLs for this spider to fetch."""
+        raise NotImplementedError()
+
+    def enqueue(self, url):
+        """Schedule a URL to be fetched."""
+        self.url_queue.put_nowait((url, 0))
+
+    def submit_response(self, response):
+        """Pass a response fetched outside the workers to the callback."""
+        response = Response(
+            response.url, response.status_code, response.content,
+            response.headers,
+        )
+        try:
+            self._handle(response)
+        except UnprocessablePage as exc:
+            self.dead_letters.append(
+                DeadLetter(response.url, 1, exc.status, exc.error)
+            )
+
+    def request_headers(self, url):
+        """Extra headers to send when fetching the given URL."""
+        return None
+
+    def split_url(self, url):
+        """The URLs to retry in place of a failed one."""
+        return [url]
+
+
+class AsyncSportSystemResultsSpider(SportSystemResultsMixin, AsyncSpider):
+    """A spider to crawl results from SportSystems using asyncio."""
@@ -0,0 +1,189 @@
+"""Grouped stats across the columns of an event: category, team, grade.
+
+:mod:`~sport_systems.stats` works on finish times alone. A
+:class:`ResultTable` also keeps each finisher's chip time and their
+category, team and grade, as arrays of ints, so an event's results can
+be broken down by any of them.
+
+Rather than filtering the results once per group, :func:`summarise`
+packs each runner's group and value into a single int and sorts them
+once. Each group is then a contiguous, sorted slice, viewed without
+copying, that the :mod:`~sport_systems.stats` functions run on
+directly::
+
+    >>> with open('race-1740.csv') as fin:
+    ...     table = analytics.ResultTable.load(fin)
+    >>> analytics.summarise(table, by='cat')['Senior Men'].percentiles
+"""
+from array import array
+import bisect
+from collections import namedtuple
+import itertools
+import operator
+
+from .stats import (
+    DEFAULT_PERCENTILES, _numpy, generate_percentiles, histogram,
+)
+
+#: The columns results can be grouped by.
+GROUP_COLUMNS = ('cat', 'team', 'grade')
+#: The values that can be summarised, see :meth:`ResultTable.values`.
+VALUES = ('time', 'chip', 'delta')
+#: Stands in for a missing chip time.
+NO_CHIP = 0xFFFFFFFF
+
+_VALUE_BITS = 32
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+
+#: The stats of one group, see :func:`summarise`.
+GroupStats = namedtuple('GroupStats', [
+    'count', 'mean', 'percentiles', 'histogram',
+])
+
+
+class ResultTable(object):
+    """The finishers of an event as columns of ints.
+
+    ``times`` and ``chips`` are ``array('I')`` of seconds, with
+    :data:`NO_CHIP` where a runner has no chip time. Each of
+    :data:`GROUP_COLUMNS` is an ``array('I')`` of indexes into its list
+    of labels in :attr:`labels`.
+    """
+    def __init__(self):
+        self.times = array('I')
+        self.chips = array('I')
+        self.groups = {column: array('I') for column in GROUP_COLUMNS}
+        #: Each group column's distinct values, in order of appearance.
+        self.labels = {column: [] for column in GROUP_COLUMNS}
+        self._index = {column: {} for column in GROUP_COLUMNS}
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """A table of the finishers in some
+        :class:`~sport_systems.csv_handler.Row`."""
+        table = cls()
+        for row in rows:
+            table.append(row)
+        return table
+
+    @classmethod
+    def load(cls, fin):
+        """A table of the finishers in the CSV written by
+        :func:`~sport_systems.csv_handler.build`."""
+        from .csv_handler import read_rows
+
+        return cls.from_rows(read_rows(fin))
+
+    def append(self, row):
+        """Add a :class:`~sport_systems.csv_handler.Row`, ignoring it if
+        the runner didn't finish."""
+        if row.time is None:
+            return
+        self.times.append(row.time)
+        self.chips.append(NO_CHIP if row.chip is None else row.chip)
+        for column in GROUP_COLUMNS:
+            label = getattr(row, column)
+            index = self._index[column].get(label)
+            if index is None:
+                index = self._index[column][label] = len(self.labels[column])
+                self.labels[column].append(label)
+            self.groups[column].append(index)
+
+    def values(self, value='time', by='cat'):
+        """One value per runner, alongside their group.
+
+        :arg str value: ``time`` for the gun time, ``chip`` for the chip
+            time or ``delta`` for the gun time less the chip time, i.e.
+            how long a runner took to cross the start. Runners without a
+            chip time, or with one slower than their gun time, are left
+            out of ``chip`` and ``delta``.
+        :arg str by: One of :data:`GROUP_COLUMNS`.
+        :returns: ``(values, group_ids)``, both ``array('I')``.
+        """
+        if value not in VALUES:
+            raise ValueError('Unknown value %r' % (value, ))
+        group_ids = self.groups[by]
+        if value == 'time':
+            return self.times, group_ids
+
+        keep = list(map(operator.le, self.chips, self.times))
+        chips = array('I', itertools.compress(self.chips, keep))
+        group_ids = array('I', itertools.compress(group_ids, keep))
+        if value == 'chip':
+            return chips, group_ids
+        times = itertools.compress(self.times, keep)
+        return array('I', map(operator.sub, times, chips)), group_ids
+
+
+def sort_groups(values, group_ids, groups):
+    """Sort values by group, then value, in a single pass.
+
+    :arg int groups: The number of groups, one more than the largest ID.
+    :returns: ``(values, bounds)``, the sorted values as an
+        ``array('I')`` and where each group starts in them, plus a final
+        bound at the end. Group ``n`` is
+        ``values[bounds[n]:bounds[n + 1]]``.
+    """
+    numpy = _numpy() if len(values) else None
+    if numpy is not None:
+        keys = numpy.frombuffer(group_ids, dtype=numpy.uint32).astype(
+            numpy.uint64
+        ) << _VALUE_BITS
+        keys |= numpy.frombuffer(values, dtype=numpy.uint32)
+        keys.sort()
+        starts = numpy.arange(groups + 1, dtype=numpy.uint64) << _VALUE_BITS
+        bounds = numpy.searchsorted(keys, starts).tolist()
+        ordered = (keys & _VALUE_MASK).astype(numpy.uint32)
+        return array('I', ordered.tobytes()), bounds
+
+    keys = sorted(map(
+        operator.or_,
+        map(operator.lshift, group_ids, itertools.repeat(_VALUE_BITS)),
+        values,
+    ))
+    ordered = array('I', map(
+        operator.and_, keys, itertools.repeat(_VALUE_MASK)
+    ))
+    bounds = [0] * (groups + 1)
+    # Groups are contiguous runs of keys, found by bisecting their
+    # smallest possible key
+    for group in range(groups + 1):
+        bounds[group] = bisect.bisect_left(keys, group << _VALUE_BITS)
+    return ordered, bounds
+
+
+def summarise(table, by='cat', value='time',
+              percentiles=DEFAULT_PERCENTILES, bin_size=60):
+    """Count, mean, percentiles and histogram of a value per group.
+
+    :arg ResultTable table: The results.
+    :arg str by: One of :data:`GROUP_COLUMNS`.
+    :arg str value: One of :data:`VALUES`, see
+        :meth:`ResultTable.values`.
+    :returns: A dict mapping each group's label to its
+        :class:`GroupStats`, where ``percentiles`` are as
+        :func:`~sport_systems.stats.generate_percentiles` and
+        ``histogram`` as :func:`~sport_systems.stats.histogram`. Groups
+        with nothing to summarise are left out.
+    """
+    labels = table.labels[by]
+    values, group_ids = table.values(value, by)
+    ordered, bounds = sort_groups(values, group_ids, len(labels))
+    view = memoryview(ordered)
+
+    summary = {}
+    for group, label in enumerate(labels):
+        start, end = bounds[group], bounds[group + 1]
+        if start == end:
+            continue
+        group_values = view[start:end]
+        summary[label] = GroupStats(
+            count=end - start,
+            mean=sum(group_values) / (end - start),
+            percentiles=generate_percentiles(group_values, percentiles),
+            histogram=histogram(group_values, bin_size),
+        )
+    return summary
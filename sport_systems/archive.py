@@ -0,0 +1,213 @@
+"""An indexed SQLite store of results across every crawled event.
+
+Each ``race-<id>.csv`` stands alone, so a question like "every result
+for this runner" means parsing every file. An :class:`Archive` instead
+holds the rows of all events in one SQLite database, indexed by event,
+runner name, team, category and chip time, and hands back
+:class:`~sport_systems.stats.Results` that the :mod:`~sport_systems.stats`
+functions run on directly.
+"""
+from collections import namedtuple
+import csv
+
+from .csv_handler import Row
+from .db import ProcessLocalDB, connect
+from .stats import DEFAULT_PERCENTILES, Results, generate_percentiles
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY,
+    date TEXT,
+    results INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    event_id INTEGER NOT NULL,
+    pos INTEGER,
+    seconds INTEGER,
+    name TEXT NOT NULL,
+    team TEXT,
+    cat TEXT,
+    num TEXT,
+    chip INTEGER,
+    grade TEXT
+);
+CREATE INDEX IF NOT EXISTS results_event ON results (event_id, seconds);
+CREATE INDEX IF NOT EXISTS results_name ON results (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS results_team ON results (team COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS results_cat ON results (cat, seconds);
+CREATE INDEX IF NOT EXISTS results_chip ON results (chip);
+'''
+
+#: A runner's result in one event, as returned by :meth:`Archive.search`.
+Entry = namedtuple('Entry', [
+    'event_id', 'pos', 'seconds', 'name', 'team', 'cat', 'num', 'chip',
+    'grade',
+])
+
+
+def _record(event_id, row):
+    """A row of :data:`~sport_systems.csv_handler.FIELDNAMES` as a
+    ``results`` table row."""
+    row = Row.from_cells(row)
+    return (
+        event_id, row.pos, row.time, row.name, row.team, row.cat, row.num,
+        row.chip, row.grade,
+    )
+
+
+class Archive(ProcessLocalDB):
+    """Results of many events in one indexed SQLite database.
+
+    :arg str path: The database file, created if it doesn't exist.
+    """
+    def __init__(self, path):
+        self.path = path
+        # Events begun since the last commit
+        self._loading = set()
+
+    def _connect(self):
+        return connect(self.path, SCHEMA)
+
+    # Ingestion
+
+    def begin(self, event_id):
+        """Start (re)loading an event, dropping any rows it had."""
+        db = self.db
+        db.execute('DELETE FROM results WHERE event_id = ?', (event_id,))
+        db.execute(
+            'INSERT OR IGNORE INTO events (event_id) VALUES (?)', (event_id,)
+        )
+        self._loading.add(event_id)
+
+    def add(self, event_id, rows):
+        """Bulk insert rows of :data:`~sport_systems.csv_handler.FIELDNAMES`.
+
+        Nothing is visible to readers until :meth:`commit`.
+        """
+        self.db.executemany(
+            'INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (_record(event_id, row) for row in rows)
+        )
+
+    def commit(self):
+        """Commit the rows added, updating the count of each event
+        loaded since the last commit."""
+        db = self.db
+        db.executemany(
+            'UPDATE events SET results = (SELECT COUNT(*) FROM results '
+            'WHERE results.event_id = events.event_id) WHERE event_id = ?',
+            ((event_id,) for event_id in sorted(self._loading))
+        )
+        db.commit()
+        self._loading.clear()
+
+    def ingest_csv(self, event_id, fin):
+        """Load an event from the CSV written by
+        :func:`~sport_systems.csv_handler.build`, replacing it if it's
+        already archived."""
+        reader = csv.reader(fin, delimiter='\t')
+        self.begin(event_id)
+        self.add(event_id, (row for row in reader if row[0] != 'pos'))
+        self.commit()
+
+    def set_date(self, event_id, date):
+        """Record the date, ``YYYY-MM-DD``, an event was held on.
+
+        The results API doesn't say, so dates have to be supplied.
+        """
+        self.db.execute(
+            'INSERT INTO events (event_id, date) VALUES (?, ?) '
+            'ON CONFLICT (event_id) DO UPDATE SET date = excluded.date',
+            (event_id, date)
+        )
+        self.db.commit()
+
+    # Queries
+
+    def events(self, year=None):
+        """The archived event IDs, optionally only those held in
+        ``year``."""
+        if year is None:
+            rows = self.db.execute(
+                'SELECT event_id FROM events ORDER BY event_id'
+            )
+        else:
+            rows = self.db.execute(
+                "SELECT event_id FROM events WHERE date LIKE ? "
+                "ORDER BY event_id", ('%04d-%%' % year,)
+            )
+        return [event_id for event_id, in rows]
+
+    def results(self, event_id, cat=None, names=None):
+        """An event's finishers as a sorted
+        :class:`~sport_systems.stats.Results`.
+
+        :arg str cat: Only include this category.
+        :arg names: An optional :class:`~sport_systems.stats.NameTable`
+            to share between result sets.
+        """
+        query = ('SELECT seconds, name FROM results WHERE event_id = ? '
+                 'AND seconds IS NOT NULL')
+        params = [event_id]
+        if cat is not None:
+            query += ' AND cat = ?'
+            params.append(cat)
+        # Served in order by the (event_id, seconds) index
+        query += ' ORDER BY seconds'
+
+        results = Results(names=names)
+        for seconds, name in self.db.execute(query, params):
+            results.append(seconds, name)
+        return results
+
+    def percentiles(self, event_ids=None, year=None,
+                    percentiles=DEFAULT_PERCENTILES):
+        """:func:`~sport_systems.stats.generate_percentiles` for several
+        events.
+
+        :arg list event_ids: The events, all of them (held in ``year``
+            if given) by default.
+        :returns: A dict mapping each event ID to its percentiles.
+        """
+        if event_ids is None:
+            event_ids = self.events(year)
+        return {
+            event_id: generate_percentiles(
+                self.results(event_id), percentiles
+            )
+            for event_id in event_ids
+        }
+
+    def search(self, name=None, team=None, cat=None, event_ids=None,
+               chip_between=None):
+        """Results across events matching every criteria given.
+
+        Names and teams match case insensitively.
+
+        :arg tuple chip_between: ``(fastest, slowest)`` chip times in
+            seconds.
+        :returns: A list of :class:`Entry`, by event then position.
+        """
+        clauses, params = [], []
+        if name is not None:
+            clauses.append('name = ? COLLATE NOCASE')
+            params.append(name)
+        if team is not None:
+            clauses.append('team = ? COLLATE NOCASE')
+            params.append(team)
+        if cat is not None:
+            clauses.append('cat = ?')
+            params.append(cat)
+        if event_ids is not None:
+            event_ids = list(event_ids)
+            clauses.append('event_id IN (%s)' % ','.join('?' * len(event_ids)))
+            params.extend(event_ids)
+        if chip_between is not None:
+            clauses.append('chip BETWEEN ? AND ?')
+            params.extend(chip_between)
+
+        query = 'SELECT * FROM results'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY event_id, pos'
+        return [Entry(*row) for row in self.db.execute(query, params)]
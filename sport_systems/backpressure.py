@@ -0,0 +1,57 @@
+"""A cap on the pages held in memory between the stages of a crawl.
+
+Bounded queues limit how many pages wait between the download workers,
+the parse pool and the callback. Pages vary a lot in size though, so a
+:class:`MemoryBudget` also caps their bytes: a download worker takes its
+page's size from the budget before passing the page on, and the callback
+process gives it back once the page has been written. A slow callback
+then holds up the downloads, rather than pages piling up in memory.
+"""
+import multiprocessing
+import time
+
+
+class MemoryBudget(object):
+    """Bytes of pages allowed between fetching and writing at once.
+
+    State lives in shared memory, so one budget, created before the
+    spider forks, is shared by all of its processes. A page bigger than
+    the whole budget is still let through once nothing else is held, so
+    a crawl can't stall on it.
+
+    :arg int limit: The most bytes to hold.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self._used = multiprocessing.Value('q', 0, lock=False)
+        self._peak = multiprocessing.Value('q', 0, lock=False)
+        self._changed = multiprocessing.Condition()
+
+    @property
+    def used(self):
+        """The bytes currently held."""
+        return self._used.value
+
+    @property
+    def peak(self):
+        """The most bytes held at once so far."""
+        return self._peak.value
+
+    def acquire(self, size):
+        """Block until ``size`` bytes fit in the budget, then take them.
+
+        :returns: The seconds spent waiting.
+        """
+        start = time.perf_counter()
+        with self._changed:
+            while self._used.value and self._used.value + size > self.limit:
+                self._changed.wait(0.1)
+            self._used.value += size
+            self._peak.value = max(self._peak.value, self._used.value)
+        return time.perf_counter() - start
+
+    def release(self, size):
+        """Give back bytes taken by :meth:`acquire`."""
+        with self._changed:
+            self._used.value -= size
+            self._changed.notify_all()
@@ -0,0 +1,174 @@
+"""Crawl many events over a single pool of download processes."""
+from collections import deque
+import multiprocessing
+import queue
+import urllib.parse
+
+import requests
+
+from .retry import PagesFailed
+from .spider import SportSystemResultsMixin, Spider
+
+
+class BatchEvent(SportSystemResultsMixin):
+    """The pages of one event in a batch.
+
+    Works out the event's page size, total and URLs in whichever of the
+    batch's download processes plans it, see :meth:`plan`.
+    """
+    def __init__(self, batch, event_id, page_size=None):
+        super().__init__(event_id=event_id, page_size=page_size)
+        self.batch = batch
+        #: The session of the download process planning the event.
+        self.fetcher = None
+
+    @property
+    def base_url(self):
+        return self.BASE_URL.format(event_id=self.event_id)
+
+    @property
+    def max_retry(self):
+        return self.batch.max_retry
+
+    @property
+    def retry_backoff(self):
+        return self.batch.retry_backoff
+
+    def plan(self, fetcher):
+        """Choose the page size if need be and fetch the first page.
+
+        :arg fetcher: The :class:`~sport_systems.session.Fetcher` of the
+            download process doing the planning.
+        :returns: The first page.
+        """
+        self.fetcher = fetcher
+        if self.page_size is None:
+            self.page_size = self.probe_page_size()
+        return self._fetch_first_page()
+
+
+class SportSystemBatchSpider(Spider):
+    """Crawl results for several events with one set of processes.
+
+    Each event is planned, probing its page size and fetching its first
+    page, by the download processes, so events are planned concurrently.
+    Its other pages are then queued round robin across events, so a huge
+    event doesn't hold up the small ones behind it. The callback
+    receives ``(event_id, result)`` tuples, where ``result`` is what a
+    single event spider's callback would have been given.
+
+    :arg list event_ids: The events to crawl.
+    :arg int page_size: A fixed page size for every event, if not given
+        one is probed for each event.
+    """
+    def __init__(self, event_ids, page_size=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events = [
+            BatchEvent(self, event_id, page_size) for event_id in event_ids
+        ]
+        self._events_by_url = {event.base_url: event for event in self.events}
+
+        #: Events that couldn't be crawled, mapped to the error raised.
+        #: Events with pages that failed for good are mapped to a
+        #: :class:`~sport_systems.retry.PagesFailed`.
+        self.failed_events = {}
+        # (event_id, page_size, total, error) of each planned event,
+        # from the download processes
+        self.plan_queue = multiprocessing.Queue()
+
+    def event_for_url(self, url):
+        """The :class:`BatchEvent` a page URL belongs to."""
+        parts = urllib.parse.urlsplit(url)
+        base_url = urllib.parse.urlunsplit(parts._replace(query=''))
+        return self._events_by_url[base_url]
+
+    def go(self):
+        super().go()
+        dead_letters = {}
+        for letter in self.dead_letters:
+            event = self.event_for_url(letter.url)
+            dead_letters.setdefault(event.event_id, []).append(letter)
+        for event_id, letters in dead_letters.items():
+            self.failed_events.setdefault(event_id, PagesFailed(letters))
+
+    def process_response(self, response):
+        event = self.event_for_url(response.url)
+        return event.event_id, super().process_response(response)
+
+    def split_url(self, url):
+        return self.event_for_url(url).split_url(url)
+
+    def handle_url(self, fetcher, url, results_queue, timings):
+        """Plan an event, given its base URL, or fetch one of its pages.
+
+        An event that can't be planned is reported as failed rather than
+        retried, its first page has already been retried.
+        """
+        event = self._events_by_url.get(url)
+        if event is None:
+            return super().handle_url(fetcher, url, results_queue, timings)
+
+        try:
+            with timings.time('fetch'):
+                response = event.plan(fetcher)
+            self._pass_on(response, results_queue, timings)
+        except Exception as error:
+            if isinstance(error, requests.RequestException):
+                # Not needed, and they don't always pickle
+                error.request = error.response = None
+            self.plan_queue.put((event.event_id, None, None, error))
+            return True, None
+
+        self.plan_queue.put(
+            (event.event_id, event.page_size, event.total_count, None)
+        )
+        return True, response.status_code
+
+    def populate_urls(self):
+        """Plan every event over the pool, queuing pages round robin as
+        each event is planned.
+
+        An event is planned by queuing its base URL, see
+        :meth:`handle_url`. The URL queue is topped up without blocking
+        while events are being planned, so the pool works through the
+        events planned so far alongside planning the rest. Each event's
+        URLs are generated as the URL queue takes them.
+        """
+        events = {event.event_id: event for event in self.events}
+        unplanned = deque(self.events)
+        planning = 0
+        pending = deque()
+        while unplanned or planning:
+            while unplanned and not self.url_queue.full():
+                self.enqueue(unplanned.popleft().base_url)
+                planning += 1
+            try:
+                event_id, page_size, total, error = self.plan_queue.get(
+                    timeout=0.01
+                )
+            except queue.Empty:
+                pass
+            else:
+                planning -= 1
+                event = events[event_id]
+                if error is not None:
+                    self.failed_events[event_id] = error
+                else:
+                    event.page_size = page_size
+                    event._total_count = total
+                    pending.append(event.iter_urls())
+            self._queue_pages(pending, until_full=True)
+        self._queue_pages(pending)
+
+    def _queue_pages(self, pending, until_full=False):
+        """Queue one page of each pending event in turn.
+
+        :arg bool until_full: Stop once the URL queue is full, rather
+            than blocking until every page has been queued.
+        """
+        while pending and not (until_full and self.url_queue.full()):
+            urls = pending.popleft()
+            url = next(urls, None)
+            if url is not None:
+                self.enqueue(url)
+                pending.append(urls)
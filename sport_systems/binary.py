@@ -0,0 +1,132 @@
+"""A compact binary cache format for result sets.
+
+Parsing the tab separated output of :func:`sport_systems.csv_handler.build`
+means splitting every line and every ``H:M:S`` time. This format instead
+stores a sorted :class:`~sport_systems.stats.Results` as fixed width
+columns that can be memory mapped and used in place::
+
+    header   16 bytes, see HEADER
+    times    count * uint32, seconds, sorted ascending
+    name_ids count * uint32, indexes into the names block
+    names    UTF-8, newline separated unique names
+
+Columns are written in the native byte order, which is recorded in the
+header, and are only copied on load if that differs from the reader's.
+"""
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+from .stats import NameTable, Results, to_seconds
+
+MAGIC = b'SSRB'
+VERSION = 1
+#: Magic, version, byte order, result count and names block size.
+HEADER = struct.Struct('<4sBcxxII')
+#: The extension used for files in this format.
+EXTENSION = '.ssr'
+
+_BYTEORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+
+class FormatError(ValueError):
+    """Raised when a file isn't a result set in this format."""
+
+
+def dump(results, out):
+    """Write a sorted result set to a binary stream.
+
+    :arg Results results: The results, already sorted.
+    :arg file out: A file like object opened in binary mode.
+    """
+    if not isinstance(results, Results):
+        converted = Results()
+        for result in results:
+            converted.append(to_seconds(result.time), result.name)
+        results = converted
+
+    # Only keep the names used by these results
+    local = NameTable()
+    name_ids = array('I', [
+        local.add(results.names[name_id]) for name_id in results.name_ids
+    ])
+    names = '\n'.join(local.names).encode('utf-8')
+
+    out.write(HEADER.pack(MAGIC, VERSION, _BYTEORDER, len(results),
+                          len(names)))
+    out.write(array('I', results.times).tobytes())
+    out.write(name_ids.tobytes())
+    out.write(names)
+
+
+def load(fin):
+    """Load a result set written by :func:`dump`.
+
+    Files are memory mapped and the time and name columns are used in
+    place, without copying.
+
+    :arg file fin: A file like object opened in binary mode.
+    :returns: A sorted :class:`~sport_systems.stats.Results`.
+    """
+    try:
+        buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # Not a real (or non-empty) file, e.g. BytesIO
+        buffer = fin.read()
+    return loads(buffer)
+
+
+def loads(buffer):
+    """Load a result set from a bytes like object, see :func:`load`."""
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise FormatError('Truncated header')
+
+    magic, version, byteorder, count, names_size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise FormatError('Not a results file')
+
+    width = count * 4
+    times_end = HEADER.size + width
+    ids_end = times_end + width
+    if len(view) < ids_end + names_size:
+        raise FormatError('Truncated file')
+
+    times = view[HEADER.size:times_end].cast('I')
+    name_ids = view[times_end:ids_end].cast('I')
+    if byteorder != _BYTEORDER:
+        times, name_ids = array('I', times), array('I', name_ids)
+        times.byteswap()
+        name_ids.byteswap()
+
+    names = bytes(view[ids_end:ids_end + names_size]).decode('utf-8')
+
+    results = Results(names=NameTable.from_names(
+        names.split('\n') if count else []
+    ))
+    results.times = times
+    results.name_ids = name_ids
+    return results
+
+
+def path_for(event_id, directory='.'):
+    """The path of the cached results for an event."""
+    return os.path.join(directory, 'race-%d%s' % (event_id, EXTENSION))
+
+
+def scan(directory='.'):
+    """Load every cached event in a directory.
+
+    :returns: An iterator of ``(event_id, results)`` tuples.
+    """
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith('race-') and
+                filename.endswith(EXTENSION)):
+            continue
+        event_id = filename[len('race-'):-len(EXTENSION)]
+        if not event_id.isdigit():
+            continue
+        with open(os.path.join(directory, filename), 'rb') as fin:
+            yield int(event_id), load(fin)
@@ -0,0 +1,204 @@
+"""An on-disk cache of results pages.
+
+Changing the parser or the CSV columns means running a crawl again, but
+the pages themselves rarely need downloading again. With a
+:class:`ResponseCache` handed to a spider, successful responses are kept
+on disk, compressed, and served from there on later crawls until they
+expire or are evicted, least recently used first, to stay within a size
+budget.
+
+Bodies are stored one file per page, keyed by a hash of the normalised
+URL, with an SQLite index of their metadata so every download process
+can share the cache safely.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.parse
+import zlib
+
+from requests.structures import CaseInsensitiveDict
+
+from .db import ProcessLocalDB, connect
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+'''
+
+#: Response headers worth keeping with a cached page.
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def cache_key(url):
+    """A URL normalised so equivalent page requests share a key.
+
+    Query parameters are sorted, so the order :meth:`build_url` (or
+    anything else) added them in doesn't matter.
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(
+        parts.query, keep_blank_values=True
+    )))
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''
+    ))
+
+
+class CachedResponse(object):
+    """The parts of ``requests.Response`` the spiders use, for a page
+    served from the cache."""
+    from_cache = True
+
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        # Only successful responses are cached
+        pass
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class ResponseCache(ProcessLocalDB):
+    """Successful responses kept on disk between crawls.
+
+    :arg str directory: Where to keep the cache, created if needed.
+    :arg float ttl: Seconds a page stays fresh for, ``None`` for ever.
+    :arg int max_size: The most compressed bytes to keep, ``None`` for
+        no limit. Least recently used pages are evicted first.
+    """
+    def __init__(self, directory, ttl=None, max_size=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        return connect(
+            os.path.join(self.directory, 'index.sqlite'), SCHEMA,
+            isolation_level=None,
+        )
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:] + '.z')
+
+    def get(self, url):
+        """The cached response for a URL, ``None`` if there isn't a fresh
+        one."""
+        key = cache_key(url)
+        row = self.db.execute(
+            'SELECT status, headers, created FROM responses WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        status, headers, created = row
+        now = time.time()
+        if self.ttl is not None and created + self.ttl < now:
+            self._delete(key)
+            return None
+
+        try:
+            with open(self._path(key), 'rb') as fin:
+                content = zlib.decompress(fin.read())
+        except (OSError, zlib.error):
+            # Evicted by another process, or damaged
+            self._delete(key)
+            return None
+
+        self.db.execute(
+            'UPDATE responses SET accessed = ? WHERE key = ?', (now, key)
+        )
+        return CachedResponse(url, status, content, json.loads(headers))
+
+    def put(self, url, status_code, content, headers=None):
+        """Store a response, evicting others if over ``max_size``."""
+        key = cache_key(url)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = zlib.compress(content)
+        with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path), delete=False) as out:
+            out.write(data)
+        os.replace(out.name, path)
+
+        headers = {
+            name: headers[name] for name in KEPT_HEADERS
+            if headers and name in headers
+        }
+        now = time.time()
+        self.db.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, url, status_code, json.dumps(headers), len(data), now, now)
+        )
+        if self.max_size is not None:
+            self._evict(self.max_size)
+
+    def _delete(self, key):
+        self.db.execute('DELETE FROM responses WHERE key = ?', (key,))
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self, max_size):
+        """Drop least recently used pages until within ``max_size``."""
+        total = self.size
+        if total <= max_size:
+            return
+        rows = self.db.execute(
+            'SELECT key, size FROM responses ORDER BY accessed'
+        ).fetchall()
+        for key, size in rows:
+            if total <= max_size:
+                break
+            self._delete(key)
+            total -= size
+
+    @property
+    def size(self):
+        """The compressed bytes currently cached."""
+        return self.db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def prune(self):
+        """Remove expired pages and evict any over ``max_size``."""
+        if self.ttl is not None:
+            rows = self.db.execute(
+                'SELECT key FROM responses WHERE created < ?',
+                (time.time() - self.ttl,)
+            ).fetchall()
+            for key, in rows:
+                self._delete(key)
+        if self.max_size is not None:
+            self._evict(self.max_size)
@@ -0,0 +1,265 @@
+"""Resumable crawls of an event into a CSV.
+
+Rows are written to ``race-<id>.csv.part`` in ``pos`` order, through
+an :class:`~sport_systems.csv_handler.OrderedWriter`, and only renamed
+over ``race-<id>.csv`` once every page has been fetched, so a complete
+looking CSV is never a half written one. Alongside the partial file a
+checkpoint journal records, for each page, the size of the partial file
+after the chunk holding its rows was flushed. A crawl that died part
+way through truncates the partial file to the last chunk it recorded
+and only fetches the pages that are missing.
+"""
+import csv
+import io
+import json
+import os
+
+from . import csv_handler
+from .spider import get_results_spider, pos_start
+
+
+class Checkpoint(object):
+    """A journal of the pages of a crawl that are safely on disk.
+
+    The first line records the page size, then a ``[posStart, size]``
+    line is appended as each page is committed. A line torn by a crash
+    is ignored.
+
+    :arg str path: Where the journal is kept.
+    :arg int page_size: The page size of the crawl, ``None`` until it has
+        started.
+    :arg dict pages: Maps each committed page's ``posStart`` to the size
+        of the partial file after its rows.
+    """
+    def __init__(self, path, page_size=None, pages=None):
+        self.path = path
+        self.page_size = page_size
+        self.pages = pages if pages is not None else {}
+        self._out = None
+
+    @classmethod
+    def load(cls, path):
+        """Load a checkpoint, or an empty one if there isn't one yet."""
+        checkpoint = cls(path)
+        if not os.path.exists(path):
+            return checkpoint
+
+        with open(path, 'r') as fin:
+            for line in fin:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if isinstance(entry, dict):
+                    checkpoint.page_size = entry['page_size']
+                else:
+                    pos_start, size = entry
+                    checkpoint.pages[pos_start] = size
+        return checkpoint
+
+    @property
+    def size(self):
+        """The size of the partial file covered by committed pages."""
+        return max(self.pages.values(), default=0)
+
+    def contiguous_pos(self):
+        """The last ``pos`` of the unbroken run of pages from the start
+        that are committed."""
+        if not self.page_size:
+            return 0
+        pos_start = 0
+        while pos_start in self.pages:
+            pos_start += self.page_size
+        return pos_start
+
+    def save(self):
+        """Atomically rewrite the journal, dropping any torn line."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as out:
+            if self.page_size is not None:
+                out.write(json.dumps({'page_size': self.page_size}) + '\n')
+            for pos_start, size in sorted(self.pages.items()):
+                out.write(json.dumps([pos_start, size]) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def start(self, page_size):
+        """Record the page size, if this is a new crawl."""
+        if self.page_size is not None:
+            return
+        self.page_size = page_size
+        with open(self.path, 'w') as out:
+            out.write(json.dumps({'page_size': page_size}) + '\n')
+
+    def commit(self, pos_starts, size):
+        """Record that some pages' rows have been flushed to disk.
+
+        May be called from the spider's callback process, so the journal
+        is opened there, in append mode, on first use.
+
+        :arg list pos_starts: The ``posStart`` of each page flushed.
+        :arg int size: The size of the partial file after their rows.
+        """
+        if self._out is None:
+            self._out = open(self.path, 'a')
+        self._out.write(''.join(
+            json.dumps([pos_start, size]) + '\n' for pos_start in pos_starts
+        ))
+        self._out.flush()
+        for pos_start in pos_starts:
+            self.pages[pos_start] = size
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def discard(self):
+        """Remove the journal."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def partial_path(csv_path):
+    """Where an event's CSV is written until the crawl completes."""
+    return csv_path + '.part'
+
+
+def checkpoint_path(csv_path):
+    """Where the checkpoint for an event's CSV is kept."""
+    return csv_path + '.checkpoint'
+
+
+class CheckpointMixin(object):
+    """Skip the pages a :class:`Checkpoint` says are already on disk.
+
+    Each response is reduced, in the download worker, to a ``(posStart,
+    rows)`` tuple.
+    """
+    def __init__(self, checkpoint, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkpoint = checkpoint
+        if self.page_size is None:
+            # Page boundaries have to match the interrupted crawl's
+            self.page_size = checkpoint.page_size
+
+    def populate_urls(self):
+        if self.page_size is None:
+            self.page_size = self.probe_page_size()
+        self.checkpoint.start(self.page_size)
+
+        if 0 not in self.checkpoint.pages:
+            super().populate_urls()
+            return
+
+        # The first page is already on disk, only the total is needed
+        for url in self.iter_urls():
+            self.enqueue(url)
+
+    def enqueue(self, url):
+        if pos_start(url) not in self.checkpoint.pages:
+            super().enqueue(url)
+
+    def split_url(self, url):
+        # Pages must stay on the checkpoint's boundaries
+        return [url]
+
+    def process_response(self, response):
+        return (
+            pos_start(response.url),
+            csv_handler.extract_rows(response.content),
+        )
+
+
+def get_checkpoint_spider(engine='process'):
+    """The resumable results spider class for the given crawl engine."""
+    return get_results_spider(engine, CheckpointMixin, 'Checkpoint')
+
+
+def _encode_rows(rows):
+    buf = io.StringIO()
+    csv.writer(buf, delimiter='\t').writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+
+def build(event_id, csv_path, engine='process', overwrite=False, live=None,
+          **spider_kwargs):
+    """Crawl an event into a CSV, resuming an interrupted crawl.
+
+    The CSV only appears, atomically, once every page has been fetched.
+    If some pages fail for good the partial file and checkpoint are
+    kept, and calling this again fetches just those pages.
+
+    :arg int event_id: The event ID we're interested in.
+    :arg str csv_path: Where to write the event's CSV.
+    :arg str engine: The crawl engine to use.
+    :arg bool overwrite: Discard any interrupted crawl and start afresh.
+    :arg live: An optional :class:`~sport_systems.live.LiveReport` to
+        feed each page of rows as it arrives, starting with those already
+        on disk.
+    :arg spider_kwargs: Passed through to the spider.
+    :returns: The finished spider, for its ``dead_letters`` and
+        ``metrics``.
+    """
+    part_path = partial_path(csv_path)
+    checkpoint = Checkpoint.load(checkpoint_path(csv_path))
+    page_size = spider_kwargs.get('page_size') or checkpoint.page_size
+    if (overwrite or not os.path.exists(part_path) or
+            page_size != checkpoint.page_size):
+        checkpoint.discard()
+        checkpoint = Checkpoint(checkpoint.path)
+        with open(part_path, 'wb') as out:
+            out.write(_encode_rows([csv_handler.FIELDNAMES]))
+    else:
+        checkpoint.save()
+
+    with open(part_path, 'r+b') as out:
+        # Drop anything written after the last committed page
+        out.seek(checkpoint.size or len(_encode_rows(
+            [csv_handler.FIELDNAMES]
+        )))
+        out.truncate()
+
+        if live is not None and checkpoint.pages:
+            # Count the rows already on disk, the header has no time
+            out.seek(0)
+            live.add(csv.reader(
+                (line.decode('utf-8') for line in out), delimiter='\t'
+            ))
+
+        # Pages are written in pos order, a chunk at a time, and only
+        # committed once their chunk is flushed
+        out.seek(0, io.SEEK_END)
+        text = io.TextIOWrapper(
+            out, encoding='utf-8', newline='', write_through=True
+        )
+        writer = csv_handler.OrderedWriter(
+            text, last=checkpoint.contiguous_pos(),
+            on_flush=lambda pos_starts: checkpoint.commit(
+                pos_starts, out.tell()
+            ),
+        )
+
+        def callback(page):
+            pos_start, rows = page
+            writer.write(rows, key=pos_start)
+            if live is not None:
+                live.add(rows)
+
+        def on_finish():
+            writer.close()
+            if live is not None:
+                live.close()
+
+        spider_class = get_checkpoint_spider(engine)
+        spider = spider_class(
+            checkpoint=checkpoint, event_id=event_id, callback=callback,
+            on_finish=on_finish, **spider_kwargs
+        )
+        spider.go()
+        text.detach()
+
+    if not spider.dead_letters:
+        os.replace(part_path, csv_path)
+        checkpoint.discard()
+    return spider
@@ -0,0 +1,397 @@
+"""The ``sport-systems`` command line.
+
+``crawl``
+    Fetch one or more events, then print their percentiles.
+``stats``
+    Print the percentiles of an event that's already been crawled,
+    optionally per category, team or grade.
+``export``
+    Write an event's results as JSON, the binary format or into an
+    archive.
+
+Only ``crawl`` needs the spiders, :mod:`requests` and the XML parser, so
+they're imported inside it. ``stats`` gets by with
+:mod:`~sport_systems.stats` and :mod:`~sport_systems.binary`, which
+matters when it's run thousands of times a day from cron.
+
+For compatibility with ``go.py``, a first argument that isn't a
+subcommand is taken as the events to ``crawl``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from . import binary, stats
+
+#: Where ``--cache`` keeps downloaded pages unless told otherwise.
+DEFAULT_CACHE_DIR = '.sport_systems_cache'
+#: Seconds cached pages stay fresh for unless told otherwise, so a
+#: live event's pages are fetched again.
+DEFAULT_CACHE_TTL = 24 * 3600
+#: Where ``--archive`` indexes crawled events unless told otherwise.
+DEFAULT_ARCHIVE = 'results.sqlite'
+
+COMMANDS = ('crawl', 'stats', 'export')
+
+
+def csv_path(event_id):
+    """Where an event's results are written."""
+    return 'race-%d.csv' % event_id
+
+
+def crawl(event_id, overwrite=False, update=False, metrics=None,
+          live_stats=False, response_cache=None, results_archive=None):
+    """Crawl an event, unless it already has been, then report."""
+    from . import checkpoint, incremental, live
+
+    filename = csv_path(event_id)
+
+    if update:
+        # Only fetch the pages that have changed since the last crawl
+        summary = incremental.update(event_id, filename)
+        if summary['dead_letters']:
+            print_dead_letters(summary['dead_letters'])
+            return 1
+    elif not os.path.exists(filename) or overwrite:
+        # Picks up where an interrupted crawl left off, unless told to
+        # overwrite it
+        live_report = live.LiveReport(print_live) if live_stats else None
+        spider = checkpoint.build(
+            event_id, filename, overwrite=overwrite, live=live_report,
+            cache=response_cache,
+        )
+        if metrics:
+            print(format_metrics(spider.metrics, metrics))
+        if spider.dead_letters:
+            print_dead_letters(spider.dead_letters)
+            return 1
+
+    if results_archive is not None:
+        archive_event(results_archive, event_id, filename)
+    report(event_id, filename)
+    return 0
+
+
+def print_dead_letters(dead_letters):
+    """Print the pages of a crawl that failed for good."""
+    from . import retry
+
+    print('Some pages could not be fetched, run again to retry them:')
+    print(json.dumps(retry.dead_letter_report(dead_letters), indent=2))
+
+
+def batch(event_ids, overwrite=False, response_cache=None,
+          results_archive=None):
+    """Crawl several events over one pool of processes, then report."""
+    from . import csv_handler, retry
+
+    filenames = {event_id: csv_path(event_id) for event_id in event_ids}
+    missing = [
+        event_id for event_id, filename in sorted(filenames.items())
+        if not os.path.exists(filename) or overwrite
+    ]
+    failed = {}
+    if missing:
+        failed = csv_handler.build_batch(missing, cache=response_cache)
+
+    for event_id, filename in sorted(filenames.items()):
+        print('Event %d' % event_id)
+        if event_id in failed:
+            error = failed[event_id]
+            print('\tFailed: %s' % error)
+            if isinstance(error, retry.PagesFailed):
+                print(json.dumps(
+                    retry.dead_letter_report(error.dead_letters), indent=2
+                ))
+            continue
+        if results_archive is not None:
+            archive_event(results_archive, event_id, filename)
+        report(event_id, filename)
+    return 1 if failed else 0
+
+
+def archive_event(results_archive, event_id, filename):
+    """Load an event's CSV into the cross event archive."""
+    with open(filename, 'r', newline='') as fin:
+        results_archive.ingest_csv(event_id, fin)
+
+
+def print_live(live_stats):
+    """Print the percentiles of the results crawled so far."""
+    print('Percentiles of the first %d runners' % len(live_stats))
+    for percentile, time in live_stats.generate_percentiles():
+        print('\t%s%%\t%s' % (percentile, time))
+    sys.stdout.flush()
+
+
+def format_metrics(metrics, style='text'):
+    """Crawl metrics as ``text``, ``json`` or ``prometheus``."""
+    if style == 'json':
+        return metrics.to_json(indent=2)
+    if style == 'prometheus':
+        return metrics.to_prometheus()
+    return metrics.format()
+
+
+def parse_event_ids(arg):
+    """Event IDs from a comma separated list of IDs or ``first-last`` ranges.
+    """
+    event_ids = set()
+    for chunk in arg.split(','):
+        if '-' in chunk:
+            first, last = chunk.split('-')
+            event_ids.update(range(int(first), int(last) + 1))
+        else:
+            event_ids.add(int(chunk))
+    return sorted(event_ids)
+
+
+def report(event_id, filename):
+    results = load_results(filename)
+    percentiles = stats.generate_percentiles(results)
+
+    print('Percentage of completing runners within a certain time')
+    for percentile, time in percentiles:
+        print('\t%s%%\t%s' % (percentile, time))
+
+
+def report_groups(filename, by, value='time'):
+    """Print the count, mean and percentiles of each group in an event.
+    """
+    from . import analytics
+
+    with open(filename, 'r', newline='') as fin:
+        table = analytics.ResultTable.load(fin)
+
+    print('%s by %s' % (value.capitalize(), by))
+    for label, group in sorted(analytics.summarise(table, by, value).items()):
+        print('%s\t%d runners\tmean %s' % (
+            label or '(none)', group.count, stats.to_time(int(group.mean)),
+        ))
+        for percentile, time in group.percentiles:
+            print('\t%s%%\t%s' % (percentile, time))
+
+
+def load_results(filename):
+    """Load a CSV's results, via the binary cache if it's current.
+
+    The cache sits alongside the CSV, so ``race-<id>.csv`` is cached in
+    :func:`~sport_systems.binary.path_for` the event. A cache that can't
+    be read is rebuilt from the CSV, and one that can't be written is
+    done without.
+    """
+    from . import csv_handler
+
+    cache_filename = os.path.splitext(filename)[0] + binary.EXTENSION
+
+    try:
+        if os.path.getmtime(cache_filename) >= os.path.getmtime(filename):
+            with open(cache_filename, 'rb') as fin:
+                return binary.load(fin)
+    except (OSError, ValueError):
+        # Missing or damaged, binary.FormatError is a ValueError
+        pass
+
+    with open(filename, 'r') as fin:
+        results = csv_handler.build_results(fin)
+
+    # Cache the parsed results so repeat runs can skip the CSV. Written
+    # to a temporary file first, as another run may be reading it
+    try:
+        out = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(os.path.abspath(cache_filename)),
+            delete=False,
+        )
+    except OSError:
+        # Not writable, so go without
+        return results
+    try:
+        with out:
+            binary.dump(results, out)
+        os.replace(out.name, cache_filename)
+    except OSError:
+        os.remove(out.name)
+    return results
+
+
+def export(event_id, filename, style='json', output=None):
+    """Write an event's results out in another format.
+
+    :arg str style: ``json`` for every row of the CSV as typed
+        :class:`~sport_systems.csv_handler.Row` objects, ``binary`` for
+        the :mod:`~sport_systems.binary` format of its finishers, or
+        ``archive`` to load it into an
+        :class:`~sport_systems.archive.Archive`.
+    :arg str output: Where to write to. Defaults to stdout for ``json``,
+        :func:`~sport_systems.binary.path_for` the event for ``binary``
+        and :data:`DEFAULT_ARCHIVE` for ``archive``.
+    """
+    from . import csv_handler
+
+    if style == 'archive':
+        from . import archive
+
+        results_archive = archive.Archive(output or DEFAULT_ARCHIVE)
+        archive_event(results_archive, event_id, filename)
+        results_archive.close()
+        return
+
+    with open(filename, 'r', newline='') as fin:
+        if style == 'binary':
+            results = csv_handler.build_results(fin)
+        else:
+            rows = csv_handler.read_rows(fin)
+
+    if style == 'binary':
+        with open(output or binary.path_for(event_id), 'wb') as out:
+            binary.dump(results, out)
+        return
+
+    data = [row._asdict() for row in rows]
+    if output is None:
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(output, 'w') as out:
+            json.dump(data, out, indent=2)
+
+
+def get_parser():
+    """The :mod:`argparse` parser of the command line."""
+    arg_parser = argparse.ArgumentParser(
+        prog='sport-systems', description='Crawl SportsSystems results.',
+    )
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    crawl_parser = commands.add_parser(
+        'crawl', help='Fetch events and report their percentiles.',
+    )
+    crawl_parser.add_argument(
+        'event_ids', type=parse_event_ids,
+        help='An event ID, or a comma separated list of IDs and '
+             'first-last ranges to crawl over one pool of processes.',
+    )
+    crawl_parser.add_argument(
+        '--overwrite', action='store_true',
+        help='Crawl from scratch, even if the event has been crawled.',
+    )
+    crawl_parser.add_argument(
+        '--incremental', action='store_true',
+        help='Only fetch the pages that changed since the last crawl.',
+    )
+    crawl_parser.add_argument(
+        '--metrics', nargs='?', const='text',
+        choices=['text', 'json', 'prometheus'],
+        help='Print crawl metrics once the crawl finishes.',
+    )
+    crawl_parser.add_argument(
+        '--live', action='store_true',
+        help='Print percentiles while the crawl is running.',
+    )
+    crawl_parser.add_argument(
+        '--cache', nargs='?', const=DEFAULT_CACHE_DIR, metavar='DIR',
+        help='Keep downloaded pages in DIR (default %(const)s).',
+    )
+    crawl_parser.add_argument(
+        '--cache-ttl', type=float, default=DEFAULT_CACHE_TTL,
+        metavar='SECONDS',
+        help='How long cached pages stay fresh (default %(default)d).',
+    )
+    crawl_parser.add_argument(
+        '--cache-max-size', type=int, metavar='BYTES',
+        help='Evict the least recently used pages to keep the cache '
+             'within BYTES.',
+    )
+    crawl_parser.add_argument(
+        '--archive', nargs='?', const=DEFAULT_ARCHIVE, metavar='PATH',
+        help='Index crawled events in an archive (default %(const)s).',
+    )
+
+    stats_parser = commands.add_parser(
+        'stats', help="Report the percentiles of a crawled event.",
+    )
+    stats_parser.add_argument('event_id', type=int)
+    stats_parser.add_argument(
+        '--file', help='The CSV to read (default race-<EVENT_ID>.csv).',
+    )
+    stats_parser.add_argument(
+        '--by', choices=['cat', 'team', 'grade'],
+        help='Report each category, team or grade separately.',
+    )
+    stats_parser.add_argument(
+        '--value', default='time', choices=['time', 'chip', 'delta'],
+        help='With --by, the gun time, chip time or the difference.',
+    )
+
+    export_parser = commands.add_parser(
+        'export', help='Write a crawled event out in another format.',
+    )
+    export_parser.add_argument('event_id', type=int)
+    export_parser.add_argument(
+        '--file', help='The CSV to read (default race-<EVENT_ID>.csv).',
+    )
+    export_parser.add_argument(
+        '--format', dest='style', default='json',
+        choices=['json', 'binary', 'archive'],
+    )
+    export_parser.add_argument('--output', '-o', metavar='PATH')
+    return arg_parser
+
+
+def main(argv=None):
+    """Run the command line, returning its exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    argv = list(argv)
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith('-'):
+        # python go.py <EVENT_ID> ...
+        argv.insert(0, 'crawl')
+    arg_parser = get_parser()
+    options = arg_parser.parse_args(argv)
+    if (options.command == 'crawl' and options.incremental and
+            (options.live or options.metrics)):
+        arg_parser.error('--incremental can\'t be used with --live or '
+                         '--metrics')
+
+    if options.command == 'stats':
+        filename = options.file or csv_path(options.event_id)
+        if not os.path.exists(filename):
+            print('%s not found, crawl the event first' % filename,
+                  file=sys.stderr)
+            return 1
+        if options.by is not None:
+            report_groups(filename, options.by, options.value)
+        else:
+            report(options.event_id, filename)
+        return 0
+
+    if options.command == 'export':
+        filename = options.file or csv_path(options.event_id)
+        export(options.event_id, filename, options.style, options.output)
+        return 0
+
+    response_cache = results_archive = None
+    if options.cache is not None:
+        from . import cache
+
+        response_cache = cache.ResponseCache(
+            options.cache, ttl=options.cache_ttl,
+            max_size=options.cache_max_size,
+        )
+    if options.archive is not None:
+        from . import archive
+
+        results_archive = archive.Archive(options.archive)
+
+    if len(options.event_ids) > 1:
+        return batch(options.event_ids, options.overwrite, response_cache,
+                     results_archive)
+    return crawl(options.event_ids[0], options.overwrite,
+                 options.incremental, options.metrics, options.live,
+                 response_cache, results_archive)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
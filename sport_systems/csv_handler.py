@@ -1,54 +1,384 @@
+"""Write crawled results to CSV and load them back.
+
+Loading a CSV only needs :mod:`~sport_systems.stats`, so the spiders and
+the XML parser are imported by the functions that crawl, keeping the
+command line's ``stats`` path quick to start.
+"""
+from collections import namedtuple
 import csv
-import datetime
+import heapq
+import io
+import itertools
+import os
+
+from . import binary
+from .stats import NOT_FINISHED, Results, parse_seconds, parse_times
+
+#: The columns written by :func:`build`, in order.
+FIELDNAMES = ['pos', 'time', 'name', 'team', 'cat', 'num', 'chip', 'grade']
+
+
+class Row(namedtuple('Row', FIELDNAMES + ['status'])):
+    """A typed row of the CSV written by :func:`build`.
+
+    ``pos`` is an int, ``time`` and ``chip`` are in seconds, and all
+    three are ``None`` when the cell is empty or not a number. The rest
+    of :data:`FIELDNAMES` are strings. ``status`` is ``'finished'`` for
+    rows with a finish time, the marker for runners in
+    :data:`~sport_systems.stats.NOT_FINISHED`, otherwise ``'unknown'``.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_cells(cls, cells, seconds=None):
+        """A row from the string cells of a CSV row or
+        :func:`extract_rows` tuple. Missing trailing cells are empty.
+
+        :arg int seconds: The already parsed finish time, if it has been.
+        """
+        if len(cells) < len(FIELDNAMES):
+            cells = tuple(cells) + ('',) * (len(FIELDNAMES) - len(cells))
+        pos, time, name, team, cat, num, chip, grade = cells[:len(FIELDNAMES)]
+        if seconds is None:
+            seconds = parse_seconds(time)
+        if seconds is not None:
+            status = 'finished'
+        else:
+            marker = time.strip().upper()
+            status = marker if marker in NOT_FINISHED else 'unknown'
+        return cls(
+            int(pos) if pos.isdigit() else None, seconds, name, team, cat,
+            num, parse_seconds(chip), grade, status,
+        )
+
+    @property
+    def finished(self):
+        return self.time is not None
+
+
+def read_rows(fin):
+    """The rows of the CSV written by :func:`build` as :class:`Row`.
+
+    Times are parsed a column at a time by
+    :func:`~sport_systems.stats.parse_times`, and rows that are blank or
+    malformed come back with ``None`` for what couldn't be read rather
+    than raising.
+
+    :arg file fin: The CSV, opened in text mode.
+    """
+    cells = _data_rows(fin)
+    times = parse_times([row[1] if len(row) > 1 else '' for row in cells])
+    return [
+        Row.from_cells(row, seconds) for row, seconds in zip(cells, times)
+    ]
+
+
+def _data_rows(fin):
+    """The non-empty rows of the CSV, without its header."""
+    return [
+        row for row in csv.reader(fin, delimiter='\t')
+        if row and row[0] != 'pos'
+    ]
+
+
+def extract_rows(content):
+    """Parse a page of results into compact tuples of :data:`FIELDNAMES`.
+
+    Used as the spider's ``processor`` so pages are parsed inside the
+    download workers and only these tuples are sent to the callback.
+    """
+    from . import parser
+
+    return [
+        tuple(cell.get(name, '') for name in FIELDNAMES)
+        for cell in parser.parse(content)
+    ]
+
+
+def _pos(row):
+    """A row's ``pos`` as an int, ``None`` if it hasn't got one."""
+    try:
+        return int(row[0])
+    except (IndexError, ValueError):
+        return None
+
+
+class OrderedWriter(object):
+    """Write pages of rows to a CSV in ``pos`` order, in large chunks.
+
+    Pages arrive in whatever order the download workers finish them. A
+    page is held back until the pages before it have been written, so
+    the output comes out sorted without a full sort, and rows are
+    buffered so the stream is written and flushed a chunk at a time.
+
+    :arg file out: A file like object to write to.
+    :arg int window: The most pages to hold back waiting for a missing
+        one. Once exceeded the gap is skipped, and if the page turns up
+        later it is written out of order.
+    :arg int chunk_size: Roughly how many characters to buffer between
+        writes.
+    :arg callable on_flush: An optional function called with the keys
+        passed to :meth:`write` of the pages in each chunk, once the
+        chunk has been written and flushed.
+    :arg int last: The last ``pos`` already in ``out``, when appending to
+        a CSV with some of its pages in.
+    """
+    def __init__(self, out, window=64, chunk_size=1 << 16, on_flush=None,
+                 last=0):
+        self.out = out
+        self.window = window
+        self.chunk_size = chunk_size
+        self.on_flush = on_flush
+
+        #: Whether everything written so far is in ``pos`` order.
+        self.in_order = True
+        #: The number of writes made to ``out``.
+        self.writes = 0
+
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, delimiter='\t')
+        # (first pos, arrival, rows, key) of the pages held back
+        self._pending = []
+        self._counter = itertools.count()
+        self._unnumbered = []
+        # The keys of the pages in the buffer
+        self._keys = []
+        self._last = last
+
+    def writerow(self, row):
+        """Write a single row straight away, e.g. the header."""
+        self._writer.writerow(row)
+        self._flush()
 
-from .spider import SportSystemResultsSpider
-from . import parser
-from .stats import Result
+    def write(self, rows, key=None):
+        """Add a page of rows.
 
+        :arg key: Identifies the page to ``on_flush``.
+        """
+        numbered = [_pos(row) for row in rows]
+        numbered = [pos for pos in numbered if pos is not None]
+        if not numbered:
+            self._unnumbered.append((rows, key))
+            return
 
-def build(event_id, out):
+        heapq.heappush(
+            self._pending, (numbered[0], next(self._counter), rows, key)
+        )
+        self._drain(self._last + 1)
+        while len(self._pending) > self.window:
+            # Stop waiting for the missing page
+            self._drain(self._pending[0][0])
+
+    def _drain(self, until):
+        """Emit held back pages that start at or before ``until``."""
+        while self._pending and self._pending[0][0] <= until:
+            start, _, rows, key = heapq.heappop(self._pending)
+            self._emit(start, rows, key)
+            until = self._last + 1
+
+    def _emit(self, start, rows, key):
+        if start < self._last:
+            self.in_order = False
+        self._writer.writerows(rows)
+        self._keys.append(key)
+        for row in reversed(rows):
+            pos = _pos(row)
+            if pos is not None:
+                self._last = max(self._last, pos)
+                break
+        if self._buffer.tell() >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        data = self._buffer.getvalue()
+        if data:
+            self.out.write(data)
+            self.out.flush()
+            self.writes += 1
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if self._keys:
+            keys, self._keys = self._keys, []
+            if self.on_flush is not None:
+                self.on_flush(keys)
+
+    def close(self):
+        """Write everything still held back, in order, and flush.
+
+        Doesn't close ``out``.
+        """
+        while self._pending:
+            self._drain(self._pending[0][0])
+        for rows, key in self._unnumbered:
+            self._writer.writerows(rows)
+            self._keys.append(key)
+        self._unnumbered = []
+        self._flush()
+
+
+def build(event_id, out, engine='process', live=None, archive=None,
+          **spider_kwargs):
     """Fetch the data and write it to the given stream.
 
     :arg int event_id: The event ID we're interested in.
     :arg file out: A file like object to write our CSV to.
+    :arg str engine: The crawl engine to use, see
+        :func:`sport_systems.spider.get_results_spider`.
+    :arg live: An optional :class:`~sport_systems.live.LiveReport` to
+        feed each page of rows as it arrives.
+    :arg archive: An optional :class:`~sport_systems.archive.Archive` to
+        load the event's rows into, replacing any it already had once
+        the crawl finishes.
+    :arg spider_kwargs: Passed through to the spider, e.g. ``N`` or
+        ``concurrency``.
+    :returns: The finished spider, for its ``dead_letters`` and
+        ``metrics``.
     """
-    writer = csv.DictWriter(
-        out,
-        fieldnames=[
-            'pos', 'time', 'name', 'team', 'cat', 'num', 'chip', 'grade',
-        ],
-        delimiter='\t',
-        extrasaction='ignore'
+    writer = OrderedWriter(out)
+    writer.writerow(FIELDNAMES)
+
+    # The rows have already been parsed by the download workers, and the
+    # writer (which lives in the callback process) is flushed once
+    # they've all arrived
+    archiving = []
+
+    def callback(rows):
+        writer.write(rows)
+        if live is not None:
+            live.add(rows)
+        if archive is not None:
+            # Replaced within one transaction, from the callback process
+            if not archiving:
+                archive.begin(event_id)
+                archiving.append(True)
+            archive.add(event_id, rows)
+
+    def on_finish():
+        writer.close()
+        if live is not None:
+            live.close()
+        if archive is not None and archiving:
+            archive.commit()
+
+    from .spider import get_results_spider
+
+    spider_class = get_results_spider(engine)
+    spider = spider_class(
+        event_id=event_id, callback=callback, on_finish=on_finish,
+        processor=extract_rows, **spider_kwargs
     )
-    writer.writeheader()
+    spider.go()
+    return spider
+
+
+def _extract_page(content):
+    """A page's total count and :func:`extract_rows`."""
+    from . import parser
+
+    return parser.extract_total(content), extract_rows(content)
+
+
+class _AppendFile(object):
+    """A file that's only open while a chunk is written to it.
+
+    Lets :func:`build_batch` write any number of CSVs at once without
+    running out of file descriptors. The first write truncates it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._mode = 'w'
+
+    def write(self, data):
+        with open(self.path, self._mode, newline='') as out:
+            out.write(data)
+        self._mode = 'a'
+
+    def flush(self):
+        pass
+
+
+def build_batch(event_ids, directory='.', **spider_kwargs):
+    """Fetch several events over one pool of processes.
+
+    Each event is written to ``race-<event_id>.csv.part`` in
+    ``directory``, and only renamed to ``race-<event_id>.csv`` once the
+    whole batch has been crawled, so an interrupted batch never leaves a
+    complete looking CSV behind.
+
+    :arg list event_ids: The event IDs we're interested in.
+    :arg str directory: Where to write the CSV files.
+    :arg spider_kwargs: Passed through to the
+        :class:`~sport_systems.batch.SportSystemBatchSpider`.
+    :returns: A dict of events that couldn't be crawled, mapped to the
+        error raised, or a :class:`~sport_systems.retry.PagesFailed` for
+        events missing pages. Their CSV files aren't written, so they're
+        crawled again next time.
+    """
+    from .batch import SportSystemBatchSpider
+    from .checkpoint import partial_path
+
+    paths = {
+        event_id: os.path.join(directory, 'race-%d.csv' % event_id)
+        for event_id in event_ids
+    }
+    # Live in the callback process. Each event's writer is created with
+    # its first page and closed once it has every row, so only the
+    # events in progress are buffered
+    writers, counts = {}, {}
 
-    # Create a closure with out CSV writer as our callback
     def callback(result):
-        for cell in parser.parse(result.content):
-            writer.writerow(cell)
-        # As this callback runs in a distinct thread, flush the stream
-        # now
-        out.flush()
+        event_id, (total, rows) = result
+        writer = writers.get(event_id)
+        if writer is None:
+            out = _AppendFile(partial_path(paths[event_id]))
+            writer = writers[event_id] = OrderedWriter(out, window=16)
+            writer.writerow(FIELDNAMES)
+            counts[event_id] = 0
+        writer.write(rows)
+        counts[event_id] += len(rows)
+        if total is not None and counts[event_id] >= total:
+            writer.close()
 
-    spider = SportSystemResultsSpider(event_id=event_id, callback=callback)
+    def on_finish():
+        for writer in writers.values():
+            writer.close()
+
+    spider = SportSystemBatchSpider(
+        event_ids=event_ids, callback=callback, on_finish=on_finish,
+        processor=_extract_page, **spider_kwargs
+    )
     spider.go()
 
+    for event_id, path in paths.items():
+        if event_id not in spider.failed_events:
+            os.replace(partial_path(path), path)
+        elif os.path.exists(partial_path(path)):
+            os.remove(partial_path(path))
+    return spider.failed_events
 
-def build_results(fin):
-    """Build a sorted result set from an input stream."""
-    reader = csv.reader(fin, delimiter='\t')
-    results = []
 
-    for row in reader:
-        if row[0] == 'pos':
-            # Header row, skip it
-            continue
-        hour, mins, seconds = [int(chunk) for chunk in row[1].split(':')]
+def build_results(fin, names=None):
+    """Build a sorted result set from an input stream.
+
+    :arg file fin: The CSV written by :func:`build`, or a file in the
+        :mod:`sport_systems.binary` format opened in binary mode.
+    :arg names: An optional :class:`~sport_systems.stats.NameTable` to
+        share between several result sets. (Not used by binary files.)
+    :returns: A sorted :class:`~sport_systems.stats.Results` of the
+        finishers. Rows without a finish time, e.g. ``DNF``, are left
+        out rather than failing the load.
+    """
+    if isinstance(fin, (io.RawIOBase, io.BufferedIOBase)):
+        return binary.load(fin)
 
-        results.append(Result(
-            time=datetime.time(hour, mins, seconds),
-            name=row[2],
-        ))
+    rows = _data_rows(fin)
+    times = parse_times([row[1] if len(row) > 2 else '' for row in rows])
+    results = Results(names=names)
+    append = results.append
+    for row, seconds in zip(rows, times):
+        # Runners who didn't finish, and malformed rows, are left out
+        if seconds is not None:
+            append(seconds, row[2])
 
-    results.sort(key=lambda item: item.time)
+    results.sort()
     return results
@@ -0,0 +1,55 @@
+"""SQLite connections that are safe to use across the spiders' forks.
+
+The response cache and the results archive are both handed to spiders,
+and so used from download or callback processes forked after they were
+built. A SQLite connection mustn't be shared across a fork, so each
+process opens its own on first use.
+"""
+import os
+import sqlite3
+
+
+def connect(path, schema, **kwargs):
+    """Open a database in WAL mode, so processes can share it, creating
+    its tables.
+
+    :arg str path: The database file, created if it doesn't exist.
+    :arg str schema: SQL run to create any missing tables.
+    :arg kwargs: Passed on to ``sqlite3.connect``.
+    """
+    db = sqlite3.connect(path, timeout=30, **kwargs)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(schema)
+    return db
+
+
+class ProcessLocalDB(object):
+    """A SQLite connection opened on first use in each process.
+
+    Subclasses implement :meth:`_connect`. Pickling drops the
+    connection, so it's opened again wherever the object ends up.
+    """
+    _db = None
+    _pid = None
+
+    def _connect(self):
+        """A new connection, see :func:`connect`."""
+        raise NotImplementedError()
+
+    @property
+    def db(self):
+        if self._db is None or self._pid != os.getpid():
+            self._db = self._connect()
+            self._pid = os.getpid()
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_db', None)
+        state.pop('_pid', None)
+        return state
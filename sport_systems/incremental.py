@@ -0,0 +1,232 @@
+"""Incremental re-crawls of events that are still publishing results.
+
+Alongside an event's CSV we keep a manifest recording, for each page of
+results, the ``ETag`` and ``Last-Modified`` headers the server sent and a
+hash of the page's rows. A re-crawl sends conditional requests for the
+pages we already have, only parses those that changed (or lie past the
+previous total) and merges them with the rows already on disk.
+"""
+import csv
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from . import csv_handler
+from .spider import get_results_spider, pos_start
+
+
+class Manifest(object):
+    """What was known about each page of an event after the last crawl.
+
+    :arg int page_size: The page size the event was crawled with.
+    :arg int total: The total count the server reported.
+    :arg dict pages: Maps each page's ``posStart`` to a dict of its
+        ``etag``, ``last_modified``, ``digest`` and number of ``rows``.
+    """
+    def __init__(self, page_size=None, total=0, pages=None):
+        self.page_size = page_size
+        self.total = total
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest, or an empty one if there isn't one yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as fin:
+            data = json.load(fin)
+        pages = {int(pos_start): page
+                 for pos_start, page in data['pages'].items()}
+        return cls(data['page_size'], data['total'], pages)
+
+    def save(self, path):
+        """Atomically write the manifest to the given path."""
+        data = {
+            'page_size': self.page_size,
+            'total': self.total,
+            'pages': {str(pos_start): page
+                      for pos_start, page in sorted(self.pages.items())},
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as out:
+            json.dump(data, out, indent=1)
+        os.replace(tmp_path, path)
+
+    def headers_for(self, pos_start):
+        """Conditional request headers for a page, if we've seen it."""
+        page = self.pages.get(pos_start)
+        if page is None:
+            return None
+
+        headers = {}
+        if page.get('etag'):
+            headers['If-None-Match'] = page['etag']
+        if page.get('last_modified'):
+            headers['If-Modified-Since'] = page['last_modified']
+        return headers or None
+
+
+def manifest_path(csv_path):
+    """Where the manifest for an event's CSV is kept."""
+    return os.path.splitext(csv_path)[0] + '.pages.json'
+
+
+def rows_digest(content):
+    """A hash of a page's rows, ignoring the ``<rows>`` header.
+
+    The header carries the event's total, which changes every time a
+    result is added, so including it would make every page look changed.
+    """
+    start = content.find(b'<row ')
+    return hashlib.sha1(content[start:] if start != -1 else b'').hexdigest()
+
+
+class IncrementalMixin(object):
+    """Conditional fetching of results pages against a :class:`Manifest`.
+
+    Each response is reduced, in the download worker, to a page dict
+    with a ``rows`` entry that is ``None`` if the page is unchanged.
+    """
+    def __init__(self, manifest, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+        if self.page_size is None:
+            # Page boundaries have to match the previous crawl's
+            self.page_size = manifest.page_size
+
+    def request_headers(self, url):
+        return self.manifest.headers_for(pos_start(url))
+
+    def split_url(self, url):
+        # Pages must stay on the manifest's boundaries
+        return [url]
+
+    def process_response(self, response):
+        start = pos_start(response.url)
+        known = self.manifest.pages.get(start, {})
+        headers = response.headers
+        page = {
+            'pos_start': start,
+            'etag': headers.get('ETag', known.get('etag')),
+            'last_modified': headers.get(
+                'Last-Modified', known.get('last_modified')
+            ),
+            'digest': known.get('digest'),
+            'rows': None,
+        }
+
+        if response.status_code != 304:
+            digest = rows_digest(response.content)
+            if digest != known.get('digest'):
+                page['digest'] = digest
+                page['rows'] = csv_handler.extract_rows(response.content)
+        return page
+
+
+def get_incremental_spider(engine='process'):
+    """The incremental results spider class for the given crawl engine."""
+    return get_results_spider(engine, IncrementalMixin, 'Incremental')
+
+
+def _read_pages(csv_path, manifest):
+    """Split the rows of a CSV written by :func:`update` into its pages.
+
+    Returns ``None`` if the file doesn't match the manifest.
+    """
+    with open(csv_path, 'r', newline='') as fin:
+        rows = [tuple(row) for row in csv.reader(fin, delimiter='\t')]
+    rows = rows[1:]
+
+    pages, offset = {}, 0
+    for start, page in sorted(manifest.pages.items()):
+        pages[start] = rows[offset:offset + page['rows']]
+        offset += page['rows']
+
+    if offset != len(rows):
+        return None
+    return pages
+
+
+def update(event_id, csv_path, engine='process', **spider_kwargs):
+    """Bring an event's CSV up to date, fetching only what changed.
+
+    The CSV is written in page order, then atomically replaced along
+    with its manifest. Pages that fail to download keep their previous
+    rows.
+
+    :arg int event_id: The event ID we're interested in.
+    :arg str csv_path: The event's CSV, created if it doesn't exist.
+    :arg str engine: The crawl engine to use.
+    :arg spider_kwargs: Passed through to the spider.
+    :returns: A dict counting the ``changed``, ``unchanged`` and
+        ``missing`` pages, along with the spider's ``dead_letters`` for
+        the pages that failed for good.
+    """
+    path = manifest_path(csv_path)
+    manifest, old_pages = Manifest(), {}
+    if os.path.exists(csv_path):
+        manifest = Manifest.load(path)
+        old_pages = _read_pages(csv_path, manifest)
+        page_size = spider_kwargs.get('page_size') or manifest.page_size
+        if old_pages is None or page_size != manifest.page_size:
+            # Not written by us, or paged differently, start afresh
+            manifest, old_pages = Manifest(), {}
+
+    fetched = {}
+    with tempfile.TemporaryFile() as spool:
+        # The callback may run in its own process, so pages are passed
+        # back to us through a spool file
+        def callback(page):
+            pickle.dump(page, spool)
+            spool.flush()
+
+        spider_class = get_incremental_spider(engine)
+        spider = spider_class(
+            manifest=manifest, event_id=event_id, callback=callback,
+            **spider_kwargs
+        )
+        spider.go()
+
+        spool.seek(0)
+        while True:
+            try:
+                page = pickle.load(spool)
+            except EOFError:
+                break
+            fetched[page.pop('pos_start')] = page
+
+    summary = {'changed': 0, 'unchanged': 0, 'missing': 0}
+    updated = Manifest(spider.page_size, spider.total_count)
+    rows = []
+    for start in range(0, spider.total_count, spider.page_size):
+        page = fetched.get(start)
+        if page is None:
+            summary['missing'] += 1
+            if start in old_pages:
+                updated.pages[start] = manifest.pages[start]
+                rows.extend(old_pages[start])
+            continue
+
+        page_rows = page.pop('rows')
+        if page_rows is None:
+            summary['unchanged'] += 1
+            page_rows = old_pages[start]
+        else:
+            summary['changed'] += 1
+        page['rows'] = len(page_rows)
+        updated.pages[start] = page
+        rows.extend(page_rows)
+
+    directory = os.path.dirname(os.path.abspath(csv_path))
+    with tempfile.NamedTemporaryFile(
+            'w', dir=directory, newline='', delete=False) as out:
+        writer = csv.writer(out, delimiter='\t')
+        writer.writerow(csv_handler.FIELDNAMES)
+        writer.writerows(rows)
+    os.replace(out.name, csv_path)
+    updated.save(path)
+
+    summary['dead_letters'] = spider.dead_letters
+    return summary
@@ -0,0 +1,55 @@
+"""Percentiles that update while a crawl is still running.
+
+During a live event waiting for the whole crawl, then reading the CSV
+back and sorting it, delays the first readout. A :class:`LiveReport` is
+instead fed each page of rows by the build callback, counts their times
+into a :class:`~sport_systems.stats.LiveStats` and publishes it every
+few seconds, starting with the first page.
+"""
+import time
+
+from .stats import LiveStats, parse_seconds
+
+
+def row_seconds(row):
+    """The finish time, in seconds, of a row of
+    :data:`~sport_systems.csv_handler.FIELDNAMES`, ``None`` if it has
+    none."""
+    try:
+        return parse_seconds(row[1])
+    except IndexError:
+        return None
+
+
+class LiveReport(object):
+    """Publish running stats of the rows seen so far.
+
+    Runs wherever the spider's callback does, i.e. in the callback
+    process of :class:`~sport_systems.spider.Spider`.
+
+    :arg callable publish: Called with the :class:`LiveStats` after the
+        first page and then at most every ``interval`` seconds.
+    :arg float interval: The least number of seconds between readouts.
+    """
+    def __init__(self, publish, interval=5.0):
+        self.publish = publish
+        self.interval = interval
+        self.stats = LiveStats()
+        self._published = None
+
+    def add(self, rows):
+        """Count a page of rows, publishing if a readout is due."""
+        for row in rows:
+            seconds = row_seconds(row)
+            if seconds is not None:
+                self.stats.add(seconds)
+
+        now = time.monotonic()
+        if self._published is None or now - self._published >= self.interval:
+            self._published = now
+            self.publish(self.stats)
+
+    def close(self):
+        """Publish the final stats."""
+        self._published = time.monotonic()
+        self.publish(self.stats)
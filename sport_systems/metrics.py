@@ -0,0 +1,294 @@
+"""Instrumentation for crawls: stage timings, queue depths and throughput.
+
+Every spider times the stages a page goes through:
+
+``fetch``
+    The request, including any wait for the rate limiter.
+``parse``
+    Running ``process_response``, i.e. the spider's ``processor``.
+``backpressure``
+    Waiting for room in the spider's memory budget, if it has one (only
+    for :class:`~sport_systems.spider.Spider`).
+``queue``
+    Waiting in, and being pickled through, the results queue to the
+    callback process (only for :class:`~sport_systems.spider.Spider`).
+``write``
+    Running the callback, e.g. writing rows out as CSV.
+
+Together with samples of the queue depths taken during the crawl these
+show whether a slow crawl is bound by the network, parsing, writing or
+IPC.
+"""
+import bisect
+import contextlib
+import json
+import threading
+import time
+
+from .session import LATENCY_BUCKETS
+
+#: Upper bounds, in milliseconds, of the stage timing histograms. The
+#: final bucket catches everything slower.
+STAGE_BUCKETS = (0.1, 0.5, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class StageTimings(object):
+    """Time spent in each stage of a crawl by one process.
+
+    Each stage keeps a count, total, maximum and histogram of its
+    timings, so timings from several processes can be merged.
+    """
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage, seconds):
+        """Record ``seconds`` spent in ``stage``."""
+        timing = self.stages.get(stage)
+        if timing is None:
+            timing = self.stages[stage] = {
+                'count': 0, 'total': 0.0, 'max': 0.0,
+                'histogram': [0] * (len(STAGE_BUCKETS) + 1),
+            }
+        timing['count'] += 1
+        timing['total'] += seconds
+        timing['max'] = max(timing['max'], seconds)
+        index = bisect.bisect_left(STAGE_BUCKETS, seconds * 1000)
+        timing['histogram'][index] += 1
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """A context manager recording the time spent in its body."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def merge(self, other):
+        """Add the timings of another :class:`StageTimings` to these."""
+        for stage, theirs in other.stages.items():
+            mine = self.stages.get(stage)
+            if mine is None:
+                self.stages[stage] = {
+                    key: list(value) if key == 'histogram' else value
+                    for key, value in theirs.items()
+                }
+                continue
+            mine['count'] += theirs['count']
+            mine['total'] += theirs['total']
+            mine['max'] = max(mine['max'], theirs['max'])
+            mine['histogram'] = [
+                a + b for a, b in zip(mine['histogram'], theirs['histogram'])
+            ]
+        return self
+
+    def as_dict(self):
+        labels = ['<=%gms' % bound for bound in STAGE_BUCKETS]
+        labels.append('>%gms' % STAGE_BUCKETS[-1])
+        return {
+            stage: {
+                'count': timing['count'],
+                'total': timing['total'],
+                'mean': timing['total'] / timing['count'],
+                'max': timing['max'],
+                'histogram': dict(zip(labels, timing['histogram'])),
+            }
+            for stage, timing in sorted(self.stages.items())
+        }
+
+
+class QueueSampler(threading.Thread):
+    """Sample the depth of some queues at a regular interval.
+
+    :arg dict queues: Maps a name to each queue to sample, anything with
+        a ``qsize()`` method.
+    :arg float interval: Seconds between samples.
+    """
+    def __init__(self, queues, interval=0.5):
+        super().__init__()
+        self.daemon = True
+        self.queues = queues
+        self.interval = interval
+        #: ``(seconds since start, {name: depth})`` tuples.
+        self.samples = []
+        self._start = time.monotonic()
+        self._stopped = threading.Event()
+
+    def sample(self):
+        """Record the current depth of each queue."""
+        depths = {}
+        for name, queue in self.queues.items():
+            try:
+                depths[name] = queue.qsize()
+            except NotImplementedError:
+                # multiprocessing queues on macOS
+                continue
+        self.samples.append((time.monotonic() - self._start, depths))
+
+    def run(self):
+        self._start = time.monotonic()
+        while True:
+            self.sample()
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        # Always finish on a final sample
+        self.sample()
+
+
+class CrawlMetrics(object):
+    """A summary of a finished crawl.
+
+    :arg FetchStats fetch_stats: The combined request stats.
+    :arg StageTimings timings: The combined stage timings.
+    :arg list queue_samples: The samples taken by a :class:`QueueSampler`.
+    :arg float elapsed: The crawl's wall clock duration in seconds.
+    :arg int dead_letters: The number of pages that failed for good.
+    """
+    def __init__(self, fetch_stats, timings, queue_samples, elapsed,
+                 dead_letters=0):
+        self.fetch_stats = fetch_stats
+        self.timings = timings
+        self.queue_samples = queue_samples
+        self.elapsed = elapsed
+        self.dead_letters = dead_letters
+
+    def queue_depths(self):
+        """The maximum and mean depth seen for each queue."""
+        series = {}
+        for _, depths in self.queue_samples:
+            for name, depth in depths.items():
+                series.setdefault(name, []).append(depth)
+        return {
+            name: {'max': max(values), 'mean': sum(values) / len(values)}
+            for name, values in sorted(series.items())
+        }
+
+    def summary(self):
+        """The metrics as a JSON serialisable dict."""
+        elapsed = self.elapsed or float('nan')
+        fetch_stats = self.fetch_stats
+        return {
+            'elapsed': self.elapsed,
+            'pages_per_second': fetch_stats.requests / elapsed,
+            'bytes_per_second': fetch_stats.bytes_received / elapsed,
+            'dead_letters': self.dead_letters,
+            'requests': fetch_stats.as_dict(),
+            'stages': self.timings.as_dict(),
+            'queues': self.queue_depths(),
+            'queue_samples': [
+                [round(seconds, 3), depths]
+                for seconds, depths in self.queue_samples
+            ],
+        }
+
+    def to_json(self, **kwargs):
+        """The :meth:`summary` as JSON."""
+        return json.dumps(self.summary(), **kwargs)
+
+    def to_prometheus(self, prefix='sport_systems_crawl'):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+            for suffix, labels, value in samples:
+                label_text = ','.join(
+                    '%s="%s"' % label for label in labels
+                )
+                if label_text:
+                    label_text = '{%s}' % label_text
+                lines.append('%s_%s%s%s %s' % (
+                    prefix, name, suffix, label_text, _number(value)
+                ))
+
+        def histogram(labels, bounds, counts, total):
+            samples, cumulative = [], 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                samples.append((
+                    '_bucket', labels + [('le', _number(bound / 1000))],
+                    cumulative,
+                ))
+            samples.append((
+                '_bucket', labels + [('le', '+Inf')], sum(counts)
+            ))
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, sum(counts)))
+            return samples
+
+        fetch_stats = self.fetch_stats
+        metric('duration_seconds', 'gauge', 'Wall clock time of the crawl.',
+               [('', [], self.elapsed)])
+        metric('requests_total', 'counter', 'Requests made by the workers.',
+               [('', [], fetch_stats.requests)])
+        metric('cache_hits_total', 'counter',
+               'Pages served from the response cache.',
+               [('', [], fetch_stats.cache_hits)])
+        metric('connections_opened_total', 'counter',
+               'Connections opened by the workers.',
+               [('', [], fetch_stats.connections_opened)])
+        metric('bytes_received_total', 'counter',
+               'Response body bytes, as sent over the wire.',
+               [('', [], fetch_stats.bytes_received)])
+        metric('dead_letters', 'gauge', 'Pages that failed for good.',
+               [('', [], self.dead_letters)])
+        metric('request_seconds', 'histogram', 'Request latency.',
+               histogram([], LATENCY_BUCKETS, fetch_stats.latency_histogram,
+                         fetch_stats.latency_total))
+
+        samples = []
+        for stage, timing in sorted(self.timings.stages.items()):
+            samples.extend(histogram(
+                [('stage', stage)], STAGE_BUCKETS, timing['histogram'],
+                timing['total'],
+            ))
+        metric('stage_seconds', 'histogram', 'Time spent in each stage.',
+               samples)
+
+        depths = self.queue_depths()
+        metric('queue_depth_max', 'gauge', 'The deepest each queue got.',
+               [('', [('queue', name)], depth['max'])
+                for name, depth in depths.items()])
+        metric('queue_depth_mean', 'gauge', 'The mean depth of each queue.',
+               [('', [('queue', name)], depth['mean'])
+                for name, depth in depths.items()])
+        return '\n'.join(lines) + '\n'
+
+    def format(self):
+        """A human readable summary."""
+        summary = self.summary()
+        requests = summary['requests']
+        lines = [
+            'Crawled %d pages (%d bytes) in %.2fs, %.1f pages/s' % (
+                requests['requests'], requests['bytes_received'],
+                self.elapsed, summary['pages_per_second'],
+            ),
+            'Connections opened %d, reused %d, cache hits %d, '
+            'dead letters %d' % (
+                requests['connections_opened'],
+                requests['connections_reused'], requests['cache_hits'],
+                self.dead_letters,
+            ),
+            'Stage\tcount\tmean ms\tmax ms\ttotal s',
+        ]
+        for stage, timing in summary['stages'].items():
+            lines.append('%s\t%d\t%.2f\t%.2f\t%.3f' % (
+                stage, timing['count'], timing['mean'] * 1000,
+                timing['max'] * 1000, timing['total'],
+            ))
+        lines.append('Queue\tmax\tmean')
+        for name, depth in summary['queues'].items():
+            lines.append('%s\t%d\t%.1f' % (name, depth['max'], depth['mean']))
+        return '\n'.join(lines)
+
+
+def _number(value):
+    """Format a number for Prometheus."""
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
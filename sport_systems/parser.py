@@ -1,9 +1,69 @@
+import io
+
 from bs4 import BeautifulSoup
+from lxml import etree
+
+#: The parsers :func:`parse` and :func:`extract_total` can use.
+BACKENDS = ('lxml', 'soup')
 
 
-def parse(xml):
+def parse(xml, backend='lxml'):
     """Parse an XML response from the SportsSystem API.
 
+    Rows are streamed with lxml's ``iterparse`` and discarded once
+    yielded, so memory use doesn't grow with the size of the page.
+
+    :param xml: This can either be a string, bytes or a file like
+        object.
+    :param str backend: One of :data:`BACKENDS`, ``soup`` to use
+        :func:`parse_soup` instead.
+    """
+    if _check_backend(backend) == 'soup':
+        return parse_soup(xml)
+    return _iterparse(xml)
+
+
+def _check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError('Unknown parser backend %r' % (backend, ))
+    return backend
+
+
+def _iterparse(xml):
+    encoding = None
+    if isinstance(xml, str):
+        # Already decoded, so ignore whatever the declaration claims
+        xml, encoding = xml.encode('utf-8'), 'utf-8'
+    if isinstance(xml, bytes):
+        xml = io.BytesIO(xml)
+
+    events = etree.iterparse(
+        xml, events=('end', ), tag='row', encoding=encoding, recover=True,
+        resolve_entities=False,
+    )
+    for _, row in events:
+        result = {
+            'id': row.get('id'),
+        }
+        for cell in row.iter('cell'):
+            name = _extract_name(cell.attrib)
+            value = ''.join(cell.itertext()).strip()
+            result[name] = value
+
+        yield result
+
+        # Free the row, and any siblings already processed
+        row.clear()
+        while row.getprevious() is not None:
+            del row.getparent()[0]
+
+
+def parse_soup(xml):
+    """Parse an XML response using BeautifulSoup.
+
+    Slower than lxml's ``iterparse``, but kept as an alternative, see
+    :func:`parse`.
+
     :param xml: This can either be a string or a file like object.
     """
     soup = BeautifulSoup(xml, 'xml')
@@ -13,15 +73,53 @@ def parse(xml):
             'id': row['id'],
         }
         for cell in row.find_all('cell'):
-            name = _extract_name(cell)
+            name = _extract_name(cell.attrs)
             value = cell.text.strip()
             result[name] = value
 
         yield result
 
 
-def extract_total(xml):
-    """The total count from some XML if available, None otherwise."""
+def extract_total(xml, backend='lxml'):
+    """The total count from some XML if available, None otherwise.
+
+    Only as much of the document as is needed to see the opening
+    ``<rows>`` tag is read, the rest is never parsed.
+
+    :param xml: A string, bytes, a file like object or an iterable of
+        byte chunks, such as ``response.iter_content()`` of a streamed
+        response.
+    :param str backend: One of :data:`BACKENDS`. BeautifulSoup reads
+        the whole document.
+    """
+    if _check_backend(backend) == 'soup':
+        return _extract_total_soup(b''.join(_iter_chunks(xml)))
+
+    pull_parser = etree.XMLPullParser(
+        events=('start', ), tag='rows', recover=True, resolve_entities=False,
+    )
+    for chunk in _iter_chunks(xml):
+        pull_parser.feed(chunk)
+        for _, rows in pull_parser.read_events():
+            total = rows.get('total_count')
+            return int(total) if total is not None else None
+
+
+def _iter_chunks(xml, size=4096):
+    if isinstance(xml, str):
+        xml = xml.encode('utf-8')
+    if isinstance(xml, bytes):
+        for start in range(0, len(xml), size):
+            yield xml[start:start + size]
+    elif hasattr(xml, 'read'):
+        for chunk in iter(lambda: xml.read(size), b''):
+            yield chunk
+    else:
+        for chunk in xml:
+            yield chunk
+
+
+def _extract_total_soup(xml):
     soup = BeautifulSoup(xml, 'xml')
 
     rows = soup.find('rows')
@@ -29,11 +127,11 @@ def extract_total(xml):
         return int(rows['total_count'])
 
 
-def _extract_name(cell):
-    if cell.has_attr('class'):
-        name = cell['class']
-    elif cell.has_attr('id'):
-        name = cell['id']
+def _extract_name(attrs):
+    if 'class' in attrs:
+        name = attrs['class']
+    elif 'id' in attrs:
+        name = attrs['id']
     else:
         name = ''
     return name.replace('grid_', '')
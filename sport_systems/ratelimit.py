@@ -0,0 +1,168 @@
+"""A rate limiter shared by every download worker of a spider."""
+import asyncio
+import multiprocessing
+import time
+
+# Offsets into the shared state array
+_RATE, _TOKENS, _UPDATED, _IN_FLIGHT, _PAUSED_UNTIL, _LATENCY, \
+    _BASELINE, _LAST_BACKOFF, _THROTTLED = range(9)
+
+
+class RateLimiter(object):
+    """A token bucket with a cap on requests in flight.
+
+    State lives in shared memory so one limiter, created before the
+    spider forks, coordinates all of its download processes. The rate
+    adapts to the server: it's cut on ``429`` or ``5xx`` responses,
+    failed requests and latency rising well above the best seen, then
+    climbs back towards ``rate`` as requests succeed.
+
+    :arg float rate: The maximum requests per second, ``None`` to only
+        limit the requests in flight.
+    :arg int max_in_flight: The maximum concurrent requests, ``None``
+        for no limit.
+    :arg float burst: How many tokens the bucket holds.
+    :arg float min_rate: The rate will never be cut below this.
+    :arg float backoff: The factor the rate is multiplied by when the
+        server is struggling.
+    :arg float latency_factor: Back off when the average latency exceeds
+        the best seen by this factor...
+    :arg float latency_floor: ...and by at least this many seconds, so
+        jitter on very fast responses is ignored.
+    :arg float cooldown: Seconds between consecutive back offs, so one
+        bad patch only counts once.
+    """
+    def __init__(self, rate, max_in_flight=None, burst=1.0, min_rate=0.5,
+                 backoff=0.5, latency_factor=3.0, latency_floor=0.05,
+                 cooldown=1.0):
+        self.max_rate = float(rate) if rate else None
+        self.max_in_flight = max_in_flight
+        self.burst = max(float(burst), 1.0)
+        self.min_rate = min(float(min_rate), self.max_rate or min_rate)
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.latency_floor = latency_floor
+        self.cooldown = cooldown
+
+        self._state = multiprocessing.Array('d', 9)
+        self._state[_RATE] = self.max_rate or 0
+        self._state[_TOKENS] = self.burst
+        self._state[_UPDATED] = time.monotonic()
+
+    def _try_acquire(self):
+        """Take a token if possible, otherwise the seconds to wait.
+
+        Returns ``None`` once acquired.
+        """
+        with self._state.get_lock():
+            state = self._state
+            now = time.monotonic()
+            if now < state[_PAUSED_UNTIL]:
+                return state[_PAUSED_UNTIL] - now
+
+            if (self.max_in_flight is not None and
+                    state[_IN_FLIGHT] >= self.max_in_flight):
+                return 0.005
+
+            if self.max_rate is not None:
+                elapsed = now - state[_UPDATED]
+                state[_TOKENS] = min(
+                    self.burst, state[_TOKENS] + elapsed * state[_RATE]
+                )
+                state[_UPDATED] = now
+                if state[_TOKENS] < 1:
+                    return (1 - state[_TOKENS]) / state[_RATE]
+                state[_TOKENS] -= 1
+
+            state[_IN_FLIGHT] += 1
+            return None
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            wait = self._try_acquire()
+            if wait is None:
+                return
+            time.sleep(min(wait, 0.1))
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may be
+        made."""
+        while True:
+            wait = self._try_acquire()
+            if wait is None:
+                return
+            await asyncio.sleep(min(wait, 0.1))
+
+    def release(self, status, latency, retry_after=None):
+        """Record the outcome of a request made after :meth:`acquire`.
+
+        :arg int status: The response status, ``None`` if the request
+            failed outright.
+        :arg float latency: How long the request took in seconds.
+        :arg float retry_after: Seconds the server asked us to wait.
+        """
+        with self._state.get_lock():
+            state = self._state
+            state[_IN_FLIGHT] -= 1
+            now = time.monotonic()
+
+            if retry_after:
+                state[_PAUSED_UNTIL] = max(
+                    state[_PAUSED_UNTIL], now + retry_after
+                )
+
+            if status is not None and status < 500 and status != 429:
+                if state[_LATENCY]:
+                    state[_LATENCY] = 0.8 * state[_LATENCY] + 0.2 * latency
+                else:
+                    state[_LATENCY] = latency
+                baseline = state[_BASELINE]
+                if not baseline or state[_LATENCY] < baseline:
+                    baseline = state[_BASELINE] = state[_LATENCY]
+                slow = state[_LATENCY] > max(
+                    baseline * self.latency_factor,
+                    baseline + self.latency_floor,
+                )
+            else:
+                slow = True
+
+            if self.max_rate is None:
+                return
+
+            if slow:
+                if now - state[_LAST_BACKOFF] >= self.cooldown:
+                    state[_RATE] = max(
+                        self.min_rate, state[_RATE] * self.backoff
+                    )
+                    state[_LAST_BACKOFF] = now
+                    state[_THROTTLED] += 1
+            else:
+                # Additive increase, about one request/sec per second
+                state[_RATE] = min(
+                    self.max_rate, state[_RATE] + 1.0 / state[_RATE]
+                )
+
+    def state(self):
+        """A snapshot of the limiter's current state."""
+        with self._state.get_lock():
+            state = list(self._state)
+        return {
+            'rate': state[_RATE],
+            'max_rate': self.max_rate,
+            'tokens': state[_TOKENS],
+            'in_flight': int(state[_IN_FLIGHT]),
+            'paused_for': max(0.0, state[_PAUSED_UNTIL] - time.monotonic()),
+            'mean_latency': state[_LATENCY],
+            'baseline_latency': state[_BASELINE],
+            'throttled': int(state[_THROTTLED]),
+        }
+
+
+def retry_after(headers):
+    """Seconds from a ``Retry-After`` header, if it holds a number."""
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,107 @@
+"""Retry scheduling and dead letter reporting for the spiders."""
+from collections import namedtuple
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+
+#: A page that failed for good. ``status`` is the last HTTP status seen,
+#: ``None`` if the last attempt raised ``error`` instead.
+DeadLetter = namedtuple('DeadLetter', ['url', 'attempts', 'status', 'error'])
+
+
+class PagesFailed(Exception):
+    """Some pages of an event failed for good, so its results are
+    incomplete.
+
+    :arg list dead_letters: The :class:`DeadLetter` of each page.
+    """
+    def __init__(self, dead_letters):
+        super().__init__(
+            '%d pages could not be fetched' % len(dead_letters)
+        )
+        self.dead_letters = dead_letters
+
+
+class UnprocessablePage(Exception):
+    """A page was fetched, but ``process_response`` failed on it.
+
+    Fetching it again wouldn't help, so it's a dead letter straight away.
+
+    :arg int status: The page's HTTP status.
+    :arg str error: The ``repr`` of the exception raised.
+    """
+    def __init__(self, status, error):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+
+def backoff_delay(try_count, base=0.5, cap=30.0):
+    """Seconds to wait before retry number ``try_count + 1``.
+
+    Exponential backoff with "full jitter": a random delay between zero
+    and ``base * 2 ** try_count``, capped, so workers that failed
+    together don't all retry together.
+    """
+    return random.uniform(0, min(cap, base * 2 ** try_count))
+
+
+def dead_letter_report(dead_letters):
+    """A JSON serialisable summary of pages that failed for good."""
+    return {
+        'failed': len(dead_letters),
+        'pages': [letter._asdict() for letter in dead_letters],
+    }
+
+
+class RetryScheduler(threading.Thread):
+    """Re-queue failed URLs once their backoff has passed.
+
+    Runs in the parent process. Download workers put ``(delay, items)``
+    on :attr:`queue` *without* marking their task done, this thread puts
+    ``items`` back on the URL queue after ``delay`` seconds and only then
+    marks the original task as done, so ``url_queue.join()`` still waits
+    for pages that are backing off.
+
+    :arg url_queue: The spider's ``JoinableQueue`` of URLs.
+    :arg retry_queue: A queue workers put retries on.
+    """
+    def __init__(self, url_queue, retry_queue):
+        super().__init__()
+        self.daemon = True
+        self.url_queue = url_queue
+        self.queue = retry_queue
+        self._pending = []
+        self._counter = itertools.count()
+
+    def run(self):
+        while True:
+            timeout = None
+            if self._pending:
+                timeout = max(0, self._pending[0][0] - time.monotonic())
+
+            try:
+                data = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                data = False
+
+            if data is None:
+                return
+            if data:
+                delay, items = data
+                heapq.heappush(self._pending, (
+                    time.monotonic() + delay, next(self._counter), items,
+                ))
+
+            while self._pending and self._pending[0][0] <= time.monotonic():
+                _, _, items = heapq.heappop(self._pending)
+                for item in items:
+                    self.url_queue.put(item)
+                self.url_queue.task_done()
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
@@ -0,0 +1,175 @@
+"""Pooled HTTP sessions and fetch statistics for the spiders."""
+import bisect
+from collections import namedtuple
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+#: Upper bounds, in milliseconds, of the request latency histogram. The
+#: final bucket catches everything slower.
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+#: Connect and read timeouts, in seconds, passed to ``requests``.
+DEFAULT_TIMEOUT = (3.05, 30)
+
+#: A plain, picklable response, mirroring the parts of
+#: ``requests.Response`` that callbacks and ``process_response`` rely on.
+Response = namedtuple(
+    'Response', ['url', 'status_code', 'content', 'headers']
+)
+
+
+class FetchStats(object):
+    """Counters describing the requests made by a single worker."""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.connections_opened = 0
+        self.bytes_received = 0
+        self.latency_total = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    @property
+    def connections_reused(self):
+        """Requests that were served over an existing connection."""
+        return max(self.requests - self.connections_opened, 0)
+
+    @property
+    def mean_latency(self):
+        """Mean request latency in seconds."""
+        if not self.requests:
+            return 0.0
+        return self.latency_total / self.requests
+
+    def record(self, latency, size, new_connections=0):
+        """Record a completed request.
+
+        :arg float latency: Seconds the request took.
+        :arg int size: The number of body bytes received, before any
+            decompression.
+        :arg int new_connections: Connections opened to serve it.
+        """
+        self.requests += 1
+        self.connections_opened += new_connections
+        self.bytes_received += size
+        self.latency_total += latency
+        index = bisect.bisect_left(LATENCY_BUCKETS, latency * 1000)
+        self.latency_histogram[index] += 1
+
+    def merge(self, other):
+        """Add the counts of another :class:`FetchStats` to this one."""
+        self.requests += other.requests
+        self.cache_hits += other.cache_hits
+        self.connections_opened += other.connections_opened
+        self.bytes_received += other.bytes_received
+        self.latency_total += other.latency_total
+        self.latency_histogram = [
+            mine + theirs for mine, theirs
+            in zip(self.latency_histogram, other.latency_histogram)
+        ]
+        return self
+
+    def as_dict(self):
+        labels = ['<=%dms' % bound for bound in LATENCY_BUCKETS]
+        labels.append('>%dms' % LATENCY_BUCKETS[-1])
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'connections_opened': self.connections_opened,
+            'connections_reused': self.connections_reused,
+            'bytes_received': self.bytes_received,
+            'mean_latency': self.mean_latency,
+            'latency_histogram': dict(zip(labels, self.latency_histogram)),
+        }
+
+
+class Fetcher(object):
+    """A keep-alive ``requests`` session that records :class:`FetchStats`.
+
+    Each download worker owns one of these so connections to the
+    results server are reused between pages rather than opened for every
+    request.
+
+    :arg int pool_size: The number of connections kept open per host.
+    :arg timeout: A ``requests`` timeout, either seconds or a
+        ``(connect, read)`` tuple.
+    :arg bool gzip: Whether to ask for compressed responses.
+    :arg cache: An optional :class:`~sport_systems.cache.ResponseCache`
+        to serve pages from, and store successful responses in.
+    """
+    def __init__(self, pool_size=1, timeout=DEFAULT_TIMEOUT, gzip=True,
+                 cache=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.stats = FetchStats()
+
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        if not gzip:
+            self.session.headers['Accept-Encoding'] = 'identity'
+
+    def _connection_count(self):
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def get(self, url, **kwargs):
+        """Perform a GET request, as per ``requests.get``, or answer it
+        from the cache."""
+        response = self.from_cache(url, kwargs.get('headers'))
+        if response is None:
+            response = self.fetch(url, **kwargs)
+        return response
+
+    def from_cache(self, url, headers=None):
+        """The cached response for a URL, if there's a fresh one.
+
+        Conditional requests, i.e. those with extra ``headers``, always
+        go to the server.
+        """
+        if self.cache is None or headers:
+            return None
+        response = self.cache.get(url)
+        if response is not None:
+            self.stats.cache_hits += 1
+        return response
+
+    def fetch(self, url, **kwargs):
+        """Perform a GET request against the server.
+
+        The size recorded is the body as sent over the wire, i.e.
+        compressed if the server gzipped it. Streamed responses are
+        recorded once their headers arrive, using the advertised
+        ``Content-Length`` as their size. When caching they're read in
+        full so they can be stored.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        opened = self._connection_count()
+        start = time.perf_counter()
+
+        response = self.session.get(url, **kwargs)
+
+        if kwargs.get('stream'):
+            size = int(response.headers.get('Content-Length', 0))
+        else:
+            # Once the body is read the raw stream's position is the
+            # number of bytes that arrived, before decoding
+            response.content
+            size = response.raw.tell()
+        self.stats.record(
+            latency=time.perf_counter() - start,
+            size=size,
+            new_connections=self._connection_count() - opened,
+        )
+
+        if (self.cache is not None and response.ok and
+                not kwargs.get('headers')):
+            self.cache.put(url, response.status_code, response.content,
+                           response.headers)
+        return response
+
+    def close(self):
+        self.session.close()
@@ -1,10 +1,18 @@
 from collections import OrderedDict
 import contextlib
 import multiprocessing
+import time
 import urllib
 
 import requests
 from . import parser
+from .backpressure import MemoryBudget
+from .metrics import CrawlMetrics, QueueSampler, StageTimings
+from .ratelimit import RateLimiter, retry_after
+from .retry import (
+    DeadLetter, RetryScheduler, UnprocessablePage, backoff_delay,
+)
+from .session import DEFAULT_TIMEOUT, Fetcher, FetchStats, Response
 
 
 class Spider(object):
@@ -16,17 +24,112 @@ class Spider(object):
     :arg int N: The number of processes to spawn. Defaults to double the
         number of available CPUs - 1 as one process is used for
         callbacks.
-    :arg int max_retry: The number of times to attempt fetch a URL if an
-        error response is returned.
+    :arg int max_retry: The number of times to retry a URL if an error
+        response is returned or the request raises.
+    :arg float retry_backoff: The base, in seconds, of the exponential
+        backoff between retries.
+    :arg callable processor: An optional method run inside the download
+        process on each successful response's content. Its (picklable)
+        return value is passed to ``callback`` instead of the response,
+        so only the useful part of a page crosses the process boundary.
+    :arg callable on_finish: An optional method run, alongside
+        ``callback`` in the callback process, once the last result has
+        been handled. E.g. to flush buffered output.
+    :arg int pool_size: The number of keep-alive connections each
+        download process holds open.
+    :arg timeout: Request timeout in seconds, or a ``(connect, read)``
+        tuple.
+    :arg bool gzip: Whether to ask the server for compressed responses.
+    :arg float rate_limit: The most requests per second to make across
+        all download processes, ``None`` for no limit.
+    :arg int max_in_flight: The most requests to have in flight across
+        all download processes, ``None`` for no limit.
+    :arg float sample_interval: Seconds between samples of the queue
+        depths, see :attr:`metrics`.
+    :arg cache: An optional :class:`~sport_systems.cache.ResponseCache`
+        shared by every fetch the spider makes.
+    :arg int parse_workers: The number of processes to run
+        ``process_response`` in. By default pages are processed by the
+        download process that fetched them, with a pool downloads and
+        parsing scale separately.
+    :arg int parse_queue_size: The most pages waiting for the parse
+        pool, download processes block once it's full. Defaults to
+        twice ``parse_workers``.
+    :arg int queue_size: The most URLs waiting for the download
+        processes, and results waiting for the callback. Once the URL
+        queue is full ``populate_urls`` blocks, once the results queue
+        is full the download processes do, so a slow callback slows the
+        whole crawl rather than results piling up. Defaults to four per
+        download process.
+    :arg int max_memory: The most bytes of pages to hold between being
+        fetched and the callback finishing with them, ``None`` for no
+        limit besides the queue sizes. See
+        :class:`~sport_systems.backpressure.MemoryBudget`.
     """
-    def __init__(self, callback, N=None, max_retry=3):
+    def __init__(self, callback, N=None, max_retry=3, processor=None,
+                 pool_size=1, timeout=DEFAULT_TIMEOUT, gzip=True,
+                 rate_limit=None, max_in_flight=None, retry_backoff=0.5,
+                 sample_interval=0.5, on_finish=None, cache=None,
+                 parse_workers=0, parse_queue_size=None, queue_size=None,
+                 max_memory=None):
         self.N = N if N else (multiprocessing.cpu_count() * 2 - 1)
+        self.queue_size = queue_size or self.N * 4
 
         self.callback = callback
+        self.on_finish = on_finish
+        self.max_retry = max_retry
+        self.retry_backoff = retry_backoff
+        self.processor = processor
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.gzip = gzip
+        self.sample_interval = sample_interval
+        self.cache = cache
+
+        #: The shared :class:`~sport_systems.ratelimit.RateLimiter`, if
+        #: the crawl is limited. Its ``state()`` can be read at any time.
+        self.rate_limiter = None
+        if rate_limit or max_in_flight:
+            self.rate_limiter = RateLimiter(
+                rate=rate_limit, max_in_flight=max_in_flight
+            )
 
-        self.url_queue = multiprocessing.JoinableQueue()
-        self.results_queue = multiprocessing.JoinableQueue()
-        self.errors_queue = multiprocessing.Queue()
+        #: The :class:`~sport_systems.session.FetchStats` reported by
+        #: each download process once the crawl has finished.
+        self.worker_stats = []
+        #: A :class:`~sport_systems.retry.DeadLetter` for each page that
+        #: still failed after ``max_retry`` retries.
+        self.dead_letters = []
+        #: The :class:`~sport_systems.metrics.StageTimings` of every
+        #: process taking part in the crawl, combined.
+        self.timings = StageTimings()
+        self.queue_samples = []
+        self.elapsed = None
+
+        #: The shared :class:`~sport_systems.backpressure.MemoryBudget`,
+        #: if ``max_memory`` was given.
+        self.memory_budget = None
+        if max_memory:
+            self.memory_budget = MemoryBudget(max_memory)
+
+        self.url_queue = multiprocessing.JoinableQueue(self.queue_size)
+        self.results_queue = multiprocessing.JoinableQueue(self.queue_size)
+        self.retry_queue = multiprocessing.Queue()
+        self.stats_queue = multiprocessing.Queue()
+
+        self.parse_queue = None
+        self.parse_processes = []
+        if parse_workers:
+            self.parse_queue = multiprocessing.JoinableQueue(
+                parse_queue_size or parse_workers * 2
+            )
+        for _ in range(parse_workers):
+            proc = multiprocessing.Process(
+                target=self.parse_pages,
+                args=(self.parse_queue, self.results_queue, self.stats_queue)
+            )
+            proc.daemon = True
+            self.parse_processes.append(proc)
 
         self.download_processes = []
         self.callback_process = multiprocessing.Process(
@@ -37,38 +140,248 @@ class Spider(object):
         for _ in range(self.N):
             proc = multiprocessing.Process(
                 target=self.download,
-                args=(self.url_queue, self.results_queue, self.errors_queue)
+                args=(
+                    self.url_queue, self.results_queue, self.retry_queue,
+                    self.stats_queue,
+                )
             )
             proc.daemon = True
             self.download_processes.append(proc)
 
-    def download(self, url_queue, results_queue, error_queue):
+    def download(self, url_queue, results_queue, retry_queue, stats_queue):
         """Perform a HTTP request.
 
         This method aims to be as ignorant of the implementation as
         possible, once a non error result has been downloaded, we push
         the result into a queue for the concrete class instance to do
         whatever it likes.
+
+        Error responses and exceptions are handed to the
+        :class:`~sport_systems.retry.RetryScheduler` to be retried after
+        a backoff, so the process moves straight on to the next URL.
+        Pages that can't be processed become dead letters straight away,
+        as they would in the parse pool.
+
+        Each process keeps a single pooled session for its lifetime, on
+        receiving ``None`` it reports its fetch stats, dead letters and
+        stage timings and exits.
         """
+        fetcher = self.create_fetcher()
+        dead_letters = []
+        timings = StageTimings()
+
         while True:
             data = url_queue.get()
 
+            if data is None:
+                stats_queue.put((fetcher.stats, dead_letters, timings))
+                fetcher.close()
+                url_queue.task_done()
+                return
+
             if not isinstance(data, str):
                 url, try_count = data
             else:
                 url, try_count = data, 0
 
-            response = requests.get(url)
+            done, give_up, status, error = False, False, None, None
+            try:
+                done, status = self.handle_url(
+                    fetcher, url, results_queue, timings
+                )
+            except UnprocessablePage as exc:
+                give_up, status, error = True, exc.status, exc.error
+            except Exception as exc:
+                error = repr(exc)
+
+            if done:
+                url_queue.task_done()
+            elif give_up or try_count >= self.max_retry:
+                dead_letters.append(
+                    DeadLetter(url, try_count + 1, status, error)
+                )
+                url_queue.task_done()
+            else:
+                # The scheduler marks this task done once it's re-queued
+                retries = [
+                    (retry_url, try_count + 1)
+                    for retry_url in self.split_url(url)
+                ]
+                delay = backoff_delay(try_count, self.retry_backoff)
+                retry_queue.put((delay, retries))
+
+    def handle_url(self, fetcher, url, results_queue, timings):
+        """Fetch a URL in a download process and pass the page on.
+
+        :returns: ``(done, status)``, whether the URL is finished with
+            and the response's status code. URLs that aren't done are
+            retried.
+        """
+        with timings.time('fetch'):
+            response = self.limited_get(fetcher, url)
+        if response.ok:
+            self._pass_on(response, results_queue, timings)
+        return response.ok, response.status_code
+
+    def parse_pages(self, parse_queue, results_queue, stats_queue):
+        """Run ``process_response`` on pages from the download processes.
+
+        Pages that can't be processed become dead letters, as retrying
+        the download wouldn't help. On receiving ``None`` the process
+        reports its dead letters and stage timings and exits.
+        """
+        dead_letters = []
+        timings = StageTimings()
 
-            if response.ok:
-                results_queue.put(response)
+        while True:
+            data = parse_queue.get()
+            if data is None:
+                stats_queue.put((dead_letters, timings))
+                parse_queue.task_done()
+                return
+
+            size, response = data
+            try:
+                with timings.time('parse'):
+                    result = self.process_response(response)
+            except Exception as exc:
+                self._release(size)
+                dead_letters.append(DeadLetter(
+                    response.url, 1, response.status_code, repr(exc)
+                ))
             else:
-                if try_count >= self.max_retry:
-                    error_queue.put(response)
-                else:
-                    url_queue.put((url, try_count + 1))
+                results_queue.put((time.monotonic(), size, result))
+            parse_queue.task_done()
+
+    def _pass_on(self, response, results_queue, timings):
+        """Send a page to the parse pool, or process it and send the
+        result to the callback.
+
+        Blocks while the memory budget, or the next queue, is full.
+
+        :raises UnprocessablePage: If ``process_response`` fails.
+        """
+        size = 0
+        if self.memory_budget is not None:
+            size = len(response.content)
+            timings.record('backpressure', self.memory_budget.acquire(size))
+        try:
+            if self.parse_queue is not None:
+                self.parse_queue.put((size, _detach(response)))
+                return
+            try:
+                with timings.time('parse'):
+                    result = self.process_response(response)
+            except Exception as exc:
+                raise UnprocessablePage(
+                    response.status_code, repr(exc)
+                ) from exc
+            results_queue.put((time.monotonic(), size, result))
+        except BaseException:
+            self._release(size)
+            raise
+
+    def _release(self, size):
+        """Give a page's bytes back to the memory budget."""
+        if size:
+            self.memory_budget.release(size)
+
+    def limited_get(self, fetcher, url):
+        """Fetch a URL once the rate limiter allows it.
+
+        Pages served from the cache skip the limiter.
+        """
+        headers = self.request_headers(url)
+        limiter = self.rate_limiter
+        if limiter is None:
+            return fetcher.get(url, headers=headers)
+
+        response = fetcher.from_cache(url, headers)
+        if response is not None:
+            return response
+
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = fetcher.fetch(url, headers=headers)
+        except Exception:
+            limiter.release(None, time.perf_counter() - start)
+            raise
+
+        limiter.release(
+            response.status_code, time.perf_counter() - start,
+            retry_after(response.headers),
+        )
+        return response
+
+    def create_fetcher(self):
+        """A new pooled session configured for this spider."""
+        return Fetcher(
+            pool_size=self.pool_size, timeout=self.timeout, gzip=self.gzip,
+            cache=self.cache,
+        )
+
+    @property
+    def fetcher(self):
+        """The session used for requests made outside the workers."""
+        if not hasattr(self, '_fetcher'):
+            self._fetcher = self.create_fetcher()
+        return self._fetcher
+
+    @property
+    def fetch_stats(self):
+        """The combined :class:`~sport_systems.session.FetchStats`.
+
+        Includes the requests made outside the workers, such as page size
+        probes and the first page.
+        """
+        stats = FetchStats()
+        if hasattr(self, '_fetcher'):
+            stats.merge(self._fetcher.stats)
+        for worker_stats in self.worker_stats:
+            stats.merge(worker_stats)
+        return stats
 
-            url_queue.task_done()
+    @property
+    def metrics(self):
+        """A :class:`~sport_systems.metrics.CrawlMetrics` for the crawl.
+
+        Only complete once :meth:`go` has returned.
+        """
+        return CrawlMetrics(
+            self.fetch_stats, self.timings, self.queue_samples,
+            self.elapsed, len(self.dead_letters),
+        )
+
+    def _collect_stats(self):
+        """Ask each download process, then each parse process and the
+        callback process, to stop and report their stats, dead letters
+        and timings."""
+        for _ in self.download_processes:
+            self.url_queue.put(None)
+        self.worker_stats = []
+        for _ in self.download_processes:
+            stats, dead_letters, timings = self.stats_queue.get()
+            self.worker_stats.append(stats)
+            self.dead_letters.extend(dead_letters)
+            self.timings.merge(timings)
+
+        for _ in self.parse_processes:
+            self.parse_queue.put(None)
+        for _ in self.parse_processes:
+            dead_letters, timings = self.stats_queue.get()
+            self.dead_letters.extend(dead_letters)
+            self.timings.merge(timings)
+        self.dead_letters.sort()
+
+        self.results_queue.put(None)
+        self.timings.merge(self.stats_queue.get())
+
+    def process_response(self, response):
+        """What to hand the callback for a successful response."""
+        if self.processor is None:
+            return response
+        return self.processor(response.content)
 
     def _callback(self, queue):
         """Private method to proxy a friendlier public callback.
@@ -76,16 +389,35 @@ class Spider(object):
         Rather than rely on subclasses to each mark tasks as done, we
         handle that here and simply provide an interface to handle the
         resulting content.
+
+        Results arrive stamped with the time they were queued. On
+        receiving ``None`` the process runs ``on_finish``, reports its
+        timings and exits.
         """
+        timings = StageTimings()
         while True:
-            result = queue.get()
-            self.callback(result)
+            data = queue.get()
+            if data is None:
+                if self.on_finish is not None:
+                    with timings.time('write'):
+                        self.on_finish()
+                self.stats_queue.put(timings)
+                queue.task_done()
+                return
+
+            queued, size, result = data
+            timings.record('queue', time.monotonic() - queued)
+            try:
+                with timings.time('write'):
+                    self.callback(result)
+            finally:
+                self._release(size)
             queue.task_done()
 
     @contextlib.contextmanager
     def _process_manager(self):
         """A simple context manager to clean up processes nicely."""
-        for proc in self.download_processes:
+        for proc in self.download_processes + self.parse_processes:
             proc.start()
         self.callback_process.start()
 
@@ -93,23 +425,71 @@ class Spider(object):
             yield
         finally:
             # Our function has exited, shut down all running processes
-            for proc in self.download_processes:
+            for proc in self.download_processes + self.parse_processes:
                 proc.terminate()
             self.callback_process.terminate()
 
     def go(self):
         """Start all the things."""
+        start = time.monotonic()
+        self.timings = StageTimings()
+        self.dead_letters = []
         with self._process_manager():
-            self.populate_urls()
-
-            # Wait for all the items in the queue to be consumed
-            self.url_queue.join()
-            self.results_queue.join()
+            scheduler = RetryScheduler(self.url_queue, self.retry_queue)
+            queues = {'urls': self.url_queue, 'results': self.results_queue}
+            if self.parse_queue is not None:
+                queues['parse'] = self.parse_queue
+            sampler = QueueSampler(queues, self.sample_interval)
+            scheduler.start()
+            sampler.start()
+            try:
+                self.populate_urls()
+
+                # Wait for all the items in the queue to be consumed
+                self.url_queue.join()
+                if self.parse_queue is not None:
+                    self.parse_queue.join()
+                self.results_queue.join()
+            finally:
+                scheduler.stop()
+                sampler.stop()
+            self.queue_samples = sampler.samples
+            self.elapsed = time.monotonic() - start
+
+            self._collect_stats()
 
     def populate_urls(self):
         """Create URLs for this spider to fetch."""
         raise NotImplementedError()
 
+    def enqueue(self, url):
+        """Schedule a URL to be fetched."""
+        self.url_queue.put(url)
+
+    def submit_response(self, response):
+        """Pass a response fetched outside the workers to the callback."""
+        try:
+            self._pass_on(response, self.results_queue, self.timings)
+        except UnprocessablePage as exc:
+            self.dead_letters.append(
+                DeadLetter(response.url, 1, exc.status, exc.error)
+            )
+
+    def request_headers(self, url):
+        """Extra headers to send when fetching the given URL.
+
+        Called in the download processes, so it can only rely on state
+        set up before :meth:`go`.
+        """
+        return None
+
+    def split_url(self, url):
+        """The URLs to retry in place of a failed one.
+
+        Subclasses may override this to back off to smaller requests.
+        """
+        return [url]
+
     @property
     def total_count(self):
         """The total number of results available."""
@@ -133,24 +513,69 @@ class Spider(object):
         return response.content
 
 
-class SportSystemResultsSpider(Spider):
-    """A spider to crawl results from SportSystems."""
+def _detach(response):
+    """A picklable copy of the parts of a response worth sending on."""
+    return Response(
+        response.url, response.status_code, response.content,
+        response.headers,
+    )
+
+
+class SportSystemResultsMixin(object):
+    """URL generation for the SportSystems results API.
+
+    Kept apart from the crawl engine so the same event can be fetched
+    by either :class:`Spider` or
+    :class:`sport_systems.aio.AsyncSpider`.
+    """
 
     #: The query endpoint for the result data.
     BASE_URL = 'http://www.sportsystems.co.uk/ss/results/data/{event_id}/'
 
-    def __init__(self, event_id, page_size=20, *args, **kwargs):
+    #: The page size adaptive probing starts from, and the smallest a
+    #: failing page will be split into.
+    MIN_PAGE_SIZE = 20
+    #: The largest page size adaptive probing will ask for.
+    MAX_PAGE_SIZE = 5000
+    #: How much to grow the page size by between probes.
+    PAGE_SIZE_GROWTH = 4
+    #: Stop growing the page size once a probe takes longer than this
+    #: many seconds.
+    MAX_PAGE_LATENCY = 2.0
+
+    def __init__(self, event_id, page_size=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.event_id = event_id
         self.page_size = page_size
 
     def populate_urls(self):
-        """Create URLs for this spider to fetch."""
-        lim = -(-self.total_count // self.page_size)
+        """Create URLs for this spider to fetch.
 
-        for page_num in range(1, lim + 1):
-            url = self.build_url(page_num, count=self.page_size)
-            self.url_queue.put(url)
+        If no ``page_size`` was given, one is chosen by
+        :meth:`probe_page_size` first. The first page is fetched here,
+        giving us the total count, and passed straight on to the callback
+        rather than being requested twice.
+        """
+        self.submit_first_page()
+        for url in self.iter_urls():
+            self.enqueue(url)
+
+    def submit_first_page(self):
+        """Choose the page size if need be, and pass the first page on to
+        the callback."""
+        if self.page_size is None:
+            self.page_size = self.probe_page_size()
+        self.submit_response(self._fetch_first_page())
+
+    def iter_urls(self):
+        """The URLs of every page after the first.
+
+        A generator, so URLs are only built as the bounded URL queue
+        takes them, however many pages the event has.
+        """
+        lim = -(-self.total_count // self.page_size)
+        for page_num in range(2, lim + 1):
+            yield self.build_url(page_num, count=self.page_size)
 
     def build_url(self, page_num, link='N', posStart=None, count=20):
         """Build a URL for the specified page number.
@@ -167,12 +592,92 @@ class SportSystemResultsSpider(Spider):
         params = OrderedDict()
 
         params['link'] = link
-        params['posStart'] = posStart or (page_num - 1) * count
+        if posStart is None:
+            posStart = (page_num - 1) * count
+        params['posStart'] = posStart
         params['count'] = count
 
         querystring = urllib.parse.urlencode(params)
         return '%s?%s' % (base_url, querystring)
 
+    def probe_page_size(self):
+        """Find the largest page size worth requesting for this event.
+
+        Starting from :attr:`MIN_PAGE_SIZE` the first page is requested
+        with a growing ``count`` until the event fits on one page, the
+        response takes longer than :attr:`MAX_PAGE_LATENCY`, the server
+        errors or it returns fewer rows than asked for (meaning it caps
+        the page size). The total count is read from the probes as well,
+        so no separate request is needed for it.
+
+        The first probe is retried like any other page, as there's no
+        smaller size to fall back on.
+        """
+        page_size = self.MIN_PAGE_SIZE
+        count = self.MIN_PAGE_SIZE
+        self._first_page = None
+
+        while count <= self.MAX_PAGE_SIZE:
+            url = self.build_url(page_num=1, count=count)
+            if count == self.MIN_PAGE_SIZE:
+                # Nothing to fall back on, so retried like any other page
+                response, latency = self._fetch_retrying(url)
+            else:
+                start = time.perf_counter()
+                try:
+                    response = self.fetcher.get(url)
+                except requests.RequestException:
+                    break
+                latency = time.perf_counter() - start
+
+                if not response.ok:
+                    break
+
+            total = parser.extract_total(response.content)
+            rows = sum(1 for _ in parser.parse(response.content))
+            self._total_count = total
+
+            if latency > self.MAX_PAGE_LATENCY and count > page_size:
+                # Too slow, stick with the last size that wasn't
+                break
+
+            if rows < min(count, total):
+                # Truncated, the server won't return pages this big
+                page_size = max(rows, self.MIN_PAGE_SIZE)
+                if page_size == rows:
+                    self._first_page = response
+                break
+
+            page_size = count
+            self._first_page = response
+            if count >= total or latency > self.MAX_PAGE_LATENCY:
+                break
+            count = min(count * self.PAGE_SIZE_GROWTH, self.MAX_PAGE_SIZE)
+            if count == page_size:
+                break
+
+        return page_size
+
+    def split_url(self, url):
+        """Back off a failed page by retrying it as two smaller ones."""
+        query = urllib.parse.urlsplit(url).query
+        params = dict(urllib.parse.parse_qsl(query))
+        pos_start, count = int(params['posStart']), int(params['count'])
+
+        if count < self.MIN_PAGE_SIZE * 2:
+            return [url]
+
+        half = count // 2
+        return [
+            self.build_url(
+                None, link=params['link'], posStart=pos_start, count=half
+            ),
+            self.build_url(
+                None, link=params['link'], posStart=pos_start + half,
+                count=count - half,
+            ),
+        ]
+
     @property
     def total_count(self):
         """The total number of results available."""
@@ -181,11 +686,91 @@ class SportSystemResultsSpider(Spider):
         return self._total_count
 
     def _fetch_total(self):
-        """The total number of results for this event."""
+        """The total number of results for this event.
+
+        The response is streamed and only read as far as the opening
+        ``<rows>`` tag.
+        """
         first_page_url = self.build_url(page_num=1, count=1)
-        response = requests.get(first_page_url)
+        response = self.fetcher.get(first_page_url, stream=True)
 
-        if not response.ok:
-            response.raise_for_status()
+        try:
+            if not response.ok:
+                response.raise_for_status()
+            return parser.extract_total(response.iter_content(4096))
+        finally:
+            response.close()
+
+    def _fetch_first_page(self):
+        """The first page at the chosen page size.
+
+        Reuses the page fetched by :meth:`probe_page_size` if it matches,
+        and records the total count carried by the page.
+        """
+        response = getattr(self, '_first_page', None)
+        self._first_page = None
+
+        if response is None or not response.ok:
+            url = self.build_url(page_num=1, count=self.page_size)
+            response, _ = self._fetch_retrying(url)
+
+        if not hasattr(self, '_total_count'):
+            self._total_count = parser.extract_total(response.content)
+        return response
+
+    def _fetch_retrying(self, url):
+        """Fetch a page outside the workers, retrying it as they would.
+
+        Error responses and failed requests are retried after a backoff,
+        up to ``max_retry`` times.
+
+        :returns: ``(response, latency)``, the latency of the attempt
+            that succeeded.
+        :raises requests.RequestException: Once the retries run out.
+        """
+        try_count = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.fetcher.get(url)
+                if response.ok:
+                    return response, time.perf_counter() - start
+                response.raise_for_status()
+            except requests.RequestException:
+                if try_count >= self.max_retry:
+                    raise
+            time.sleep(backoff_delay(try_count, self.retry_backoff))
+            try_count += 1
+
+
+class SportSystemResultsSpider(SportSystemResultsMixin, Spider):
+    """A spider to crawl results from SportSystems."""
 
-        return parser.extract_total(response.content)
+
+def pos_start(url):
+    """The ``posStart`` of a results page URL."""
+    query = urllib.parse.urlsplit(url).query
+    return int(urllib.parse.parse_qs(query)['posStart'][0])
+
+
+def get_results_spider(engine='process', mixin=None, prefix=None):
+    """The results spider class for the given crawl engine.
+
+    :arg str engine: Either ``'process'`` for the multiprocessing
+        :class:`Spider` or ``'async'`` for the asyncio based
+        :class:`sport_systems.aio.AsyncSpider`.
+    :arg mixin: An optional class to mix in ahead of the spider.
+    :arg str prefix: Prepended to the spider's name for the mixed in
+        class.
+    """
+    if engine == 'process':
+        base = SportSystemResultsSpider
+    elif engine == 'async':
+        from .aio import AsyncSportSystemResultsSpider
+        base = AsyncSportSystemResultsSpider
+    else:
+        raise ValueError('Unknown crawl engine %r' % engine)
+
+    if mixin is None:
+        return base
+    return type(prefix + base.__name__, (mixin, base), {})
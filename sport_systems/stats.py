@@ -1,43 +1,410 @@
 """Statistics module."""
 
+from array import array
+import bisect
 from collections import namedtuple, defaultdict
+import datetime
+import functools
+import itertools
+import operator
+import sys
 
 Result = namedtuple('Result', ['time', 'name'])
 DEFAULT_PERCENTILES = (50, 66, 75, 80, 90, 95, 98, 99, 100)
 
 
-def create_buckets(results):
-    """Group a sorted result set into buckets."""
-    buckets = defaultdict(lambda: [])
+#: Markers in place of a finish time for runners who didn't finish
+#: (``DNF``), start (``DNS``) or were disqualified.
+NOT_FINISHED = frozenset(['DNF', 'DNS', 'DQ', 'DSQ'])
 
-    for result in results:
-        key = result.time.strftime('%H-%M')
-        buckets[key].append(result)
+_DAY = 24 * 3600
 
-    return buckets
 
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, or ``None`` if it isn't installed.
 
-def generate_percentiles(results, percentiles=DEFAULT_PERCENTILES):
-    """Percentage distribution of the results.
+    Imported on first use rather than with this module, as it's slow to
+    import and ``stats`` alone often doesn't need it.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
 
-    I.e. At what point had 50%, 75% and 90% of results completed?
+
+def to_seconds(time):
+    """The number of seconds in a time from :func:`to_time`."""
+    if isinstance(time, datetime.timedelta):
+        return int(time.total_seconds())
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+def parse_seconds(text):
+    """The seconds in a ``H:MM:SS`` time, ``None`` if it isn't one.
+
+    The hours may run past 24, as in ultra events. Cells are sliced at
+    the colons rather than split, saving a list per call.
+    """
+    try:
+        if text[-3] != ':' or text[-6] != ':':
+            return None
+        return (int(text[:-6]) * 3600 + int(text[-5:-3]) * 60
+                + int(text[-2:]))
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def parse_times(texts):
+    """:func:`parse_seconds` of many cells, e.g. a column of a CSV.
+
+    Finish times bunch up, so each distinct cell is only parsed once.
+    Empty cells and those in :data:`NOT_FINISHED` are ``None``.
+
+    :returns: A list of seconds, or ``None``, in the order given.
+    """
+    seen = {}
+    found = []
+    append = found.append
+    for text in texts:
+        try:
+            append(seen[text])
+        except KeyError:
+            seconds = seen[text] = parse_seconds(text)
+            append(seconds)
+    return found
+
+
+def to_time(seconds):
+    """The ``datetime.time`` for a number of seconds since midnight.
+
+    Times of a day or more don't fit a ``datetime.time``, so are
+    returned as a ``datetime.timedelta``.
+    """
+    if seconds >= _DAY:
+        return datetime.timedelta(seconds=seconds)
+    return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class NameTable(object):
+    """Interned runner names, referred to by index.
+
+    A single table can be shared by many :class:`Results` so a runner
+    appearing in several events is only stored once.
+    """
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+    @classmethod
+    def from_names(cls, names):
+        """A table of already unique names, indexed in the given order."""
+        table = cls()
+        table.names = list(names)
+        # Built on demand, read only tables never need it
+        table._index = None
+        return table
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return self.names[index]
+
+    def add(self, name):
+        """The index of the given name, adding it if it's new."""
+        if self._index is None:
+            self._index = {
+                name: index for index, name in enumerate(self.names)
+            }
+        index = self._index.get(name)
+        if index is None:
+            index = self._index[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return index
+
+
+class Results(object):
+    """A compact, columnar set of results.
+
+    Finish times are held as seconds in an unsigned int array and names
+    as indexes into a :class:`NameTable`, rather than as one
+    :class:`Result` per runner. Indexing still returns :class:`Result`
+    tuples, so a ``Results`` can be used wherever a list of them was.
+
+    The columns may also be read only ``memoryview`` objects, as when
+    loaded by :func:`sport_systems.binary.load`, in which case the
+    results can't be appended to.
+
+    :arg NameTable names: The table to store names in, a new one is
+        created if not given.
+    """
+    def __init__(self, names=None):
+        self.names = names if names is not None else NameTable()
+        self.times = array('I')
+        self.name_ids = array('I')
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Result(
+            time=to_time(self.times[index]),
+            name=self.names[self.name_ids[index]],
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, seconds, name):
+        """Add a result finishing ``seconds`` after the start."""
+        self.times.append(seconds)
+        self.name_ids.append(self.names.add(name))
+
+    def sort(self):
+        """Sort the results in place by finish time.
+
+        The sort is stable, runners with the same time keep their order.
+        Results that are already in order, e.g. loaded from a CSV written
+        in ``pos`` order, are left as they are.
+        """
+        times = self.times
+        if all(map(operator.le, times, itertools.islice(times, 1, None))):
+            return
+
+        numpy = _numpy()
+        if numpy is not None:
+            times = numpy.frombuffer(self.times, dtype=numpy.uint32)
+            name_ids = numpy.frombuffer(self.name_ids, dtype=numpy.uint32)
+            order = numpy.argsort(times, kind='stable')
+            self.times = array('I', times[order].tobytes())
+            self.name_ids = array('I', name_ids[order].tobytes())
+            return
+
+        order = sorted(range(len(times)), key=times.__getitem__)
+        self.times = array('I', [times[i] for i in order])
+        self.name_ids = array('I', [self.name_ids[i] for i in order])
+
+
+class LiveStats(object):
+    """Exact percentiles and histograms of results as they arrive.
+
+    Finish times are whole seconds, so rather than keeping the times
+    sorted we count how many results finished in each second. Adding a
+    result is constant time, and the sorted order is implied by the
+    counts, so percentiles and histograms can be read at any point of a
+    crawl and match those of the finished, sorted :class:`Results`.
     """
-    data = []
-    total = len(results)
-    cur_index = 0
+    def __init__(self):
+        self.counts = array('I')
+        self.total = 0
+        self.fastest = None
+        self.slowest = None
+
+    def __len__(self):
+        return self.total
+
+    def add(self, seconds):
+        """Count a result finishing ``seconds`` after the start."""
+        if seconds >= len(self.counts):
+            # Grow in whole hours to keep resizes rare
+            grow = (seconds // 3600 + 1) * 3600 - len(self.counts)
+            self.counts.extend(array('I', [0]) * grow)
+        self.counts[seconds] += 1
+        self.total += 1
+        if self.fastest is None or seconds < self.fastest:
+            self.fastest = seconds
+        if self.slowest is None or seconds > self.slowest:
+            self.slowest = seconds
+
+    def extend(self, times):
+        """Count several results."""
+        for seconds in times:
+            self.add(seconds)
 
-    if not results:
-        return data
+    def _cumulative(self):
+        """Results finished by each second from the fastest."""
+        return list(itertools.accumulate(
+            self.counts[self.fastest:self.slowest + 1]
+        ))
 
+    def percentile_seconds(self, percentiles=DEFAULT_PERCENTILES):
+        """As :func:`percentile_seconds` of the results so far."""
+        if not self.total:
+            return array('I')
+
+        cumulative = self._cumulative()
+        return array('I', [
+            self.fastest + bisect.bisect_right(cumulative, index)
+            for _, index in _percentile_points(self.total, percentiles)
+        ])
+
+    def generate_percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """As :func:`generate_percentiles` of the results so far."""
+        if not self.total:
+            return []
+
+        points = _percentile_points(self.total, percentiles)
+        found = self.percentile_seconds(percentiles)
+        return [
+            (percentile, to_time(seconds))
+            for (percentile, _), seconds in zip(points, found)
+        ]
+
+    def histogram(self, bin_size=60):
+        """As :func:`histogram` of the results so far."""
+        if not self.total:
+            return 0, array('I')
+
+        first = self.fastest // bin_size
+        last = self.slowest // bin_size
+        counts = self.counts
+        return first * bin_size, array('I', [
+            sum(counts[edge * bin_size:(edge + 1) * bin_size])
+            for edge in range(first, last + 1)
+        ])
+
+
+def _is_buffer(times):
+    """Whether NumPy can view the times without copying them."""
+    return (isinstance(times, (array, memoryview)) and
+            _numpy() is not None)
+
+
+def _seconds(results):
+    """Finish times, in seconds, of a :class:`Results` or list.
+
+    An ``array('I')``, or a ``memoryview`` of one, is taken to already
+    be sorted seconds.
+    """
+    if isinstance(results, Results):
+        return results.times
+    if isinstance(results, (array, memoryview)):
+        return results
+    return [to_seconds(result.time) for result in results]
+
+
+def percentile_indexes(total, percentiles=DEFAULT_PERCENTILES):
+    """The index of the result at which each percentile is passed.
+
+    That is the first index ``i`` where ``i / total * 100`` exceeds the
+    percentile, worked out directly rather than by a scan. Percentiles
+    that are never exceeded are left out.
+    """
+    indexes = []
     for percentile in percentiles:
-        for index, result in enumerate(results[cur_index:], start=cur_index):
-            if (index / total) * 100 > percentile:
-                data.append((percentile, result.time))
-                cur_index = index
-                break
+        index = int(percentile * total // 100) + 1
+        # Settle any float rounding against the comparison itself
+        while index > 0 and (index - 1) / total * 100 > percentile:
+            index -= 1
+        while index < total and not index / total * 100 > percentile:
+            index += 1
+        if index < total:
+            indexes.append((percentile, index))
+    return indexes
 
+
+def _percentile_points(total, percentiles):
+    points = percentile_indexes(total, percentiles)
     if percentiles[-1] == 100:
         # Special case for the final result
-        data.append((100, results[-1].time))
+        points.append((100, total - 1))
+    return points
+
+
+def _take(times, indexes):
+    """An ``array('I')`` of the times at the given indexes."""
+    if _is_buffer(times):
+        numpy = _numpy()
+        found = numpy.frombuffer(times, dtype=numpy.uint32)[indexes]
+        return array('I', found.tobytes())
+    return array('I', [times[index] for index in indexes])
+
+
+def percentile_seconds(results, percentiles=DEFAULT_PERCENTILES):
+    """Finish times, in seconds, at each percentile as an ``array('I')``.
+
+    Follows :func:`generate_percentiles`, ``100`` is always the final
+    result.
+    """
+    times = _seconds(results)
+    if not len(times):
+        return array('I')
+
+    points = _percentile_points(len(times), percentiles)
+    return _take(times, [index for _, index in points])
+
+
+def histogram(results, bin_size=60):
+    """Count sorted results into fixed width time bins.
+
+    :arg int bin_size: The width of each bin in seconds.
+    :returns: A ``(first_bin_start, counts)`` tuple, where ``counts`` is
+        an ``array('I')`` and bin ``n`` covers ``first_bin_start + n *
+        bin_size`` up to the next bin.
+    """
+    times = _seconds(results)
+    if not len(times):
+        return 0, array('I')
+
+    first, last = times[0] // bin_size, times[-1] // bin_size
+
+    if _is_buffer(times):
+        numpy = _numpy()
+        bins = numpy.frombuffer(times, dtype=numpy.uint32) // bin_size
+        counts = numpy.bincount(bins - first, minlength=last - first + 1)
+        return first * bin_size, array('I', counts.astype('uint32').tobytes())
+
+    # Sorted, so each bin's count is the distance between two bisects
+    edges = [
+        bisect.bisect_left(times, edge * bin_size)
+        for edge in range(first, last + 2)
+    ]
+    counts = array('I', [end - start for start, end
+                         in zip(edges, edges[1:])])
+    return first * bin_size, counts
+
+
+def create_buckets(results, bin_size=60):
+    """Group a sorted result set into buckets.
+
+    Buckets are keyed by the ``HH-MM`` their bin starts at.
+
+    :arg int bin_size: The width of each bucket in seconds.
+    """
+    buckets = defaultdict(lambda: [])
+    first_bin, counts = histogram(results, bin_size)
+
+    start = 0
+    for offset, count in enumerate(counts):
+        if not count:
+            continue
+        seconds = first_bin + offset * bin_size
+        key = '%02d-%02d' % (seconds // 3600, seconds // 60 % 60)
+        buckets[key] = results[start:start + count]
+        start += count
+
+    return buckets
+
+
+def generate_percentiles(results, percentiles=DEFAULT_PERCENTILES):
+    """Percentage distribution of the results.
+
+    I.e. At what point had 50%, 75% and 90% of results completed?
+
+    :arg results: A sorted :class:`Results`, or list of :class:`Result`.
+    """
+    times = _seconds(results)
+    if not len(times):
+        return []
 
-    return data
+    points = _percentile_points(len(times), percentiles)
+    found = _take(times, [index for _, index in points])
+    return [
+        (percentile, to_time(seconds))
+        for (percentile, _), seconds in zip(points, found)
+    ]
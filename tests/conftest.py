@@ -26,3 +26,26 @@ def results_1():
         stats.Result(time=time(1, 30, 15), name='foo'),
         stats.Result(time=time(1, 30, 20), name='foo'),
     ]
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    from sport_systems.spider import SportSystemResultsMixin
+    from .stub_server import StubServer
+
+    with StubServer(total=95) as server:
+        monkeypatch.setattr(
+            SportSystemResultsMixin, 'BASE_URL', server.base_url
+        )
+        yield server
+
+
+@pytest.fixture(params=['process', 'async'])
+def engine(request):
+    return request.param
+
+
+@pytest.fixture
+def engine_kwargs(engine):
+    """Two concurrent downloads, however the engine spells it."""
+    return {'N': 2} if engine == 'process' else {'concurrency': 2}
@@ -0,0 +1,209 @@
+"""A local stand in for the SportsSystems results API.
+
+Serves synthetic ``/ss/results/data/<event_id>/`` pages built from the
+``response-1.xml`` fixture so the spiders can be exercised (and timed)
+without touching the real site.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+BASE_DIR = os.path.dirname(__file__)
+TEMPLATE_PATH = os.path.join(BASE_DIR, 'response-1.xml')
+
+HEADER = (
+    '<?xml version="1.0" encoding="ISO-8859-1" standalone="no"?>\n'
+    '<rows pos="{pos}" total_count="{total}">\n'
+)
+FOOTER = '</rows>\n'
+
+
+def _load_row_template(path=TEMPLATE_PATH):
+    """Turn the first row of the fixture into a format string."""
+    with open(path, 'r', encoding='iso-8859-1') as fin:
+        content = fin.read()
+
+    row = re.search(r'    <row id="1">.*?</row>\n', content, re.S).group(0)
+    row = row.replace('{', '{{').replace('}', '}}')
+    row = row.replace('<row id="1">', '<row id="{id}">')
+    row = row.replace(
+        '<cell class="grid_pos">1</cell>', '<cell class="grid_pos">{id}</cell>'
+    )
+    row = row.replace('1:10:57', '{time}')
+    row = row.replace('Tom Jervis', '{name}')
+    return row
+
+
+ROW_TEMPLATE = _load_row_template()
+
+
+def render_row(position):
+    """Render a single synthetic row for the given 1-based position."""
+    seconds = 3600 + position * 3
+    finish = '%d:%02d:%02d' % (
+        seconds // 3600, seconds % 3600 // 60, seconds % 60
+    )
+    return ROW_TEMPLATE.format(
+        id=position, time=finish, name='Runner %d' % position,
+    )
+
+
+def render_page(total, pos_start, count):
+    """Render a page of ``count`` results starting at ``pos_start``."""
+    end = min(total, pos_start + count)
+    parts = [HEADER.format(pos=pos_start, total=total)]
+    parts.extend(render_row(index + 1) for index in range(pos_start, end))
+    parts.append(FOOTER)
+    return ''.join(parts).encode('iso-8859-1')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer results queries using the owning server's settings."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent separately, without TCP_NODELAY every
+    # keep-alive response would stall on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        match = re.match(r'^/ss/results/data/(\d+)/$', parsed.path)
+        total = self.server.total_for(int(match.group(1))) if match else None
+        if total is None:
+            self.send_error(404)
+            return
+
+        params = urllib.parse.parse_qs(parsed.query)
+        pos_start = int(params.get('posStart', ['0'])[0])
+        count = int(params.get('count', ['20'])[0])
+
+        server = self.server
+        if server.max_count:
+            count = min(count, server.max_count)
+
+        server.record_request()
+        delay = server.latency + server.row_latency * count
+        if delay:
+            time.sleep(delay)
+
+        if (pos_start in server.failing or server.flaky_once(pos_start) or
+                server.should_fail()):
+            self.send_error(503)
+            return
+
+        body = render_page(total, pos_start, count)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('ETag', etag)
+        if server.compress and 'gzip' in self.headers.get(
+                'Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep test and benchmark output quiet
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """A threaded HTTP server serving synthetic results.
+
+    :arg int total: The number of runners the fake event has.
+    :arg float latency: Seconds to sleep before answering each request.
+    :arg float row_latency: Extra seconds to sleep per row asked for.
+    :arg int max_count: The largest page the server will return, larger
+        requests are silently truncated as the real API does.
+    :arg dict totals: Per event totals, if given other events are 404s.
+    :arg set failing: ``posStart`` values that always return a 503.
+    :arg set flaky: ``posStart`` values whose first request returns a
+        503.
+    :arg float error_rate: The fraction of other requests that randomly
+        return a 503.
+    :arg int seed: Seeds the random errors, for repeatable runs.
+    :arg bool compress: Gzip pages for clients that accept it.
+    """
+    daemon_threads = True
+
+    def __init__(self, total=3857, latency=0.0, row_latency=0.0,
+                 max_count=None, totals=None, failing=(), flaky=(),
+                 error_rate=0.0, seed=None, compress=False,
+                 address=('127.0.0.1', 0)):
+        super().__init__(address, StubHandler)
+        self.compress = compress
+        self.total = total
+        self.totals = totals
+        self.failing = set(failing)
+        self.flaky = set(flaky)
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.latency = latency
+        self.row_latency = row_latency
+        self.max_count = max_count
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def total_for(self, event_id):
+        """The number of runners in an event, ``None`` if it's unknown."""
+        if self.totals is None:
+            return self.total
+        return self.totals.get(event_id)
+
+    def flaky_once(self, pos_start):
+        """Whether to fail a flaky page, only the first time it's asked
+        for."""
+        with self._lock:
+            if pos_start in self.flaky:
+                self.flaky.discard(pos_start)
+                return True
+            return False
+
+    def should_fail(self):
+        """Whether to fail the current request at random."""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def record_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self):
+        """A ``BASE_URL`` suitable for the results spiders."""
+        host, port = self.server_address[:2]
+        return 'http://%s:%d/ss/results/data/{event_id}/' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,61 @@
+from sport_systems import parser
+from sport_systems.aio import AsyncSportSystemResultsSpider
+
+
+def test_crawl(stub_server):
+    rows = []
+
+    def callback(res):
+        rows.extend(parser.parse(res.content))
+
+    spider = AsyncSportSystemResultsSpider(
+        event_id=1740, callback=callback, concurrency=4
+    )
+    spider.go()
+
+    assert len(rows) == 95
+    assert sorted(int(row['pos']) for row in rows) == list(range(1, 96))
+
+
+def test_fetch_stats(stub_server):
+    spider = AsyncSportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, concurrency=2,
+        page_size=20,
+    )
+    spider.go()
+
+    stats = spider.fetch_stats
+    # Including the first page, fetched up front before the workers
+    assert stats.requests == 5
+    assert stats.connections_opened <= 3
+    assert stats.connections_reused >= 2
+
+
+def test_fetch_stats_count_compressed_bytes(stub_server):
+    stub_server.compress = True
+    received = []
+    spider = AsyncSportSystemResultsSpider(
+        event_id=1740, callback=lambda res: received.append(res.content),
+        concurrency=2, page_size=20,
+    )
+    spider.go()
+
+    assert 0 < spider.fetch_stats.bytes_received < sum(map(len, received))
+
+
+def test_processing_failures_are_dead_letters(stub_server):
+    def rows_or_fail(content):
+        if b'<row id="41">' in content:
+            raise ValueError('Unparseable')
+        return content.count(b'<row ')
+
+    spider = AsyncSportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, concurrency=2,
+        page_size=20, processor=rows_or_fail,
+    )
+    spider.go()
+
+    url = spider.build_url(page_num=3, count=20)
+    assert [letter.url for letter in spider.dead_letters] == [url]
+    # Not retried
+    assert stub_server.request_count == 5
@@ -0,0 +1,68 @@
+from array import array
+import io
+
+import pytest
+
+from sport_systems import analytics, csv_handler, stats
+
+CSV = (
+    'pos\ttime\tname\tteam\tcat\tnum\tchip\tgrade\n'
+    '1\t1:00:05\tA\tClub\tSenior\t1\t0:59:58\t80\n'
+    '2\t1:02:00\tB\t\tV40\t2\t1:01:00\t75\n'
+    '3\t1:03:30\tC\tClub\tSenior\t3\t\t70\n'
+    '4\t1:10:00\tD\tClub\tV40\t4\t1:09:00\t70\n'
+    '\tDNF\tE\tClub\tSenior\t5\t\t\n'
+    '5\t1:20:00\tF\t\tSenior\t6\t1:30:00\t60\n'
+)
+
+
+@pytest.fixture
+def table():
+    return analytics.ResultTable.load(io.StringIO(CSV))
+
+
+def test_table(table):
+    assert len(table) == 5
+    assert table.labels['cat'] == ['Senior', 'V40']
+    assert list(table.groups['team']) == [0, 1, 0, 0, 1]
+    assert table.chips[2] == analytics.NO_CHIP
+
+
+def test_summarise_matches_stats(table):
+    summary = analytics.summarise(table, by='cat')
+    assert sorted(summary) == ['Senior', 'V40']
+
+    for cat, group in summary.items():
+        with io.StringIO(CSV) as fin:
+            results = stats.Results()
+            for row in csv_handler.read_rows(fin):
+                if row.cat == cat and row.finished:
+                    results.append(row.time, row.name)
+        assert group.count == len(results)
+        assert group.mean == sum(results.times) / len(results)
+        assert group.percentiles == stats.generate_percentiles(results)
+        assert group.histogram == stats.histogram(results)
+
+
+def test_chip_and_delta(table):
+    chips = analytics.summarise(table, by='team', value='chip')
+    # No chip time for C, and F's is slower than their gun time
+    assert chips['Club'].count == 2
+    assert chips[''].count == 1
+
+    deltas = analytics.summarise(table, by='cat', value='delta')
+    assert deltas['Senior'].mean == 7
+    assert deltas['V40'].mean == 60
+
+
+def test_unknown_value(table):
+    with pytest.raises(ValueError):
+        analytics.summarise(table, value='pace')
+
+
+def test_sort_groups():
+    values, bounds = analytics.sort_groups(
+        array('I', [5, 3, 9, 1]), array('I', [1, 0, 1, 2]), 4
+    )
+    assert list(values) == [3, 5, 9, 1]
+    assert bounds == [0, 1, 3, 4, 4]
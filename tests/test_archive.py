@@ -0,0 +1,95 @@
+import io
+
+from sport_systems import archive, csv_handler, stats
+
+
+def _rows(count, offset=0, team='Warrington AC'):
+    return [
+        (str(pos), stats.to_time(3600 + (pos + offset) * 7).strftime(
+            '%-H:%M:%S'), 'Runner %d' % pos, team, 'Senior Men', str(pos),
+         '1:00:%02d' % (pos % 60), '80.00')
+        for pos in range(1, count + 1)
+    ]
+
+
+def _archive(tmpdir):
+    store = archive.Archive(str(tmpdir.join('results.sqlite')))
+    for event_id, offset in ((1740, 0), (1741, 10)):
+        store.begin(event_id)
+        store.add(event_id, _rows(30, offset))
+        store.commit()
+    return store
+
+
+def test_results_feed_stats(tmpdir):
+    store = _archive(tmpdir)
+    results = store.results(1740)
+    assert len(results) == 30
+    assert results[0] == stats.Result(stats.to_time(3607), 'Runner 1')
+    assert store.percentiles() == {
+        1740: stats.generate_percentiles(results),
+        1741: stats.generate_percentiles(store.results(1741)),
+    }
+
+
+def test_search(tmpdir):
+    store = _archive(tmpdir)
+    entries = store.search(name='runner 5')
+    assert [(entry.event_id, entry.pos) for entry in entries] == [
+        (1740, 5), (1741, 5),
+    ]
+    assert entries[0].seconds == 3635
+    assert entries[0].chip == 3605
+
+    assert len(store.search(team='WARRINGTON AC', event_ids=[1741])) == 30
+    assert len(store.search(chip_between=(3600, 3609))) == 18
+
+
+def test_reload_replaces_event(tmpdir):
+    store = _archive(tmpdir)
+    store.begin(1740)
+    store.add(1740, _rows(10))
+    store.commit()
+    assert len(store.results(1740)) == 10
+    assert len(store.results(1741)) == 30
+
+
+def test_commit_counts_loaded_events(tmpdir):
+    store = _archive(tmpdir)
+    store.begin(1740)
+    store.add(1740, _rows(10))
+    # Not begun, so not recounted
+    store.add(1741, _rows(5))
+    store.commit()
+    counts = dict(store.db.execute('SELECT event_id, results FROM events'))
+    assert counts == {1740: 10, 1741: 30}
+
+
+def test_events_by_year(tmpdir):
+    store = _archive(tmpdir)
+    store.set_date(1740, '2016-05-01')
+    store.set_date(1741, '2017-05-01')
+    assert store.events() == [1740, 1741]
+    assert store.events(year=2016) == [1740]
+    assert list(store.percentiles(year=2017)) == [1741]
+
+
+def test_ingest_csv(tmpdir):
+    store = archive.Archive(str(tmpdir.join('results.sqlite')))
+    out = io.StringIO()
+    writer = csv_handler.OrderedWriter(out)
+    writer.writerow(csv_handler.FIELDNAMES)
+    writer.write(_rows(5) + [('', 'DNF', 'Walker', '', '', '', '', '')])
+    writer.close()
+
+    store.ingest_csv(1740, io.StringIO(out.getvalue()))
+    assert len(store.search(event_ids=[1740])) == 6
+    # Runners without a time aren't finishers
+    assert len(store.results(1740)) == 5
+
+
+def test_build_feeds_archive(stub_server, tmpdir):
+    store = archive.Archive(str(tmpdir.join('results.sqlite')))
+    csv_handler.build(1740, io.StringIO(), N=2, page_size=20, archive=store)
+    assert len(store.results(1740)) == 95
+    assert store.search(name='Runner 42')[0].pos == 42
@@ -0,0 +1,137 @@
+import os
+import resource
+
+from sport_systems import csv_handler, retry
+from sport_systems.batch import SportSystemBatchSpider
+
+
+def _rows(path):
+    with open(path, 'r') as fin:
+        return len(csv_handler.build_results(fin))
+
+
+def test_build_batch(stub_server, tmpdir):
+    stub_server.totals = {1: 95, 2: 7, 3: 0}
+
+    failed = csv_handler.build_batch(
+        [1, 2, 3, 4], directory=str(tmpdir), N=2, page_size=20
+    )
+
+    assert list(failed) == [4]
+    assert _rows(str(tmpdir.join('race-1.csv'))) == 95
+    assert _rows(str(tmpdir.join('race-2.csv'))) == 7
+    assert _rows(str(tmpdir.join('race-3.csv'))) == 0
+    assert not os.path.exists(str(tmpdir.join('race-4.csv')))
+
+
+def test_dead_letters_fail_event(stub_server, tmpdir):
+    stub_server.totals = {1: 95, 2: 7}
+    # Only event 1 has a second page
+    stub_server.failing = {20}
+
+    failed = csv_handler.build_batch(
+        [1, 2], directory=str(tmpdir), N=2, page_size=20, max_retry=1,
+        retry_backoff=0.01,
+    )
+
+    assert list(failed) == [1]
+    assert isinstance(failed[1], retry.PagesFailed)
+    assert len(failed[1].dead_letters) == 1
+    assert not os.path.exists(str(tmpdir.join('race-1.csv')))
+    assert _rows(str(tmpdir.join('race-2.csv'))) == 7
+
+
+def test_written_to_partial_files(stub_server, tmpdir, monkeypatch):
+    stub_server.totals = {1: 95, 2: 7}
+    crawled = SportSystemBatchSpider.go
+    listed = []
+
+    def go(spider):
+        crawled(spider)
+        listed.extend(sorted(os.listdir(str(tmpdir))))
+
+    monkeypatch.setattr(SportSystemBatchSpider, 'go', go)
+    csv_handler.build_batch([1, 2], directory=str(tmpdir), N=2, page_size=20)
+
+    # Only renamed once the batch is done
+    assert listed == ['race-1.csv.part', 'race-2.csv.part']
+    assert sorted(os.listdir(str(tmpdir))) == ['race-1.csv', 'race-2.csv']
+
+
+def test_more_events_than_files(stub_server, tmpdir):
+    event_ids = list(range(1, 101))
+    stub_server.totals = {event_id: 7 for event_id in event_ids}
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # Room for the spider's pipes, but not a file per event
+    resource.setrlimit(
+        resource.RLIMIT_NOFILE, (len(os.listdir('/proc/self/fd')) + 64, hard)
+    )
+    try:
+        failed = csv_handler.build_batch(
+            event_ids, directory=str(tmpdir), N=2, page_size=20
+        )
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert failed == {}
+    assert _rows(str(tmpdir.join('race-100.csv'))) == 7
+
+
+class FullQueue(object):
+    """Has room for the events' plans, then is full."""
+    def __init__(self, spider):
+        self.spider = spider
+
+    def full(self):
+        return self.spider.planned == len(self.spider.events)
+
+
+def _plan_here(spider, totals):
+    """Plan events as queued, as a download process would, and record
+    the pages queued."""
+    spider.planned = 0
+    queued = []
+
+    def enqueue(url):
+        event = spider.event_for_url(url)
+        if url != event.base_url:
+            queued.append(event.event_id)
+            return
+        spider.planned += 1
+        spider.plan_queue.put(
+            (event.event_id, 20, totals[event.event_id], None)
+        )
+
+    spider.enqueue = enqueue
+    return queued
+
+
+def test_round_robin(stub_server):
+    totals = {1: 100, 2: 40, 3: 20}
+    spider = SportSystemBatchSpider(
+        event_ids=[1, 2, 3], callback=None, N=1, page_size=20
+    )
+    queued = _plan_here(spider, totals)
+    # Nothing is queued between plans while the pool is busy
+    spider.url_queue = FullQueue(spider)
+
+    spider.populate_urls()
+
+    assert queued == [1, 2, 1, 1, 1]
+
+
+def test_planned_by_pool(stub_server):
+    stub_server.totals = {1: 300, 2: 300, 3: 300}
+    spider = SportSystemBatchSpider(
+        event_ids=[1, 2, 3], callback=lambda result: None, N=2,
+    )
+
+    spider.go()
+
+    # Every probe and first page was fetched by the download processes
+    assert not hasattr(spider, '_fetcher')
+    assert stub_server.request_count > 3
+    assert sum(
+        stats.requests for stats in spider.worker_stats
+    ) == stub_server.request_count
+    assert spider.failed_events == {}
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from sport_systems import binary, csv_handler, stats
+
+
+def _results(results_1):
+    results = stats.Results()
+    for result in results_1:
+        results.append(stats.to_seconds(result.time), result.name)
+    return results
+
+
+def test_round_trip(results_1, tmpdir):
+    path = str(tmpdir.join('race-1.ssr'))
+    with open(path, 'wb') as out:
+        binary.dump(_results(results_1), out)
+
+    with open(path, 'rb') as fin:
+        results = csv_handler.build_results(fin)
+
+    assert isinstance(results.times, memoryview)
+    assert list(results) == results_1
+    assert stats.generate_percentiles(results) == (
+        stats.generate_percentiles(results_1)
+    )
+
+
+def test_from_list(results_1):
+    out = io.BytesIO()
+    binary.dump(results_1, out)
+    assert list(binary.loads(out.getvalue())) == results_1
+
+
+def test_empty():
+    out = io.BytesIO()
+    binary.dump(stats.Results(), out)
+    assert len(binary.load(io.BytesIO(out.getvalue()))) == 0
+
+
+def test_not_a_results_file():
+    with pytest.raises(binary.FormatError):
+        binary.loads(b'pos\ttime\tname\n' * 4)
+
+
+def test_scan(results_1, tmpdir):
+    for event_id in (1, 20):
+        with open(binary.path_for(event_id, str(tmpdir)), 'wb') as out:
+            binary.dump(_results(results_1), out)
+    tmpdir.join('race-1.csv').write('')
+
+    scanned = list(binary.scan(str(tmpdir)))
+    assert [event_id for event_id, _ in scanned] == [1, 20]
+    assert len(scanned[1][1]) == len(results_1)
@@ -0,0 +1,82 @@
+import time
+
+from sport_systems import cache
+from sport_systems.spider import get_results_spider
+
+
+def test_cache_key():
+    assert cache.cache_key('http://Example.com/a/?count=20&posStart=0') == (
+        cache.cache_key('http://example.com/a/?posStart=0&count=20')
+    )
+    assert cache.cache_key('http://example.com/a/?posStart=0') != (
+        cache.cache_key('http://example.com/a/?posStart=20')
+    )
+
+
+class TestResponseCache(object):
+    def test_round_trip(self, tmpdir):
+        responses = cache.ResponseCache(str(tmpdir))
+        url = 'http://example.com/?posStart=0'
+        assert responses.get(url) is None
+
+        responses.put(url, 200, b'<rows/>' * 100, {'ETag': '"x"', 'X': 'y'})
+        response = responses.get(url)
+        assert response.content == b'<rows/>' * 100
+        assert response.ok
+        assert response.headers == {'etag': '"x"'}
+        assert b''.join(response.iter_content(3)) == response.content
+        # Stored compressed
+        assert responses.size < 700
+
+    def test_ttl(self, tmpdir):
+        responses = cache.ResponseCache(str(tmpdir), ttl=0.05)
+        responses.put('http://example.com/', 200, b'body')
+        time.sleep(0.1)
+        assert responses.get('http://example.com/') is None
+        assert len(responses) == 0
+
+    def test_lru_eviction(self, tmpdir):
+        responses = cache.ResponseCache(str(tmpdir))
+        for page in range(3):
+            responses.put('http://example.com/%d' % page, 200,
+                          str(page).encode() * 10)
+        size = responses.size
+        # Touch the first page, so the second is least recently used
+        responses.get('http://example.com/0')
+
+        responses.max_size = size - 1
+        responses.prune()
+        assert len(responses) == 2
+        assert responses.get('http://example.com/1') is None
+        assert responses.get('http://example.com/0') is not None
+
+
+def test_crawl_from_cache(stub_server, tmpdir, engine, engine_kwargs):
+    responses = cache.ResponseCache(str(tmpdir))
+
+    def crawl():
+        spider = get_results_spider(engine)(
+            event_id=1740, callback=lambda res: None, cache=responses,
+            page_size=20, **engine_kwargs
+        )
+        spider.go()
+        return spider
+
+    crawl()
+    requests = stub_server.request_count
+    assert requests > 0
+
+    # The first page, fetched up front, and the rest all come from the
+    # cache
+    second = crawl()
+    assert stub_server.request_count == requests
+    assert second.fetch_stats.cache_hits == 5
+
+
+def test_total_from_cache(stub_server, tmpdir):
+    responses = cache.ResponseCache(str(tmpdir))
+    spider_class = get_results_spider()
+    for _ in range(2):
+        spider = spider_class(event_id=1740, callback=None, cache=responses)
+        assert spider.total_count == 95
+    assert stub_server.request_count == 1
@@ -0,0 +1,86 @@
+import csv
+import os
+
+from sport_systems import checkpoint
+
+
+def _positions(path):
+    with open(path, 'r', newline='') as fin:
+        rows = list(csv.reader(fin, delimiter='\t'))
+    assert rows[0][0] == 'pos'
+    return sorted(int(row[0]) for row in rows[1:])
+
+
+def test_build(stub_server, tmpdir, engine, engine_kwargs):
+    path = str(tmpdir.join('race-1740.csv'))
+
+    spider = checkpoint.build(1740, path, engine=engine, page_size=20,
+                              **engine_kwargs)
+    assert spider.dead_letters == []
+    assert _positions(path) == list(range(1, 96))
+    assert not os.path.exists(checkpoint.partial_path(path))
+    assert not os.path.exists(checkpoint.checkpoint_path(path))
+
+
+def test_resume(stub_server, tmpdir, engine, engine_kwargs):
+    path = str(tmpdir.join('race-1740.csv'))
+
+    stub_server.failing = {40, 80}
+    spider = checkpoint.build(1740, path, engine=engine, page_size=20,
+                              max_retry=0, **engine_kwargs)
+    assert len(spider.dead_letters) == 2
+    # Nothing that looks complete is left behind
+    assert not os.path.exists(path)
+
+    stub_server.failing = set()
+    stub_server.request_count = 0
+    spider = checkpoint.build(1740, path, engine=engine, **engine_kwargs)
+    assert spider.dead_letters == []
+    # Only the missing pages, plus a request for the total
+    assert stub_server.request_count == 3
+    assert _positions(path) == list(range(1, 96))
+
+
+def test_torn_write_is_dropped(stub_server, tmpdir):
+    path = str(tmpdir.join('race-1740.csv'))
+    stub_server.failing = {60, 80}
+    checkpoint.build(1740, path, page_size=20, max_retry=0, N=1)
+
+    # A crash between writing a page and committing it
+    with open(checkpoint.partial_path(path), 'ab') as out:
+        out.write(b'81\t1:00:00\tRunner 81\n')
+    with open(checkpoint.checkpoint_path(path), 'a') as out:
+        out.write('[80, ')
+
+    # Pages committed after the torn line are still read back
+    stub_server.failing = {80}
+    checkpoint.build(1740, path, N=1, max_retry=0)
+    loaded = checkpoint.Checkpoint.load(checkpoint.checkpoint_path(path))
+    assert sorted(loaded.pages) == [0, 20, 40, 60]
+
+    stub_server.failing = set()
+    checkpoint.build(1740, path, N=1)
+    assert _positions(path) == list(range(1, 96))
+
+
+def test_overwrite(stub_server, tmpdir):
+    path = str(tmpdir.join('race-1740.csv'))
+    stub_server.failing = {20}
+    checkpoint.build(1740, path, page_size=20, max_retry=0, N=1)
+
+    stub_server.failing = set()
+    stub_server.request_count = 0
+    checkpoint.build(1740, path, page_size=20, overwrite=True, N=1)
+    assert stub_server.request_count == 5
+    assert _positions(path) == list(range(1, 96))
+
+
+def test_load_ignores_torn_line(tmpdir):
+    path = str(tmpdir.join('race-1.csv.checkpoint'))
+    with open(path, 'w') as out:
+        out.write('{"page_size": 20}\n[0, 100]\n[20, 2')
+
+    loaded = checkpoint.Checkpoint.load(path)
+    assert loaded.page_size == 20
+    assert loaded.pages == {0: 100}
+    assert loaded.size == 100
@@ -0,0 +1,175 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from sport_systems import cli
+
+
+CSV = (
+    'pos\ttime\tname\tteam\tcat\tnum\tchip\tgrade\n'
+    '1\t1:00:05\tFast\tClub\tSenior\t7\t0:59:58\t\n'
+    '2\t1:10:00\tSlow\t\tV40\t8\t\t\n'
+    '\tDNF\tQuitter\t\tV40\t9\t\t\n'
+)
+
+
+def _event(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('race-1740.csv').write(CSV)
+
+
+def test_stats(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    assert cli.main(['stats', '1740']) == 0
+    out = capsys.readouterr().out
+    assert '100%\t01:10:00' in out
+    # Cached for next time
+    assert tmpdir.join('race-1740.ssr').check()
+
+
+def test_stats_other_file(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    assert cli.main(['stats', '1740']) == 0
+    tmpdir.join('other.csv').write(CSV.replace('1:10:00', '1:20:00'))
+    assert cli.main(['stats', '1740', '--file', 'other.csv']) == 0
+    assert '100%\t01:20:00' in capsys.readouterr().out
+    # Cached separately, leaving the event's cache alone
+    assert tmpdir.join('other.ssr').check()
+    assert cli.main(['stats', '1740']) == 0
+    assert '100%\t01:10:00' in capsys.readouterr().out
+
+
+def test_stats_damaged_cache(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    assert cli.main(['stats', '1740']) == 0
+    cache = tmpdir.join('race-1740.ssr')
+    size = cache.size()
+    with open(str(cache), 'r+b') as out:
+        out.truncate(size - 4)
+    # Still newer than the CSV
+    os.utime(str(cache), (os.path.getmtime(str(cache)) + 10, ) * 2)
+
+    assert cli.main(['stats', '1740']) == 0
+    assert '100%\t01:10:00' in capsys.readouterr().out
+    assert cache.size() == size
+
+
+def test_stats_cache_not_writable(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    # Can neither be read nor replaced
+    tmpdir.join('race-1740.ssr').mkdir()
+
+    assert cli.main(['stats', '1740']) == 0
+    assert '100%\t01:10:00' in capsys.readouterr().out
+    # The temporary file was cleaned up
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'race-1740.csv', 'race-1740.ssr',
+    ]
+
+
+def test_stats_by_category(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    assert cli.main(['stats', '1740', '--by', 'cat']) == 0
+    out = capsys.readouterr().out
+    assert 'Senior\t1 runners\tmean 01:00:05' in out
+    assert 'V40\t1 runners\tmean 01:10:00' in out
+
+
+def test_stats_not_crawled(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    assert cli.main(['stats', '1740']) == 1
+
+
+def test_stats_imports_no_crawler():
+    code = (
+        'import sys; from sport_systems import cli; '
+        'print(",".join(sorted(sys.modules)))'
+    )
+    modules = subprocess.check_output(
+        [sys.executable, '-c', code], universal_newlines=True,
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+    ).strip().split(',')
+    for heavy in ('requests', 'multiprocessing', 'bs4', 'lxml',
+                  'numpy', 'sport_systems.spider', 'sport_systems.parser'):
+        assert heavy not in modules
+
+
+def test_export_json(tmpdir, monkeypatch, capsys):
+    _event(tmpdir, monkeypatch)
+    assert cli.main(['export', '1740']) == 0
+    rows = json.loads(capsys.readouterr().out)
+    assert rows[0]['time'] == 3605
+    assert rows[2]['status'] == 'DNF'
+
+
+def test_export_archive(tmpdir, monkeypatch):
+    from sport_systems import archive
+
+    _event(tmpdir, monkeypatch)
+    cli.main(['export', '1740', '--format', 'archive', '-o', 'a.sqlite'])
+    assert len(archive.Archive('a.sqlite').results(1740)) == 2
+
+
+def test_crawl_legacy_arguments(stub_server, tmpdir, monkeypatch, capsys):
+    monkeypatch.chdir(tmpdir)
+    assert cli.main(['1740']) == 0
+    assert 'Percentage of completing runners' in capsys.readouterr().out
+    assert len(tmpdir.join('race-1740.csv').readlines()) == 96
+
+
+def test_crawl_in_order(stub_server, tmpdir, monkeypatch):
+    import multiprocessing
+
+    from sport_systems.spider import SportSystemResultsMixin
+
+    monkeypatch.chdir(tmpdir)
+    # Several download processes and pages, one of which comes in late
+    monkeypatch.setattr(multiprocessing, 'cpu_count', lambda: 3)
+    monkeypatch.setattr(SportSystemResultsMixin, 'MAX_PAGE_SIZE', 20)
+    stub_server.flaky = {20}
+    assert cli.main(['1740']) == 0
+    positions = [line.split('\t')[0]
+                 for line in tmpdir.join('race-1740.csv').readlines()]
+    assert positions == ['pos'] + [str(i) for i in range(1, 96)]
+
+
+def test_crawl_cache_options(tmpdir, monkeypatch):
+    crawled = []
+    monkeypatch.setattr(
+        cli, 'crawl', lambda event_id, *args: crawled.append(args[4])
+    )
+    cache_dir = str(tmpdir.join('cache'))
+
+    cli.main(['crawl', '1740', '--cache', cache_dir])
+    cli.main(['crawl', '1740', '--cache', cache_dir, '--cache-ttl', '60',
+              '--cache-max-size', '1000000'])
+
+    assert crawled[0].ttl == cli.DEFAULT_CACHE_TTL
+    assert crawled[0].max_size is None
+    assert (crawled[1].ttl, crawled[1].max_size) == (60, 1000000)
+
+
+
+def test_crawl_incremental_dead_letters(tmpdir, monkeypatch, capsys):
+    from sport_systems import incremental, retry
+
+    _event(tmpdir, monkeypatch)
+    letter = retry.DeadLetter('http://example.com/?posStart=20', 4, 503,
+                              None)
+    monkeypatch.setattr(incremental, 'update', lambda event_id, path: {
+        'changed': 0, 'unchanged': 4, 'missing': 1, 'dead_letters': [letter],
+    })
+
+    assert cli.main(['crawl', '1740', '--incremental']) == 1
+    out = capsys.readouterr().out
+    assert 'Some pages could not be fetched' in out
+    assert 'posStart=20' in out
+
+
+def test_crawl_incremental_rejects_live(capsys):
+    with pytest.raises(SystemExit):
+        cli.main(['crawl', '1740', '--incremental', '--live'])
+    assert '--incremental' in capsys.readouterr().err
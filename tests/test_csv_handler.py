@@ -1,3 +1,5 @@
+import io
+
 from sport_systems import csv_handler
 
 
@@ -8,3 +10,133 @@ class TestBuildResults(object):
 
         assert results[0].name == 'Tom Jervis'
         assert results[-1].name == 'Frances Lindsay'
+
+    def test_skips_bad_rows(self):
+        data = (
+            'pos\ttime\tname\n'
+            '2\t25:01:30\tUltra\n'
+            '\tDNF\tQuitter\n'
+            '\n'
+            '1\t1:00:05\tFast\n'
+            '3\tgarbage\tOdd\n'
+            '4\n'
+        )
+        results = csv_handler.build_results(io.StringIO(data))
+        assert [result.name for result in results] == ['Fast', 'Ultra']
+        assert list(results.times) == [3605, 90090]
+
+
+def test_read_rows():
+    data = (
+        'pos\ttime\tname\tteam\tcat\tnum\tchip\tgrade\n'
+        '1\t1:00:05\tFast\tClub\tSenior\t7\t0:59:58\t\n'
+        '\tDNS\tLate\t\tV40\t8\t\t\n'
+        '\t\tShort\n'
+    )
+    first, second, third = csv_handler.read_rows(io.StringIO(data))
+    assert first == csv_handler.Row(
+        1, 3605, 'Fast', 'Club', 'Senior', '7', 3598, '', 'finished'
+    )
+    assert first.finished
+    assert (second.pos, second.time, second.status) == (None, None, 'DNS')
+    assert not second.finished
+    assert (third.name, third.grade, third.status) == ('Short', '', 'unknown')
+
+
+class TestBuild(object):
+    def _build(self, tmpdir, **kwargs):
+        path = str(tmpdir.join('race.csv'))
+        with open(path, 'w', newline='') as out:
+            csv_handler.build(1740, out, **kwargs)
+        with open(path, 'r') as fin:
+            return csv_handler.build_results(fin)
+
+    def test_process_engine(self, stub_server, tmpdir):
+        results = self._build(tmpdir, engine='process', N=2)
+        assert len(results) == 95
+        assert results[0].name == 'Runner 1'
+
+    def test_async_engine(self, stub_server, tmpdir):
+        results = self._build(tmpdir, engine='async', concurrency=4)
+        assert len(results) == 95
+        assert results[0].name == 'Runner 1'
+
+    def test_written_in_order(self, stub_server, tmpdir):
+        path = str(tmpdir.join('race.csv'))
+        with open(path, 'w', newline='') as out:
+            csv_handler.build(1740, out, N=3, page_size=20)
+        with open(path, 'r') as fin:
+            positions = [line.split('\t')[0] for line in fin]
+        assert positions == ['pos'] + [str(i) for i in range(1, 96)]
+
+
+def _page(start, count):
+    return [(str(pos), '1:00:00', 'Runner %d' % pos)
+            for pos in range(start, start + count)]
+
+
+class TestOrderedWriter(object):
+    def _positions(self, out):
+        return [int(line.split('\t')[0])
+                for line in out.getvalue().splitlines()]
+
+    def test_reorders_pages(self):
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out)
+        for start in (21, 41, 1):
+            writer.write(_page(start, 20))
+        # Held back until the first page arrives, then written together
+        assert self._positions(out) == []
+        writer.close()
+
+        assert self._positions(out) == list(range(1, 61))
+        assert writer.in_order
+        assert writer.writes == 1
+
+    def test_chunked_writes(self):
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out, chunk_size=1)
+        writer.write(_page(1, 20))
+        writer.write(_page(41, 20))
+        assert self._positions(out) == list(range(1, 21))
+
+    def test_tied_positions(self):
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out)
+        writer.write([('1', 'a'), ('2', 'b')])
+        writer.write([('2', 'c'), ('4', 'd')])
+        writer.close()
+        assert self._positions(out) == [1, 2, 2, 4]
+        assert writer.in_order
+
+    def test_window(self):
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out, window=2)
+        for start in (21, 41, 61):
+            writer.write(_page(start, 20))
+        # The first page is given up on...
+        writer.write(_page(1, 20))
+        writer.close()
+
+        # ...and written out of order when it does turn up
+        assert not writer.in_order
+        positions = self._positions(out)
+        assert positions[:20] == list(range(21, 41))
+        assert sorted(positions) == list(range(1, 81))
+
+    def test_unnumbered_rows_last(self):
+        out = io.StringIO()
+        writer = csv_handler.OrderedWriter(out)
+        writer.write([('', 'DNF', 'Runner')])
+        writer.write(_page(1, 2))
+        writer.close()
+        assert out.getvalue().splitlines()[-1].startswith('\tDNF')
+
+
+def test_extract_rows(response_1):
+    rows = csv_handler.extract_rows(response_1)
+    assert len(rows) == 20
+    assert rows[0] == (
+        '1', '1:10:57', 'Tom Jervis', 'Warrington AC', 'Senior Men', '3029',
+        '1:10:57', '84.07',
+    )
@@ -0,0 +1,34 @@
+import os
+import pickle
+
+from sport_systems import db
+
+
+class Store(db.ProcessLocalDB):
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        return db.connect(self.path, 'CREATE TABLE IF NOT EXISTS t (x);')
+
+
+def test_connection_per_process(tmpdir, monkeypatch):
+    store = Store(str(tmpdir.join('store.sqlite')))
+    first = store.db
+    assert store.db is first
+
+    # As if forked
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert store.db is not first
+
+
+def test_pickle_drops_connection(tmpdir):
+    store = Store(str(tmpdir.join('store.sqlite')))
+    store.db.execute('INSERT INTO t VALUES (1)')
+    store.db.commit()
+
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy.db is not store.db
+    assert copy.db.execute('SELECT x FROM t').fetchall() == [(1, )]
+    store.close()
+    copy.close()
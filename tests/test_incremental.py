@@ -0,0 +1,70 @@
+import csv
+
+from sport_systems import incremental
+
+
+def _read(path):
+    with open(path, 'r', newline='') as fin:
+        return list(csv.reader(fin, delimiter='\t'))
+
+
+def test_update(stub_server, tmpdir, engine, engine_kwargs):
+    path = str(tmpdir.join('race-1740.csv'))
+
+    summary = incremental.update(
+        1740, path, engine=engine, page_size=20, **engine_kwargs
+    )
+    assert summary == {'changed': 5, 'unchanged': 0, 'missing': 0,
+                       'dead_letters': []}
+    first = _read(path)
+    assert len(first) == 96
+    assert [row[0] for row in first[1:]] == [str(i) for i in range(1, 96)]
+
+    # Nothing has changed, every page but the first is a 304
+    summary = incremental.update(1740, path, engine=engine, **engine_kwargs)
+    assert summary == {'changed': 0, 'unchanged': 5, 'missing': 0,
+                       'dead_letters': []}
+    assert _read(path) == first
+
+    # More results arrive, only the last page and the new ones change
+    stub_server.total = 130
+    summary = incremental.update(1740, path, engine=engine, **engine_kwargs)
+    assert summary == {'changed': 3, 'unchanged': 4, 'missing': 0,
+                       'dead_letters': []}
+    rows = _read(path)
+    assert [row[0] for row in rows[1:]] == [str(i) for i in range(1, 131)]
+
+
+def test_failed_page_keeps_old_rows(stub_server, tmpdir):
+    path = str(tmpdir.join('race-1740.csv'))
+    incremental.update(1740, path, page_size=20, N=2)
+    first = _read(path)
+
+    stub_server.failing = {40}
+    summary = incremental.update(
+        1740, path, N=2, max_retry=1, retry_backoff=0.01
+    )
+    assert summary['missing'] == 1
+    assert [letter.url for letter in summary['dead_letters']] == [
+        stub_server.base_url.format(event_id=1740) +
+        '?link=N&posStart=40&count=20'
+    ]
+    assert _read(path) == first
+
+
+def test_foreign_csv_is_recrawled(stub_server, tmpdir):
+    path = tmpdir.join('race-1740.csv')
+    path.write('pos\ttime\n1\t1:00:00\n')
+
+    summary = incremental.update(1740, str(path), page_size=20, N=2)
+    assert summary['changed'] == 5
+    assert len(_read(str(path))) == 96
+
+
+def test_manifest_headers():
+    manifest = incremental.Manifest(20, 40, {
+        0: {'etag': '"abc"', 'last_modified': None, 'digest': 'x',
+            'rows': 20},
+    })
+    assert manifest.headers_for(0) == {'If-None-Match': '"abc"'}
+    assert manifest.headers_for(20) is None
@@ -0,0 +1,54 @@
+import os
+
+from sport_systems import checkpoint, csv_handler, live
+
+
+def test_row_seconds():
+    assert live.row_seconds(('1', '1:10:57', 'Tom Jervis')) == 4257
+    assert live.row_seconds(('', 'DNF', 'Someone')) is None
+    assert live.row_seconds(('pos', 'time')) is None
+
+
+def test_publishes_first_page_then_throttles():
+    published = []
+    report = live.LiveReport(
+        lambda stats: published.append(len(stats)), interval=60
+    )
+    report.add([('1', '1:00:00'), ('2', '1:00:05')])
+    report.add([('3', '1:00:10')])
+    assert published == [2]
+
+    report.close()
+    assert published == [2, 3]
+
+
+def test_build(stub_server, tmpdir):
+    # Published from the callback process, so sent back through a file
+    path = str(tmpdir.join('live.txt'))
+
+    def publish(stats):
+        with open(path, 'a') as out:
+            out.write('%d\n' % len(stats))
+
+    with open(str(tmpdir.join('race.csv')), 'w', newline='') as out:
+        csv_handler.build(1740, out, N=2, page_size=20,
+                          live=live.LiveReport(publish, interval=60))
+
+    with open(path) as fin:
+        counts = [int(line) for line in fin]
+    # The first page straight away, then the final count
+    assert counts == [20, 95]
+
+
+def test_resume_counts_rows_on_disk(stub_server, tmpdir):
+    path = str(tmpdir.join('race-1740.csv'))
+    stub_server.failing = {40}
+    checkpoint.build(1740, path, page_size=20, max_retry=0, N=1)
+    assert not os.path.exists(path)
+
+    stub_server.failing = set()
+    published = []
+    report = live.LiveReport(lambda stats: published.append(len(stats)))
+    checkpoint.build(1740, path, engine='async', live=report)
+    assert published[0] == 75
+    assert published[-1] == 95
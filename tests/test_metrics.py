@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from sport_systems.metrics import CrawlMetrics, QueueSampler, StageTimings
+from sport_systems.session import FetchStats
+from sport_systems.spider import SportSystemResultsSpider
+
+
+class TestStageTimings(object):
+    def test_record(self):
+        timings = StageTimings()
+        timings.record('parse', 0.002)
+        timings.record('parse', 0.004)
+
+        parse = timings.as_dict()['parse']
+        assert parse['count'] == 2
+        assert parse['mean'] == pytest.approx(0.003)
+        assert parse['max'] == 0.004
+        assert parse['histogram']['<=5ms'] == 2
+
+    def test_merge(self):
+        first, second = StageTimings(), StageTimings()
+        first.record('fetch', 0.1)
+        second.record('fetch', 0.3)
+        second.record('write', 0.001)
+
+        merged = StageTimings().merge(first).merge(second).as_dict()
+        assert merged['fetch']['count'] == 2
+        assert merged['fetch']['max'] == 0.3
+        assert merged['write']['count'] == 1
+        # Merging doesn't alias the other's histograms
+        assert first.as_dict()['fetch']['count'] == 1
+
+
+def test_queue_sampler():
+    class Queue(object):
+        def __init__(self, size):
+            self.size = size
+
+        def qsize(self):
+            return self.size
+
+    sampler = QueueSampler({'urls': Queue(3)})
+    sampler.sample()
+    sampler.queues['urls'].size = 1
+    sampler.sample()
+
+    metrics = CrawlMetrics(FetchStats(), StageTimings(), sampler.samples, 1.0)
+    assert metrics.queue_depths() == {'urls': {'max': 3, 'mean': 2.0}}
+
+
+def test_prometheus():
+    stats = FetchStats()
+    stats.record(latency=0.02, size=100)
+    timings = StageTimings()
+    timings.record('parse', 0.002)
+    metrics = CrawlMetrics(stats, timings, [(0.0, {'urls': 2})], 2.0)
+
+    text = metrics.to_prometheus()
+    assert 'sport_systems_crawl_requests_total 1\n' in text
+    assert 'sport_systems_crawl_request_seconds_bucket{le="0.025"} 1' in text
+    assert ('sport_systems_crawl_stage_seconds_count{stage="parse"} 1'
+            in text)
+    assert 'sport_systems_crawl_queue_depth_max{queue="urls"} 2' in text
+
+
+def test_crawl_metrics(stub_server, engine):
+    from sport_systems.spider import get_results_spider
+    spider = get_results_spider(engine)(
+        event_id=1740, callback=lambda res: None, page_size=20,
+        processor=len,
+    )
+    spider.go()
+
+    summary = json.loads(spider.metrics.to_json())
+    assert summary['elapsed'] > 0
+    assert summary['requests']['requests'] == stub_server.request_count
+    assert summary['dead_letters'] == 0
+    stages = summary['stages']
+    # Every page is processed and written, including the first page
+    # fetched before the workers start
+    assert stages['parse']['count'] == 5
+    assert stages['write']['count'] == 5
+    assert stages['fetch']['count'] == 4
+    assert 'urls' in summary['queues']
+    if engine == 'process':
+        assert stages['queue']['count'] == 5
+
+
+def test_spider_metrics_format(stub_server):
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, N=1, page_size=20
+    )
+    spider.go()
+    text = spider.metrics.format()
+    # Including the first page, fetched before the workers start
+    assert text.startswith('Crawled 5 pages')
@@ -1,3 +1,7 @@
+import io
+
+import pytest
+
 from sport_systems import parser
 
 
@@ -9,3 +13,49 @@ def test_parsing(response_1):
 def test_total_count(response_1):
     total = parser.extract_total(response_1)
     assert total == 3857
+
+
+def test_matches_soup(response_1):
+    assert list(parser.parse(response_1)) == list(
+        parser.parse(response_1, backend='soup')
+    )
+
+
+def test_total_count_soup(response_1):
+    assert parser.extract_total(
+        io.BytesIO(response_1), backend='soup'
+    ) == 3857
+
+
+def test_unknown_backend(response_1):
+    with pytest.raises(ValueError):
+        parser.parse(response_1, backend='html5lib')
+
+
+def test_parsing_file(response_1):
+    results = list(parser.parse(io.BytesIO(response_1)))
+    assert len(results) == 20
+    assert results[0]['name'] == 'Tom Jervis'
+
+
+def test_parsing_text(response_1):
+    results = list(parser.parse(response_1.decode('iso-8859-1')))
+    assert len(results) == 20
+    assert results[-1]['time'] == '1:20:36'
+
+
+def test_total_count_chunks(response_1):
+    read = []
+
+    def chunks():
+        for start in range(0, len(response_1), 50):
+            read.append(start)
+            yield response_1[start:start + 50]
+
+    assert parser.extract_total(chunks()) == 3857
+    # Stopped reading just after the <rows> tag
+    assert read[-1] < 200
+
+
+def test_total_count_missing():
+    assert parser.extract_total(b'<rows pos="0"></rows>') is None
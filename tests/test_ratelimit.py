@@ -0,0 +1,74 @@
+import time
+
+from sport_systems.ratelimit import RateLimiter, retry_after
+from sport_systems.spider import SportSystemResultsSpider
+
+
+class TestRateLimiter(object):
+    def test_rate(self):
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+            limiter.release(200, 0.01)
+        # The first token is free, the next five take 1/50s each
+        assert time.monotonic() - start >= 0.09
+
+    def test_backs_off_on_errors(self):
+        limiter = RateLimiter(rate=10, cooldown=0)
+        limiter.acquire()
+        limiter.release(503, 0.01)
+        assert limiter.state()['rate'] == 5
+        assert limiter.state()['throttled'] == 1
+
+    def test_backs_off_once_per_cooldown(self):
+        limiter = RateLimiter(rate=10, cooldown=60)
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(429, 0.01)
+        assert limiter.state()['rate'] == 5
+
+    def test_backs_off_on_latency(self):
+        limiter = RateLimiter(rate=100, burst=100, cooldown=0)
+        for latency in (0.01, 0.01, 1.0):
+            limiter.acquire()
+            limiter.release(200, latency)
+        assert limiter.state()['rate'] < 100
+
+    def test_recovers(self):
+        limiter = RateLimiter(rate=10, burst=10, cooldown=0)
+        limiter.acquire()
+        limiter.release(500, 0.01)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(200, 0.01)
+        assert 5 < limiter.state()['rate'] <= 10
+
+    def test_max_in_flight(self):
+        limiter = RateLimiter(rate=None, max_in_flight=1)
+        assert limiter._try_acquire() is None
+        assert limiter._try_acquire() > 0
+        limiter.release(200, 0.01)
+        assert limiter._try_acquire() is None
+
+    def test_retry_after(self):
+        limiter = RateLimiter(rate=10)
+        limiter.acquire()
+        limiter.release(429, 0.01, retry_after({'Retry-After': '30'}))
+        assert limiter.state()['paused_for'] > 29
+        assert limiter._try_acquire() > 29
+
+
+def test_limited_crawl(stub_server):
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, N=2, page_size=10,
+        rate_limit=40, max_in_flight=1,
+    )
+    start = time.monotonic()
+    spider.go()
+
+    # Nine pages after the first, one token is free
+    assert time.monotonic() - start >= 8 / 40.0
+    state = spider.rate_limiter.state()
+    assert state['in_flight'] == 0
+    assert state['throttled'] == 0
@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+from sport_systems import csv_handler, retry
+from sport_systems.spider import SportSystemResultsSpider
+
+
+def test_backoff_delay():
+    for try_count in range(10):
+        delay = retry.backoff_delay(try_count, base=0.5, cap=4)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** try_count)
+
+
+def test_dead_letters(stub_server, engine, engine_kwargs):
+    from sport_systems.spider import get_results_spider
+
+    stub_server.failing = {40}
+    spider = get_results_spider(engine)(
+        event_id=1740, callback=lambda res: None, page_size=20,
+        max_retry=2, retry_backoff=0.01, **engine_kwargs
+    )
+    spider.go()
+
+    url = spider.build_url(page_num=3, count=20)
+    assert spider.dead_letters == [retry.DeadLetter(url, 3, 503, None)]
+    # Five pages, plus two retries of the failing one
+    assert stub_server.request_count == 7
+    assert retry.dead_letter_report(spider.dead_letters)['failed'] == 1
+
+
+def test_exceptions_are_retried(stub_server, monkeypatch):
+    calls = []
+    original = SportSystemResultsSpider.limited_get
+
+    def flaky(self, fetcher, url):
+        # Runs in the single download process, so only its first
+        # request fails
+        calls.append(url)
+        if len(calls) == 1:
+            raise requests.ConnectionError('reset')
+        return original(self, fetcher, url)
+
+    monkeypatch.setattr(SportSystemResultsSpider, 'limited_get', flaky)
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, page_size=50, N=1,
+        retry_backoff=0.01,
+    )
+    spider.go()
+
+    # The first page, fetched up front, then the second page retried as
+    # two halves
+    assert spider.dead_letters == []
+    assert stub_server.request_count == 3
+
+
+@pytest.mark.parametrize('page_size', [20, None])
+def test_first_page_retried(stub_server, tmpdir, page_size):
+    stub_server.flaky = {0}
+    path = str(tmpdir.join('race.csv'))
+    with open(path, 'w', newline='') as out:
+        spider = csv_handler.build(
+            1740, out, N=2, page_size=page_size, max_retry=5,
+            retry_backoff=0.01,
+        )
+
+    assert spider.dead_letters == []
+    with open(path) as fin:
+        assert len(csv_handler.build_results(fin)) == 95
+
+
+def test_first_page_fails_for_good(stub_server):
+    stub_server.failing = {0}
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, page_size=20, N=1,
+        max_retry=2, retry_backoff=0.01,
+    )
+    with pytest.raises(requests.HTTPError):
+        spider.go()
+    assert stub_server.request_count == 3
+
+
+def test_random_errors_recovered(monkeypatch):
+    from sport_systems.spider import SportSystemResultsMixin
+    from .stub_server import StubServer
+
+    with StubServer(total=95, error_rate=0.3) as server:
+        monkeypatch.setattr(
+            SportSystemResultsMixin, 'BASE_URL', server.base_url
+        )
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=lambda res: None, page_size=20, N=2,
+            max_retry=10, retry_backoff=0.001,
+        )
+        spider.go()
+
+        assert spider.dead_letters == []
+        assert server.request_count > 5
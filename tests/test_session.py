@@ -0,0 +1,48 @@
+from sport_systems.session import Fetcher, FetchStats
+
+
+class TestFetchStats(object):
+    def test_record(self):
+        stats = FetchStats()
+        stats.record(latency=0.003, size=10, new_connections=1)
+        stats.record(latency=0.2, size=20)
+
+        assert stats.requests == 2
+        assert stats.connections_reused == 1
+        assert stats.bytes_received == 30
+        assert stats.latency_histogram[0] == 1
+        assert stats.latency_histogram[5] == 1
+
+    def test_merge(self):
+        first, second = FetchStats(), FetchStats()
+        first.record(latency=0.003, size=10, new_connections=1)
+        second.record(latency=0.003, size=5, new_connections=1)
+
+        merged = first.merge(second)
+        assert merged.requests == 2
+        assert merged.connections_opened == 2
+        assert merged.latency_histogram[0] == 2
+
+
+def test_fetcher_reuses_connections(stub_server):
+    fetcher = Fetcher()
+    url = stub_server.base_url.format(event_id=1)
+    for _ in range(3):
+        assert fetcher.get(url).ok
+
+    assert fetcher.stats.connections_opened == 1
+    assert fetcher.stats.connections_reused == 2
+
+
+def test_fetcher_counts_compressed_bytes():
+    from .stub_server import StubServer
+    with StubServer(total=95, compress=True) as server:
+        fetcher = Fetcher()
+        url = server.base_url.format(event_id=1) + '?posStart=0&count=20'
+        response = fetcher.get(url)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert fetcher.stats.bytes_received == int(
+        response.headers['Content-Length']
+    )
+    assert fetcher.stats.bytes_received < len(response.content)
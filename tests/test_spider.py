@@ -1,4 +1,9 @@
+import threading
+import time
+
+import pytest
 import responses
+from sport_systems.backpressure import MemoryBudget
 from sport_systems.spider import SportSystemResultsSpider
 
 
@@ -16,3 +21,187 @@ def test_total(response_1):
 
     spider = SportSystemResultsSpider(event_id=1740, callback=callback)
     assert spider.total_count == 3857
+
+
+def test_worker_stats(stub_server):
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, N=2, page_size=20
+    )
+    spider.go()
+
+    assert len(spider.worker_stats) == 2
+    stats = spider.fetch_stats
+    # Including the first page, fetched up front before the workers
+    assert stats.requests == 5
+    assert stats.connections_opened <= 3
+
+
+class TestPageSize(object):
+    def _spider(self):
+        return SportSystemResultsSpider(event_id=1740, callback=None)
+
+    def test_grows_to_fit_event(self, stub_server):
+        spider = self._spider()
+        assert spider.probe_page_size() == 320
+        assert spider.total_count == 95
+        assert stub_server.request_count == 3
+
+    def test_capped_by_server(self, stub_server):
+        stub_server.max_count = 50
+        spider = self._spider()
+        assert spider.probe_page_size() == 50
+
+    def test_too_slow(self, stub_server):
+        stub_server.row_latency = 0.001
+        spider = self._spider()
+        spider.MAX_PAGE_LATENCY = 0.05
+        # 20 rows are quick enough, 80 aren't
+        assert spider.probe_page_size() == 20
+        assert stub_server.request_count == 2
+        assert 'count=20' in spider._fetch_first_page().url
+
+    def test_split_url(self):
+        spider = self._spider()
+        url = spider.build_url(page_num=3, count=100)
+        assert spider.split_url(url) == [
+            spider.build_url(None, posStart=200, count=50),
+            spider.build_url(None, posStart=250, count=50),
+        ]
+
+    def test_split_url_minimum(self):
+        spider = self._spider()
+        url = spider.build_url(page_num=1, count=20)
+        assert spider.split_url(url) == [url]
+
+
+def test_adaptive_crawl(stub_server):
+    stub_server.total = 3857
+    stub_server.max_count = 1000
+
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, N=2
+    )
+    spider.go()
+
+    # Four probes (20, 80, 320 and a truncated 1280, which doubles as
+    # the first page) then three more pages of 1000, rather than the 194
+    # requests of fixed pages of 20
+    assert spider.page_size == 1000
+    assert stub_server.request_count == 7
+
+
+def test_first_page_reused(stub_server):
+    spider = SportSystemResultsSpider(
+        event_id=1740, callback=lambda res: None, N=2, page_size=20
+    )
+    spider.go()
+
+    # No separate count=1 request for the total
+    assert spider.total_count == 95
+    assert stub_server.request_count == 5
+
+
+def _rows_or_fail(content):
+    if b'<row id="41">' in content:
+        raise ValueError('Unparseable')
+    return content.count(b'<row ')
+
+
+class TestParsePool(object):
+    def test_crawl(self, stub_server, tmpdir):
+        path = str(tmpdir.join('counts.txt'))
+
+        def callback(count):
+            with open(path, 'a') as out:
+                out.write('%d\n' % count)
+
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=callback, N=2, page_size=20,
+            processor=lambda content: content.count(b'<row '),
+            parse_workers=2, parse_queue_size=1,
+        )
+        spider.go()
+
+        with open(path) as fin:
+            assert sum(int(line) for line in fin) == 95
+        stages = spider.metrics.summary()['stages']
+        assert stages['parse']['count'] == 5
+        assert 'parse' in spider.metrics.queue_depths()
+
+    @pytest.mark.parametrize('parse_workers', [0, 1])
+    def test_failures_are_dead_letters(self, stub_server, parse_workers):
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=lambda res: None, N=1, page_size=20,
+            processor=_rows_or_fail, parse_workers=parse_workers,
+        )
+        spider.go()
+
+        url = spider.build_url(page_num=3, count=20)
+        assert [letter.url for letter in spider.dead_letters] == [url]
+        assert spider.dead_letters[0].status == 200
+        assert 'ValueError' in spider.dead_letters[0].error
+        # Not retried, with or without the parse pool
+        assert stub_server.request_count == 5
+
+
+    def test_first_page_failure_is_dead_letter(self, stub_server):
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=lambda res: None, N=1, page_size=60,
+            processor=_rows_or_fail,
+        )
+        # Fetched before the workers start, but dead lettered like the
+        # others
+        spider.go()
+
+        url = spider.build_url(page_num=1, count=60)
+        assert [letter.url for letter in spider.dead_letters] == [url]
+
+
+class TestBackpressure(object):
+    def test_urls_are_generated_lazily(self, stub_server):
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=None, page_size=20
+        )
+        urls = spider.iter_urls()
+        assert next(urls) == spider.build_url(page_num=2, count=20)
+        assert len(list(urls)) == 3
+
+    def test_slow_callback(self, stub_server, tmpdir):
+        path = str(tmpdir.join('counts.txt'))
+
+        def callback(count):
+            time.sleep(0.02)
+            with open(path, 'a') as out:
+                out.write('%d\n' % count)
+
+        spider = SportSystemResultsSpider(
+            event_id=1740, callback=callback, N=2, page_size=10,
+            processor=lambda content: content.count(b'<row '),
+            queue_size=1, max_memory=1,
+        )
+        assert spider.url_queue._maxsize == 1
+        spider.go()
+
+        with open(path) as fin:
+            assert sum(int(line) for line in fin) == 95
+        # A budget smaller than a page lets one page through at a time
+        budget = spider.memory_budget
+        assert budget.used == 0
+        assert 0 < budget.peak < 10000
+        stages = spider.metrics.summary()['stages']
+        assert stages['backpressure']['count'] == 10
+
+
+def test_memory_budget():
+    budget = MemoryBudget(100)
+    budget.acquire(60)
+    released = threading.Timer(0.05, budget.release, (60, ))
+    released.start()
+    # Waits for the first 60 bytes to be given back
+    assert budget.acquire(60) >= 0.04
+    released.join()
+    assert (budget.used, budget.peak) == (60, 60)
+    # Bigger than the whole budget, but nothing else is held
+    budget.release(60)
+    budget.acquire(500)
+    assert budget.peak == 500
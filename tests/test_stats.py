@@ -12,3 +12,119 @@ class TestPercentile(object):
     def test_generating(self, results_1):
         percentiles = stats.generate_percentiles(results_1)
         assert percentiles[0][1] == datetime.time(1, 30, 15)
+
+
+def test_parse_seconds():
+    assert stats.parse_seconds('1:02:03') == 3723
+    assert stats.parse_seconds('101:00:00') == 363600
+    for text in ('', 'DNF', '1:2:3', '1:02:xx', None):
+        assert stats.parse_seconds(text) is None
+
+
+def test_parse_times():
+    assert stats.parse_times(['0:00:10', 'DNS', '0:00:10', '']) == [
+        10, None, 10, None
+    ]
+
+
+def test_to_time_over_a_day():
+    assert stats.to_time(90090) == datetime.timedelta(hours=25, seconds=90)
+    assert stats.to_seconds(stats.to_time(90090)) == 90090
+    assert stats.to_time(3605) == datetime.time(1, 0, 5)
+
+
+class TestResults(object):
+    def _results(self, results_1):
+        results = stats.Results()
+        for result in reversed(results_1):
+            results.append(stats.to_seconds(result.time), result.name)
+        return results
+
+    def test_sort(self, results_1):
+        results = self._results(results_1)
+        results.sort()
+        assert list(results) == results_1
+        assert results[0] == stats.Result(datetime.time(1, 10, 15), 'foo')
+
+    def test_sort_already_sorted(self):
+        results = stats.Results()
+        for seconds in (60, 60, 120):
+            results.append(seconds, 'foo')
+        times = results.times
+        results.sort()
+        # Left in place rather than copied
+        assert results.times is times
+
+    def test_shared_names(self, results_1):
+        names = stats.NameTable()
+        first = stats.Results(names=names)
+        second = stats.Results(names=names)
+        first.append(60, 'foo')
+        second.append(120, 'foo')
+
+        assert len(names) == 1
+        assert second[0].name == 'foo'
+
+    def test_percentiles(self, results_1):
+        results = self._results(results_1)
+        results.sort()
+        assert stats.generate_percentiles(results) == (
+            stats.generate_percentiles(results_1)
+        )
+
+    def test_bucketing(self, results_1):
+        results = self._results(results_1)
+        results.sort()
+        assert len(stats.create_buckets(results)['01-10']) == 2
+
+
+class TestVectorized(object):
+    def test_percentile_indexes(self):
+        # 90% is never exceeded by the index of a 10 result event
+        assert stats.percentile_indexes(10, (50, 80, 90, 100)) == [
+            (50, 6), (80, 9),
+        ]
+
+    def test_percentile_indexes_match_scan(self):
+        percentiles = (0, 33.3, 50, 66.6666, 99.9, 100)
+        for total in range(1, 500):
+            scanned = []
+            for percentile in percentiles:
+                for index in range(total):
+                    if index / total * 100 > percentile:
+                        scanned.append((percentile, index))
+                        break
+            assert stats.percentile_indexes(total, percentiles) == scanned
+
+    def test_percentile_seconds(self, results_1):
+        seconds = stats.percentile_seconds(results_1, (50, 100))
+        assert list(seconds) == [
+            stats.to_seconds(datetime.time(1, 30, 15)),
+            stats.to_seconds(datetime.time(1, 30, 20)),
+        ]
+
+    def test_histogram(self, results_1):
+        first, counts = stats.histogram(results_1, bin_size=600)
+        assert first == stats.to_seconds(datetime.time(1, 10))
+        assert list(counts) == [2, 1, 3]
+
+
+class TestLiveStats(object):
+    def test_matches_sorted_results(self, results_1):
+        live = stats.LiveStats()
+        results = stats.Results()
+        for result in reversed(results_1):
+            seconds = stats.to_seconds(result.time)
+            live.add(seconds)
+            results.append(seconds, result.name)
+        results.sort()
+
+        assert live.generate_percentiles() == (
+            stats.generate_percentiles(results)
+        )
+        assert live.histogram(60) == stats.histogram(results, 60)
+
+    def test_empty(self):
+        live = stats.LiveStats()
+        assert live.generate_percentiles() == []
+        assert live.histogram() == (0, stats.array('I'))